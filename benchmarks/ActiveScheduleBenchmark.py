@@ -0,0 +1,100 @@
+""" Cost of an epoch with Schedule and ActiveSchedule on a large, mostly dead Game of Life board holding a few
+gliders and blinkers. With the active set, the cost follows the number of awake cells rather than the size of the
+board.
+
+    python -m panacea.benchmarks.ActiveScheduleBenchmark [size] [epochs]
+"""
+import sys
+import time
+
+from panacea.core.Coordinates import Coordinates2D
+from panacea.core.Grid import ObjectGrid2D
+from panacea.core.Model import Model
+from panacea.core.Schedule import Schedule, ActiveSchedule
+from panacea.examples.gameOfLife.GameOfLife import GOLCell
+
+GLIDER = [(1, 0), (2, 1), (0, 2), (1, 2), (2, 2)]
+BLINKER = [(0, 1), (1, 1), (2, 1)]
+
+
+class BenchmarkModel(Model):
+    """ A model without setup, the board is built by buildModel.
+    """
+
+    def teardown(self):
+        pass
+
+
+def getPattern(size):
+    """ Returns the live cells of the board: a glider and a blinker in every 50 x 50 block.
+
+    Args:
+        size (int): The number of cells along each side of the board.
+
+    Returns:
+        set: The positions of the live cells.
+    """
+    alive = set()
+
+    for bx in range(0, size - 49, 50):
+        for by in range(0, size - 49, 50):
+            alive.update((bx + 5 + x, by + 5 + y) for x, y in GLIDER)
+            alive.update((bx + 30 + x, by + 30 + y) for x, y in BLINKER)
+
+    return alive
+
+
+def buildModel(size, schedule):
+    """ Builds the board.
+
+    Args:
+        size (int): The number of cells along each side of the board.
+        schedule (Schedule): The schedule the cells are added to.
+
+    Returns:
+        Model: The model, ready to step.
+    """
+    alive = getPattern(size)
+
+    model = BenchmarkModel()
+    grid = ObjectGrid2D(size, size, "golgrid")
+
+    for x in range(size):
+        for y in range(size):
+            cell = GOLCell([1, 1 if (x, y) in alive else 0])
+            grid.moveAgent(Coordinates2D(x, y), cell)
+            schedule.addAgent(cell)
+
+    model.addGrid(grid)
+    model.addSchedule(schedule)
+
+    return model
+
+
+def run(size=200, epochs=10):
+    """ Times every epoch with both schedules and prints the number of cells stepped by the active set.
+
+    Args:
+        size (int): The number of cells along each side of the board.
+        epochs (int): The number of epochs timed.
+    """
+    full = buildModel(size, Schedule())
+    active = buildModel(size, ActiveSchedule())
+
+    print "%d x %d board, %d live cells" % (size, size, len(getPattern(size)))
+    print "%6s %12s %12s %10s" % ("epoch", "Schedule", "active set", "awake")
+
+    for i in range(epochs):
+        awake = active.schedule.getAwakeCount()
+        times = []
+
+        for model in (full, active):
+            start = time.time()
+            model.schedule.step(model)
+            times.append(time.time() - start)
+
+        print "%6d %11.4fs %11.4fs %10d" % (i, times[0], times[1], awake)
+
+
+if __name__ == "__main__":
+    run(*[int(a) for a in sys.argv[1:3]])
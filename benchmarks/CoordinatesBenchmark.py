@@ -0,0 +1,90 @@
+""" Micro-benchmark of the Coordinates classes: creation, attribute access, equality, use as dictionary keys and
+memory, compared with the previous layout of Coordinates2D (a per-instance __dict__, no __hash__).
+
+    python -m panacea.benchmarks.CoordinatesBenchmark
+"""
+import sys
+import timeit
+
+
+class DictCoordinates2D(object):
+    """ The previous layout of Coordinates2D, kept here as the reference.
+    """
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    def getCoordinates(self):
+        return (self.x, self.y)
+
+    def __eq__(self, other):
+        otherC = other.getCoordinates()
+        return (self.x == otherC[0]) & (self.y == otherC[1])
+
+
+SETUP = """
+from panacea.core.Coordinates import Coordinates2D
+from panacea.benchmarks.CoordinatesBenchmark import DictCoordinates2D
+
+a = Coordinates2D(3, 4)
+b = Coordinates2D(3, 4)
+dictA = DictCoordinates2D(3, 4)
+dictB = DictCoordinates2D(3, 4)
+
+keys = [Coordinates2D(i, j) for i in range(100) for j in range(100)]
+index = dict((k, k) for k in keys)
+
+# without __hash__, positions have to be keyed by their tuple
+dictKeys = [DictCoordinates2D(i, j) for i in range(100) for j in range(100)]
+dictIndex = dict((k.getCoordinates(), k) for k in dictKeys)
+"""
+
+CASES = [
+    ("creation", "DictCoordinates2D(3, 4)", "Coordinates2D(3, 4)"),
+    ("attribute read", "dictA.x", "a.x"),
+    ("equality", "dictA == dictB", "a == b"),
+    ("dictionary lookup", "dictIndex[dictA.getCoordinates()]", "index[a]"),
+]
+
+
+def getInstanceSize(instance):
+    """ Returns the memory held by an instance, its attribute dictionary included.
+
+    Args:
+        instance (object): The instance we are measuring.
+
+    Returns:
+        int: The size in bytes.
+    """
+    size = sys.getsizeof(instance)
+
+    if (hasattr(instance, "__dict__")):
+        size += sys.getsizeof(instance.__dict__)
+
+    return size
+
+
+def run(number=1000000, repeat=3):
+    """ Runs all cases and prints the best time of each, in microseconds per operation.
+
+    Args:
+        number (int): The number of operations per measurement.
+        repeat (int): The number of measurements per case, the fastest is kept.
+    """
+    from panacea.core.Coordinates import Coordinates2D
+
+    print "%-20s %12s %12s" % ("", "previous", "current")
+
+    for name, reference, statement in CASES:
+        times = [min(timeit.repeat(s, SETUP, number=number, repeat=repeat)) * 1e6 / number
+                 for s in (reference, statement)]
+
+        print "%-20s %10.3fus %10.3fus" % (name, times[0], times[1])
+
+    print "%-20s %11dB %11dB" % ("instance size", getInstanceSize(DictCoordinates2D(3, 4)),
+                                 getInstanceSize(Coordinates2D(3, 4)))
+
+
+if __name__ == "__main__":
+    run()
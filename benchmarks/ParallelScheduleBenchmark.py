@@ -0,0 +1,89 @@
+""" Strong scaling of ParallelSchedule on the Game of Life example: the same board is stepped with an increasing
+number of workers and the time per epoch and speed-up over a single worker are printed.
+
+    python -m panacea.benchmarks.ParallelScheduleBenchmark [size] [epochs]
+"""
+import multiprocessing
+import random
+import sys
+import time
+
+from panacea.core.Coordinates import Coordinates2D
+from panacea.core.Grid import ObjectGrid2D
+from panacea.core.Model import Model
+from panacea.core.Schedule import ParallelSchedule
+from panacea.examples.gameOfLife.GameOfLife import GOLCell
+
+
+class BenchmarkModel(Model):
+    """ A model without setup, the board is built by buildModel.
+    """
+
+    def teardown(self):
+        pass
+
+
+def buildModel(size, workers, seed=0):
+    """ Builds a Game of Life board with a random initial state, the same for a given seed.
+
+    Args:
+        size (int): The number of cells along each side of the board.
+        workers (int): The number of workers of the schedule.
+        seed (int): The seed of the initial state.
+
+    Returns:
+        Model: The model, ready to step.
+    """
+    random.seed(seed)
+
+    model = BenchmarkModel()
+    grid = ObjectGrid2D(size, size, "golgrid")
+    schedule = ParallelSchedule(workers=workers, seed=seed)
+
+    for x in range(size):
+        for y in range(size):
+            cell = GOLCell([1, 1 if random.random() <= 0.5 else 0])
+            grid.moveAgent(Coordinates2D(x, y), cell)
+            schedule.addAgent(cell)
+
+    model.addGrid(grid)
+    model.addSchedule(schedule)
+
+    return model
+
+
+def run(size=200, epochs=5):
+    """ Times the board with 1, 2, 4... workers up to the number of CPUs.
+
+    Args:
+        size (int): The number of cells along each side of the board.
+        epochs (int): The number of epochs timed per run.
+    """
+    counts = [1]
+
+    while (counts[-1] * 2 <= multiprocessing.cpu_count()):
+        counts.append(counts[-1] * 2)
+
+    print "%d x %d board, %d epochs" % (size, size, epochs)
+    print "%8s %14s %10s" % ("workers", "per epoch", "speed-up")
+
+    reference = None
+
+    for workers in counts:
+        model = buildModel(size, workers)
+
+        start = time.time()
+
+        for i in range(epochs):
+            model.schedule.step(model)
+
+        perEpoch = (time.time() - start) / epochs
+
+        if (reference is None):
+            reference = perEpoch
+
+        print "%8d %13.3fs %9.2fx" % (workers, perEpoch, reference / perEpoch)
+
+
+if __name__ == "__main__":
+    run(*[int(a) for a in sys.argv[1:3]])
@@ -1,23 +1,34 @@
 """ This module contains all Coordinates classes. Coordinates represent a 2D or 3D position in a grid as well as
 offering useful features such as calculating euclidean and manhattan distances between two positions.
+
+Coordinates are immutable tuples of their values with named accessors (like collections.namedtuple): creating,
+comparing and hashing them runs at tuple speed, they hold no per-instance dictionary and they can be used as
+dictionary keys or set members, where they match the plain tuples returned by getCoordinates.
 """
 import abc
 import math
+import numpy
+from operator import itemgetter
 
 
-class Coordinates(object):
+class Coordinates(tuple):
     """ General blueprint for a coordinate.
     """
     __metaclass__ = abc.ABCMeta
 
-    @abc.abstractmethod
+    __slots__ = ()
+
     def getCoordinates(self):
         """ Returns a tuple or triplet containing x, y and eventually z coordinates of the position.
 
         Returns:
             (int, int) OR (int, int, int): The numerical values of the coordinate.
         """
-        pass
+        return tuple(self)
+
+    def __getnewargs__(self):
+        # used by pickle and copy, the values are the constructor arguments
+        return tuple(self)
 
     @abc.abstractmethod
     def getEuclideanDistanceFromCoordinate(self, coordinate):
@@ -47,7 +58,8 @@ class Coordinates(object):
     def getMooreNeigh(self, grid):
         """ Returns the coordinates of all moore neighbours (radius 1) of the current coordinate. Also takes the grid
          we are using to ensure that all moore neighbours are in the grid. (Eg: Not producing a moore neighbour (5,5)
-         for a grid of size (4,4).)
+         for a grid of size (4,4).) Neighbours beyond the edges of a wrapped or reflected grid are brought back
+         onto it, see Grid.getNeighbourTuples.
 
          Args:
 
@@ -58,18 +70,29 @@ class Coordinates(object):
         """
         pass
 
-    @abc.abstractmethod
-    def __eq__(self, other):
-        """ Checks if two coordinates refer to the same position.
+    def getNeighbourhood(self, grid, radius=1, kind="moore"):
+        """ Returns the coordinates of all neighbours of the current coordinate within a given radius, on a given
+        grid and following its boundary mode.
 
-        Args:
-            other (Coordinates): Another coordinate
+         Args:
 
-        Returns:
+             grid (Grid): The grid we are referring to.
+             radius (int): The largest distance of a neighbour.
+             kind (str): "moore", "vonneumann" or "euclidean", see Grid.getNeighbourhoodPositions.
 
-            bool: True if they reefer to the same position, false otherwise.
+         Returns:
+             [Coordinates] : A list of coordinate objects referring to the neighbours.
         """
-        pass
+        coordinatesClass = grid.coordinatesClass
+
+        return [coordinatesClass(*p) for p in
+                grid.getNeighbourhoodPositions(self.getCoordinates(), radius, kind).tolist()]
+
+    # Two coordinates refer to the same position when they hold the same values, coordinates also compare equal to
+    # the plain tuple of their values. Coordinates of different dimensions never compare equal.
+    __eq__ = tuple.__eq__
+    __ne__ = tuple.__ne__
+    __hash__ = tuple.__hash__
 
     @abc.abstractmethod
     def __add__(self, other):
@@ -126,6 +149,12 @@ class Coordinates(object):
 class Coordinates3D(Coordinates):
     """Implementation of a 3D Coordinates class
     """
+    __slots__ = ()
+
+    x = property(itemgetter(0), doc="The x-position.")
+    y = property(itemgetter(1), doc="The y-position.")
+    z = property(itemgetter(2), doc="The z-position.")
+
     def __add__(self, other):
         """ Adds two coordinates.
          For example: (1,1,1)+(2,3,4) = (3,4,5)
@@ -181,7 +210,7 @@ class Coordinates3D(Coordinates):
 
     __rmul__ = __mul__
 
-    def __init__(self, x, y, z):
+    def __new__(cls, x, y, z):
         """ Creates the coordinates object
 
          Args:
@@ -189,31 +218,7 @@ class Coordinates3D(Coordinates):
              y (int): The y-position.
              z (int): The z-position.
         """
-        self.x = x
-        self.y = y
-        self.z = z
-
-    def __eq__(self, other):
-        """ Checks if two coordinates refer to the same position.
-
-        Args:
-            other (Coordinates): Another coordinate
-
-        Returns:
-
-            bool: True if they reefer to the same position, false otherwise.
-        """
-
-        otherC = other.getCoordinates()
-        return self.x == otherC[0] and self.y == otherC[1] and self.z == otherC[2]
-
-    def getCoordinates(self):
-        """ Returns triplet containing x, y and z coordinates of the position.
-
-        Returns:
-            (int, int, int): The numerical values of the coordinate.
-        """
-        return (self.x, self.y, self.z)
+        return tuple.__new__(cls, (x, y, z))
 
     def getEuclideanDistanceFromCoordinate(self, coordinate):
         """ Calculates the euclidean distance between the current coordinate and another coordinate.
@@ -285,52 +290,17 @@ class Coordinates3D(Coordinates):
              [Coordinates] : A list of coordinate objects referring to the moore neighbours.
         """
 
-        x = self.x
-        y = self.y
-        z = self.z
+        return [Coordinates3D(*c) for c in grid.getNeighbourTuples(self.getCoordinates(), "moore")]
 
-        neigh = [
-            Coordinates3D(x + 1, y + 1, z + 1),
-            Coordinates3D(x + 1, y + 1, z - 1),
-            Coordinates3D(x + 1, y + 1, z),
-            Coordinates3D(x + 1, y - 1, z + 1),
-            Coordinates3D(x + 1, y - 1, z - 1),
-            Coordinates3D(x + 1, y - 1, z),
-            Coordinates3D(x + 1, y, z + 1),
-            Coordinates3D(x + 1, y, z - 1),
-            Coordinates3D(x + 1, y, z),
-            Coordinates3D(x - 1, y - 1, z - 1),
-            Coordinates3D(x - 1, y + 1, z - 1),
-            Coordinates3D(x - 1, y + 1, z),
-            Coordinates3D(x - 1, y - 1, z),
-            Coordinates3D(x - 1, y - 1, z - 1),
-            Coordinates3D(x - 1, y - 1, z),
-            Coordinates3D(x - 1, y, z + 1),
-            Coordinates3D(x - 1, y, z - 1),
-            Coordinates3D(x - 1, y, z),
-            Coordinates3D(x, y + 1, z + 1),
-            Coordinates3D(x, y + 1, z - 1),
-            Coordinates3D(x, y + 1, z),
-            Coordinates3D(x, y - 1, z + 1),
-            Coordinates3D(x, y - 1, z - 1),
-            Coordinates3D(x, y - 1, z),
-            Coordinates3D(z, y, z + 1),
-            Coordinates3D(x, y, z - 1),
-            Coordinates3D(x, y, z)
 
-        ]
-
-        gridSize = grid.getSize()
-        xMax = gridSize[0]
-        yMax = gridSize[1]
-        zMax = gridSize[2]
-
-        neigh = [c for c in neigh if c.x >= 0 and c.x < xMax and c.y >= 0 and c.y < yMax and c.z >= 0 and c.z < zMax]
-
-        return neigh
+class Coordinates2D(Coordinates):
+    """Implementation of a 2D Coordinates class
+    """
+    __slots__ = ()
 
+    x = property(itemgetter(0), doc="The x-position.")
+    y = property(itemgetter(1), doc="The y-position.")
 
-class Coordinates2D(Coordinates):
     def __add__(self, other):
         """ Adds two coordinates.
          For example: (1,1)+(2,3) = (3,4)
@@ -384,16 +354,14 @@ class Coordinates2D(Coordinates):
 
     __rmul__ = __mul__
 
-    def __init__(self, x, y, ):
+    def __new__(cls, x, y):
         """ Creates the coordinates object.
 
          Args:
              x (int): The x-position.
              y (int): The y-position.
         """
-
-        self.x = x
-        self.y = y
+        return tuple.__new__(cls, (x, y))
 
     def inGrid(self, grid):
         """ Checks if the current coordinate is in a grid. (Ie: Not referring to a point lying outside the grid.)
@@ -418,27 +386,6 @@ class Coordinates2D(Coordinates):
 
         return None
 
-    def __eq__(self, other):
-        """ Checks if two coordinates refer to the same position.
-
-        Args:
-            other (Coordinates): Another coordinate
-
-        Returns:
-
-            bool: True if they reefer to the same position, false otherwise.
-        """
-        otherC = other.getCoordinates()
-        return (self.x == otherC[0]) & (self.y == otherC[1])
-
-    def getCoordinates(self):
-        """ Returns tuple containing x and y coordinates of the position.
-
-        Returns:
-            (int, int): The numerical values of the coordinate.
-        """
-        return (self.x, self.y)
-
     def getEuclideanDistanceFromCoordinate(self, coordinate):
         """ Calculates the euclidean distance between the current coordinate and another coordinate.
 
@@ -484,6 +431,9 @@ class Coordinates2D(Coordinates):
              [Coordinates] : A list of coordinate objects referring to the moore neighbours.
         """
 
+        if (grid.boundary != "clip"):
+            return [Coordinates2D(*c) for c in grid.getNeighbourTuples(self.getCoordinates(), "moore")]
+
         x = self.x
         y = self.y
 
@@ -505,3 +455,188 @@ class Coordinates2D(Coordinates):
         neigh = [c for c in neigh if c.x >= 0 and c.x < xMax and c.y >= 0 and c.y < yMax]
 
         return neigh
+
+
+class CoordinateArray(object):
+    """ Many positions held in a single (N, dimensions) numpy array, for computations over whole sets of positions
+    (Eg: all particles of a swarm) without a Python call per position. Arithmetic returns new arrays and never
+    modifies its operands.
+    """
+    __metaclass__ = abc.ABCMeta
+
+    def __init__(self, values):
+        """ Creates the array.
+
+         Args:
+             values (numpy.ndarray OR [Coordinates] OR [tuple]): The positions, one per row. Integer and floating
+             point values are both kept as they are.
+        """
+        values = numpy.asarray(values)
+
+        if (values.size == 0):
+            values = values.astype(int)
+
+        self.values = values.reshape(-1, self.dimensions)
+
+    @classmethod
+    def fromCoordinates(cls, coordinates):
+        """ Creates an array from a list of coordinates.
+
+         Args:
+             coordinates ([Coordinates]): The positions.
+
+         Returns:
+             CoordinateArray: The positions, in the same order.
+        """
+        return cls([c.getCoordinates() for c in coordinates])
+
+    def toCoordinates(self):
+        """ Converts the array to a list of coordinates.
+
+         Returns:
+             [Coordinates]: One coordinate object per row.
+        """
+        coordinatesClass = self.coordinatesClass
+
+        return [coordinatesClass(*row) for row in self.values.tolist()]
+
+    def getArray(self):
+        """ Returns the underlying array.
+
+         Returns:
+             numpy.ndarray: The (N, dimensions) array of positions.
+        """
+        return self.values
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        """ Returns a single position as a coordinate, or a selection of positions (slice, index array or boolean
+        mask, Eg: from inGrid) as a new array.
+        """
+        if (isinstance(index, (int, long, numpy.integer))):
+            return self.coordinatesClass(*self.values[index].tolist())
+
+        return self.__class__(self.values[index])
+
+    def __eq__(self, other):
+        """ Checks if two arrays hold the same positions in the same order.
+
+        Args:
+            other (CoordinateArray): Another array
+
+        Returns:
+
+            bool: True if they hold the same positions, false otherwise.
+        """
+        return (isinstance(other, CoordinateArray) and self.values.shape == other.values.shape and
+                bool((self.values == other.values).all()))
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def getOperand(self, other):
+        """ Returns the values of another array, or a coordinate broadcast over all rows.
+
+         Args:
+             other (CoordinateArray OR Coordinates): The other operand.
+
+         Returns:
+             numpy.ndarray: An (N, dimensions) or (dimensions,) array.
+        """
+        if (isinstance(other, CoordinateArray)):
+            return other.values
+
+        return numpy.asarray(other.getCoordinates())
+
+    def __add__(self, other):
+        """ Adds another array row by row, or a coordinate to every row.
+         For example: [(1,1), (2,2)]+(1,2) = [(2,3), (3,4)]
+        """
+        return self.__class__(self.values + self.getOperand(other))
+
+    def __sub__(self, other):
+        """ Subtracts another array row by row, or a coordinate from every row.
+        """
+        return self.__class__(self.values - self.getOperand(other))
+
+    def __mul__(self, other):
+        """ Scales all rows by a scalar, or each row by its own factor when given a sequence of N scalars.
+         For example: [(1,1), (2,2)]*[2, 3] = [(2,2), (6,6)]
+        """
+        factor = numpy.asarray(other)
+
+        if (factor.ndim == 1):
+            factor = factor[:, numpy.newaxis]
+
+        return self.__class__(self.values * factor)
+
+    __rmul__ = __mul__
+
+    def getDifferences(self, other):
+        """ Returns the differences between every position and a coordinate, or every position of another array.
+
+         Args:
+             other (Coordinates OR CoordinateArray): The coordinate or array we are measuring against.
+
+         Returns:
+             numpy.ndarray: (N, dimensions) for a coordinate, (N, M, dimensions) for an array of M positions.
+        """
+        if (isinstance(other, CoordinateArray)):
+            return self.values[:, numpy.newaxis, :] - other.values[numpy.newaxis, :, :]
+
+        return self.values - numpy.asarray(other.getCoordinates())
+
+    def getEuclideanDistances(self, other):
+        """ Calculates the euclidean distances between every position and a coordinate, or every position of another
+        array (all pairs).
+
+         Args:
+             other (Coordinates OR CoordinateArray): The coordinate or array we want to calculate the distances to.
+
+         Returns:
+             numpy.ndarray: (N,) distances for a coordinate, an (N, M) matrix for an array of M positions.
+        """
+        differences = self.getDifferences(other)
+
+        return numpy.sqrt((differences ** 2).sum(axis=-1))
+
+    def getManhattanDistances(self, other):
+        """ Calculates the manhattan distances between every position and a coordinate, or every position of another
+        array (all pairs).
+
+         Args:
+             other (Coordinates OR CoordinateArray): The coordinate or array we want to calculate the distances to.
+
+         Returns:
+             numpy.ndarray: (N,) distances for a coordinate, an (N, M) matrix for an array of M positions.
+        """
+        return numpy.abs(self.getDifferences(other)).sum(axis=-1)
+
+    def inGrid(self, grid):
+        """ Checks which positions lie in a grid.
+
+         Args:
+             grid (Grid): The grid we want to check against.
+
+         Returns:
+             numpy.ndarray: A boolean mask with one entry per position, True if the position is in the grid.
+        """
+        size = numpy.asarray(grid.getSize())
+
+        return ((self.values >= 0) & (self.values < size)).all(axis=1)
+
+
+class CoordinateArray2D(CoordinateArray):
+    """ An array of 2D positions, see CoordinateArray.
+    """
+    dimensions = 2
+    coordinatesClass = Coordinates2D
+
+
+class CoordinateArray3D(CoordinateArray):
+    """ An array of 3D positions, see CoordinateArray.
+    """
+    dimensions = 3
+    coordinatesClass = Coordinates3D
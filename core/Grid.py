@@ -3,23 +3,329 @@ or object grids, which can hold one or more steppables per position. Additionall
 grids can be 2D or 3D."""
 
 import abc
+import itertools
 import numpy
-from random import shuffle
+from collections import OrderedDict
+from operator import methodcaller
+from random import randrange
 
 from panacea.core.Coordinates import Coordinates2D, Coordinates3D
 
 
+def parseBoolean(value):
+    """ Reads a boolean option which may come from an XML setup file as a string.
+
+    Args:
+        value (bool OR str): The option value, strings "true", "yes" and "1" (any case) are True.
+
+    Returns:
+        bool: The option value.
+    """
+    if (isinstance(value, str)):
+        return value.strip().lower() in ("true", "yes", "1")
+
+    return bool(value)
+
+
+# (dimensions, neighbourhood, radius) => offsets array, see getNeighbourhoodOffsetArray
+neighbourhoodOffsetCache = {}
+
+
+def getNeighbourhoodOffsetArray(dimensions, neighbourhood, radius=1):
+    """ Returns the offsets of all neighbours of a position within a given radius. Offsets are computed once per
+    (dimensions, neighbourhood, radius) and shared afterwards, the array must not be modified.
+
+    Args:
+        dimensions (int): 2 or 3.
+        neighbourhood (str): "moore" (Chebyshev distance), "vonneumann" (Manhattan distance) or "euclidean".
+        radius (int): The largest distance of a neighbour.
+
+    Returns:
+        numpy.ndarray: An (offsets, dimensions) integer array, the centre excluded.
+    """
+    key = (dimensions, neighbourhood, radius)
+    offsets = neighbourhoodOffsetCache.get(key)
+
+    if (offsets is not None):
+        return offsets
+
+    if (neighbourhood not in ("moore", "vonneumann", "euclidean")):
+        raise ValueError("Unknown neighbourhood: " + str(neighbourhood))
+
+    offsets = numpy.array(list(itertools.product(range(-radius, radius + 1), repeat=dimensions)), dtype=int)
+
+    if (neighbourhood == "vonneumann"):
+        keep = numpy.abs(offsets).sum(axis=1) <= radius
+    elif (neighbourhood == "euclidean"):
+        keep = (offsets ** 2).sum(axis=1) <= radius ** 2
+    else:
+        keep = numpy.ones(len(offsets), dtype=bool)
+
+    # the centre is not its own neighbour
+    keep &= numpy.abs(offsets).sum(axis=1) > 0
+
+    offsets = offsets[keep]
+    offsets.flags.writeable = False
+
+    neighbourhoodOffsetCache[key] = offsets
+
+    return offsets
+
+
+def getNeighbourhoodOffsets(dimensions, neighbourhood, radius=1):
+    """ Returns the offsets of all neighbours of a position within a given radius, see getNeighbourhoodOffsetArray.
+
+    Args:
+        dimensions (int): 2 or 3.
+        neighbourhood (str): "moore", "vonneumann" or "euclidean".
+        radius (int): The largest distance of a neighbour.
+
+    Returns:
+        [(int, int)] OR [(int, int, int)]: The offsets, the centre excluded.
+    """
+    return [tuple(o) for o in getNeighbourhoodOffsetArray(dimensions, neighbourhood, radius).tolist()]
+
+
+def getShiftSlices(offset, shape):
+    """ Returns the pair of slices aligning every position of an array with its neighbour at a given offset, such
+    that array[destination] and array[source] hold a position and its neighbour respectively. Positions whose
+    neighbour lies outside the array are left out.
+
+    Args:
+        offset ((int, int) OR (int, int, int)): The offset of the neighbour.
+        shape ((int, int) OR (int, int, int)): The shape of the array.
+
+    Returns:
+        (tuple, tuple): The destination and source slices.
+    """
+    destination = tuple(slice(max(-d, 0), n - max(d, 0)) for d, n in zip(offset, shape))
+    source = tuple(slice(max(d, 0), n - max(-d, 0)) for d, n in zip(offset, shape))
+
+    return destination, source
+
+
 class Grid(object):
     __metaclass__ = abc.ABCMeta
 
-    def __init__(self, gridName):
+    def __init__(self, gridName, boundary="clip"):
         """ Constructor, defines the grid name which must be unique within the model.
 
         Args:
 
             gridName (string): The name of the grid.
+            boundary (str): What lies beyond the edges of the grid, for neighbourhoods and movement alike:
+
+                "clip": nothing, neighbours outside the grid are left out and agents stop at the edge.
+                "wrap": the grid is periodic (a torus).
+                "reflect": the edges act as mirrors placed between the last position and the next one, so
+                position -1 is position 0, -2 is 1 and so on. Agents bounce back and mirrored neighbours only
+                matter to whole-grid operations (Eg: reduceNeighbourhood), neighbour lists never repeat a
+                position.
         """
+        if (boundary not in ("clip", "wrap", "reflect")):
+            raise ValueError("Unknown boundary mode: " + str(boundary))
+
         self.gridName = gridName
+        self.boundary = boundary
+
+        # axis => (reach, table as a list, table as an array), see getAxisTable
+        self.axisTables = {}
+
+    def getBoundary(self):
+        """ Returns the boundary mode of the grid.
+
+        Returns:
+            str: "clip", "wrap" or "reflect".
+        """
+        return self.boundary
+
+    def getAxisTable(self, axis, reach):
+        """ Returns the neighbour index table of an axis, computed once per grid and extended when a larger reach is
+        asked for. Entry i of the table is the position reached from coordinate 0 by an offset of i - tableReach
+        along this axis, and -1 if that falls outside a clipped grid. The position reached from coordinate c by
+        offset o is therefore table[c + o + tableReach], with no arithmetic depending on the boundary mode.
+
+        Args:
+            axis (int): 0 for x, 1 for y and 2 for z.
+            reach (int): The largest offset we will look up.
+
+        Returns:
+            (int, [int]): The reach of the table, which may be larger than asked for, and the table.
+        """
+        return self.getAxisTables(axis, reach)[:2]
+
+    def getAxisTableArray(self, axis, reach):
+        """ Returns the neighbour index table of an axis as an integer array, for vectorized lookups. See
+        getAxisTable.
+
+        Args:
+            axis (int): 0 for x, 1 for y and 2 for z.
+            reach (int): The largest offset we will look up.
+
+        Returns:
+            (int, numpy.ndarray): The reach of the table, which may be larger than asked for, and the table.
+        """
+        cached = self.getAxisTables(axis, reach)
+
+        return (cached[0], cached[2])
+
+    def getAxisTables(self, axis, reach):
+        """ Builds or extends the neighbour index table of an axis, see getAxisTable.
+
+        Args:
+            axis (int): 0 for x, 1 for y and 2 for z.
+            reach (int): The largest offset we will look up.
+
+        Returns:
+            (int, [int], numpy.ndarray): The reach of the table and the table as a list and as an array.
+        """
+        cached = self.axisTables.get(axis)
+
+        if (cached is not None and cached[0] >= reach):
+            return cached
+
+        size = self.getSize()[axis]
+        positions = numpy.arange(-reach, size + reach)
+
+        if (self.boundary == "wrap"):
+            table = positions % size
+        elif (self.boundary == "reflect"):
+            table = positions % (2 * size)
+            table = numpy.where(table < size, table, 2 * size - 1 - table)
+        else:
+            table = numpy.where((positions >= 0) & (positions < size), positions, -1)
+
+        cached = (reach, table.tolist(), table)
+        self.axisTables[axis] = cached
+
+        return cached
+
+    def getAxisNeighbours(self, axis, coordinate, span):
+        """ Returns the distinct positions within a given distance of a coordinate along one axis.
+
+        Args:
+            axis (int): 0 for x, 1 for y and 2 for z.
+            coordinate (int): The coordinate along the axis.
+            span (int): The largest offset, in both directions.
+
+        Returns:
+            [int]: The positions, in increasing order of offset, without repetitions.
+        """
+        reach, table = self.getAxisTable(axis, span)
+
+        start = coordinate - span + reach
+        positions = []
+
+        for position in table[start:start + 2 * span + 1]:
+            if (position >= 0 and position not in positions):
+                positions.append(position)
+
+        return positions
+
+    def mapPosition(self, coordinatesTuple):
+        """ Brings a position back onto the grid according to the boundary mode: clamped to the edge when clipping,
+        wrapped around or mirrored otherwise. Coordinates are truncated to integers first.
+
+        Args:
+            coordinatesTuple ((int, int) OR (int, int, int)): A position, possibly off the grid.
+
+        Returns:
+            (int, int) OR (int, int, int): The matching position on the grid.
+        """
+        boundary = self.boundary
+        mapped = []
+
+        for c, size in zip(coordinatesTuple, self.getSize()):
+            c = int(c)
+
+            if (boundary == "wrap"):
+                c %= size
+            elif (boundary == "reflect"):
+                c %= 2 * size
+
+                if (c >= size):
+                    c = 2 * size - 1 - c
+            elif (c < 0):
+                c = 0
+            elif (c > size - 1):
+                c = size - 1
+
+            mapped.append(c)
+
+        return tuple(mapped)
+
+    def mapPositionArrays(self, positions):
+        """ Brings many positions back onto the grid at once, see mapPosition.
+
+        Args:
+            positions ([numpy.ndarray]): One array of positions per axis.
+
+        Returns:
+            (numpy.ndarray, ...): One integer array of positions per axis.
+        """
+        mapped = []
+
+        for p, size in zip(positions, self.getSize()):
+            p = numpy.asarray(p).astype(int)
+
+            if (self.boundary == "wrap"):
+                p = p % size
+            elif (self.boundary == "reflect"):
+                p = p % (2 * size)
+                p = numpy.where(p < size, p, 2 * size - 1 - p)
+            else:
+                p = numpy.clip(p, 0, size - 1)
+
+            mapped.append(p)
+
+        return tuple(mapped)
+
+    def getNeighbourTuples(self, coordinatesTuple, neighbourhood="moore", radius=1):
+        """ Returns the positions of the neighbours of a position as tuples, see getNeighbourhoodPositions.
+
+        Args:
+            coordinatesTuple ((int, int) OR (int, int, int)): The centre of the neighbourhood.
+            neighbourhood (str): "moore", "vonneumann" or "euclidean".
+            radius (int): The largest distance of a neighbour.
+
+        Returns:
+            [(int, int)] OR [(int, int, int)]: The neighbouring positions.
+        """
+        return [tuple(p) for p in self.getNeighbourhoodPositions(coordinatesTuple, radius, neighbourhood).tolist()]
+
+    def getNeighbourhoodPositions(self, coordinatesTuple, radius=1, kind="moore"):
+        """ Returns the positions of the neighbours of a position within a given radius, following the boundary
+        mode. The cached offsets of the neighbourhood are mapped onto the grid through the neighbour index tables in
+        a few array operations, with no per-neighbour Python code. A position never appears twice and the centre is
+        never its own neighbour, even on small wrapped or reflected grids.
+
+        Args:
+            coordinatesTuple ((int, int) OR (int, int, int)): The centre of the neighbourhood.
+            radius (int): The largest distance of a neighbour.
+            kind (str): "moore" (square/cube), "vonneumann" (diamond) or "euclidean" (disc/ball).
+
+        Returns:
+            numpy.ndarray: A (neighbours, dimensions) integer array of positions, in the order of the offsets.
+        """
+        dimensions = len(coordinatesTuple)
+        offsets = getNeighbourhoodOffsetArray(dimensions, kind, radius)
+
+        positions = numpy.empty(offsets.shape, dtype=int)
+
+        for axis in range(dimensions):
+            reach, table = self.getAxisTableArray(axis, radius)
+            positions[:, axis] = table[offsets[:, axis] + (int(coordinatesTuple[axis]) + reach)]
+
+        if (self.boundary == "clip"):
+            # neighbours are distinct and never the centre, only those off the grid have to go
+            return positions[(positions >= 0).all(axis=1)]
+
+        # wrapped or mirrored neighbours may repeat each other or the centre
+        flat = numpy.ravel_multi_index(tuple(positions.T), self.getSize())
+        unique = numpy.sort(numpy.unique(flat, return_index=True)[1])
+        positions = positions[unique]
+
+        return positions[(positions != numpy.asarray(coordinatesTuple, dtype=int)).any(axis=1)]
 
     @abc.abstractmethod
     def getSize(self):
@@ -110,11 +416,259 @@ class NumericalGrid(Grid):
         """
         pass
 
+    def reduceNeighbourhood(self, operation="sum", neighbourhood="moore", includeCentre=False):
+        """ Computes the sum, mean, minimum or maximum of the neighbourhood (radius 1) of every position at once. This
+        works on whole shifted slices of the grid, there is no per-position Python call. On clipped grids neighbours
+        falling outside the grid are ignored, so the mean of a position on an edge only averages over its in-grid
+        neighbours. On wrapped and reflected grids every position has a full neighbourhood, mirrored neighbours
+        of a reflected grid being counted as often as they are reached.
+
+        Args:
+            operation (str): "sum", "mean", "min" or "max".
+            neighbourhood (str): "moore" or "vonneumann".
+            includeCentre (bool): Whether each position counts as part of its own neighbourhood.
+
+        Returns:
+            numpy.ndarray: An array with the same shape as the grid holding the result for every position. Minimums,
+            maximums and the means of floating point grids keep the dtype of the grid, means of other grids are
+            float64. Sums are accumulated like numpy.sum does: boolean and integer grids narrower than the platform
+            integer are summed in it (unsigned for unsigned grids), so booleans are counted and small integers do
+            not overflow.
+        """
+        grid = self.getGrid()
+        shape = grid.shape
+
+        offsets = getNeighbourhoodOffsets(len(shape), neighbourhood)
+
+        if (includeCentre):
+            offsets = [(0,) * len(shape)] + offsets
+
+        if (operation == "sum" or operation == "mean"):
+            ufunc = numpy.add
+
+            # means of integer and boolean grids are computed in double precision
+            if (operation == "mean" and not numpy.issubdtype(grid.dtype, numpy.floating)):
+                result = numpy.zeros(shape, dtype=numpy.float64)
+            elif (grid.dtype.kind in "bi"):
+                result = numpy.zeros(shape, dtype=numpy.result_type(grid.dtype, numpy.int_))
+            elif (grid.dtype.kind == "u"):
+                result = numpy.zeros(shape, dtype=numpy.result_type(grid.dtype, numpy.uint))
+            else:
+                result = numpy.zeros(shape, dtype=grid.dtype)
+        elif (operation == "min" or operation == "max"):
+            ufunc = numpy.minimum if operation == "min" else numpy.maximum
+
+            if (grid.dtype.kind == "b"):
+                limits = (False, True)
+            elif (numpy.issubdtype(grid.dtype, numpy.integer)):
+                limits = (numpy.iinfo(grid.dtype).min, numpy.iinfo(grid.dtype).max)
+            else:
+                limits = (numpy.finfo(grid.dtype).min, numpy.finfo(grid.dtype).max)
+
+            result = numpy.empty(shape, dtype=grid.dtype)
+            result.fill(limits[1] if operation == "min" else limits[0])
+        else:
+            raise ValueError("Unknown operation: " + str(operation))
+
+        if (self.boundary != "clip"):
+            # every position has all its neighbours, gathered through the neighbour index tables
+            tables = [self.getAxisTable(axis, 1) for axis in range(len(shape))]
+
+            for offset in offsets:
+                index = numpy.ix_(*[table[reach + o:reach + o + n]
+                                    for o, n, (reach, table) in zip(offset, shape, tables)])
+                ufunc(result, grid[index], out=result)
+
+            if (operation == "mean"):
+                numpy.divide(result, len(offsets), out=result, casting="unsafe")
+
+            return result
+
+        for offset in offsets:
+            destination, source = getShiftSlices(offset, shape)
+            ufunc(result[destination], grid[source], out=result[destination])
+
+        if (operation == "mean"):
+            # the number of in-grid neighbours of every position
+            counts = numpy.zeros(shape, dtype=numpy.int32)
+
+            for offset in offsets:
+                counts[getShiftSlices(offset, shape)[0]] += 1
+
+            numpy.divide(result, numpy.maximum(counts, 1), out=result, casting="unsafe")
+
+        return result
+
+    def getNeighbourhood(self, coordinates, radius=1, kind="moore"):
+        """ Returns the values of all neighbours of a position within a given radius.
+
+        Args:
+            coordinates (Coordinates): The centre of the neighbourhood.
+            radius (int): The largest distance of a neighbour.
+            kind (str): "moore", "vonneumann" or "euclidean", see Grid.getNeighbourhoodPositions.
+
+        Returns:
+            [(Coordinates => Double)]: A list of tuples where the first element is a coordinate and the second
+            element is the value at such coordinate.
+        """
+        positions = self.getNeighbourhoodPositions(coordinates.getCoordinates(), radius, kind)
+        coordinatesClass = self.coordinatesClass
+
+        if (self.grid is not None):
+            values = list(self.grid[tuple(positions.T)])
+        else:
+            values = [self.getGridValue(coordinatesClass(*p)) for p in positions.tolist()]
+
+        return [(coordinatesClass(*p), v) for p, v in zip(positions.tolist(), values)]
+
+    def allocateValues(self, shape, dtype=numpy.float64, doubleBuffered=False, memmapPath=None, memmapMode="w+"):
+        """ Allocates the arrays holding the values of the grid, called by the constructors with their keyword
+        arguments.
+
+        Args:
+            shape ((int, int) OR (int, int, int)): The size of the grid.
+            dtype (numpy.dtype OR str): The type of the values, Eg: "uint8", "int32" or "float32", float64 by
+            default. Values written to the grid are cast to it.
+            doubleBuffered (bool): Also allocate a back buffer, see swapBuffers.
+            memmapPath (str): Back the values with a numpy.memmap on this file instead of memory, so that the grid
+            can be larger than the available RAM and read by other processes. The back buffer of a double buffered
+            grid uses memmapPath + ".next".
+            memmapMode (str): The numpy.memmap mode. "w+" (default) creates or overwrites the file with zeros, "r+"
+            attaches to an existing file and "r" attaches read-only, Eg: for post-processing.
+        """
+        doubleBuffered = parseBoolean(doubleBuffered)
+        self.doubleBuffered = doubleBuffered
+        self.dtype = numpy.dtype(dtype)
+
+        if (memmapPath is None):
+            self.memmapPaths = None
+            self.grid = numpy.zeros(shape, dtype=self.dtype)
+            self.nextGrid = numpy.zeros(shape, dtype=self.dtype) if doubleBuffered else None
+
+        else:
+            # the file holding the current state first, the one holding the back buffer second
+            self.memmapPaths = [memmapPath, memmapPath + ".next"]
+            self.memmapMode = memmapMode
+            self.grid = numpy.memmap(memmapPath, dtype=self.dtype, mode=memmapMode, shape=shape)
+
+            if (doubleBuffered):
+                self.nextGrid = numpy.memmap(memmapPath + ".next", dtype=self.dtype, mode=memmapMode, shape=shape)
+            else:
+                self.nextGrid = None
+
+    def getDtype(self):
+        """ Returns the type of the values of the grid.
+
+        Returns:
+            numpy.dtype: The type of the values.
+        """
+        return self.dtype
+
+    def getMemmapPath(self):
+        """ Returns the file currently holding the values of a memory-mapped grid. With double buffering this
+        alternates between the two files at every swapBuffers.
+
+        Returns:
+            str: The path of the file, None if the grid lives in memory.
+        """
+        if (self.memmapPaths is None):
+            return None
+
+        return self.memmapPaths[0]
+
+    def flush(self):
+        """ Writes any change to a memory-mapped grid to disk. Does nothing for grids living in memory.
+        """
+        if (self.memmapPaths is None):
+            return
+
+        for values in (self.grid, self.nextGrid):
+            if (values is not None and values.flags.writeable):
+                values.flush()
+
+    def close(self):
+        """ Flushes a memory-mapped grid and releases its arrays, the files are closed once no other reference to
+        the arrays is left. The grid can't be used again until reopen is called.
+        """
+        self.flush()
+
+        self.grid = None
+        self.nextGrid = None
+
+    def reopen(self, mode="r"):
+        """ Attaches a memory-mapped grid to its files again, Eg: read-only once the simulation is over.
+
+        Args:
+            mode (str): The numpy.memmap mode, "r" (default) or "r+".
+        """
+        if (self.memmapPaths is None):
+            raise ValueError("Grid " + str(self.gridName) + " is not memory-mapped")
+
+        self.close()
+
+        self.memmapMode = mode
+        self.grid = numpy.memmap(self.memmapPaths[0], dtype=self.dtype, mode=mode, shape=self.getSize())
+
+        if (self.doubleBuffered):
+            self.nextGrid = numpy.memmap(self.memmapPaths[1], dtype=self.dtype, mode=mode, shape=self.getSize())
+
+    def getNextGrid(self):
+        """ Returns the back buffer of a double buffered grid, that is the values the grid will hold after the next
+        swapBuffers.
+
+        Returns:
+            numpy.ndarray: The back buffer.
+        """
+        if (self.nextGrid is None):
+            raise ValueError("Grid " + str(self.gridName) + " is not double buffered")
+
+        return self.nextGrid
+
+    def setNextGridValue(self, coordinates, value):
+        """ Sets the value a position will hold after the next swapBuffers, reads keep seeing the current value
+        until then.
+
+        Args:
+            coordinates (Coordinates): The position we are setting the value for.
+            value (double): The value we are setting.
+        """
+        self.getNextGrid()[coordinates.getCoordinates()] = value
+
+    def setAllNextGridValues(self, value):
+        """ Sets the value all positions will hold after the next swapBuffers, in place.
+
+        Args:
+            value (double): The value to which all positions will be set.
+        """
+        self.getNextGrid().fill(value)
+
+    def swapBuffers(self, carryOver=False):
+        """ Makes the back buffer the current state of a double buffered grid, usually called once per epoch (Eg:
+        from a stepEpilogue). This only exchanges the two arrays, nothing is copied unless carryOver is set.
+
+        Args:
+            carryOver (bool): Copy the new current state into the new back buffer, so that positions which are not
+            written during the next epoch keep their value. Otherwise the back buffer holds the state of the
+            previous epoch.
+        """
+        nextGrid = self.getNextGrid()
+
+        self.nextGrid = self.grid
+        self.grid = nextGrid
+
+        if (self.memmapPaths is not None):
+            self.memmapPaths.reverse()
+
+        if (carryOver):
+            numpy.copyto(self.nextGrid, self.grid)
+
 
 class NumericalGrid2D(NumericalGrid):
     """ An implementation of a 2D Numerical Grid
     """
-    def __init__(self, *args):
+    coordinatesClass = Coordinates2D
+
+    def __init__(self, *args, **kwargs):
         """ Constructor method, sets the size of the grid and the grid's name, by default all grid values
         are set to zero.
 
@@ -125,205 +679,1762 @@ class NumericalGrid2D(NumericalGrid):
             name (string): The name of the grid.
 
                 OR
-            listOfParameters (list): A list of form [(int) xsize, (int) ysize, (string) name]
+            listOfParameters (list): A list of form [(int) xsize, (int) ysize, (string) name, (string) dtype], the
+            dtype being optional.
+
+        Keyword Args:
+            dtype, doubleBuffered, memmapPath, memmapMode: See NumericalGrid.allocateValues.
+            boundary (str): "clip", "wrap" or "reflect", see Grid.
         """
         if(len(args) == 1):
             args = args[0]
             args[0] = int(args[0])
             args[1] = int(args[1])
-            
+
+            if (len(args) > 3):
+                kwargs["dtype"] = args[3]
+
         xsize = args[0]
         ysize = args[1]
         gridName = args[2]
 
-        super(NumericalGrid2D, self).__init__(gridName)
+        super(NumericalGrid2D, self).__init__(gridName, kwargs.pop("boundary", "clip"))
         self.xsize = xsize
         self.ysize = ysize
-        self.grid = numpy.zeros((xsize, ysize))
+        self.allocateValues((xsize, ysize), **kwargs)
 
     def getGrid(self):
         """ Returns the grid object
 
         Returns:
-
-            (grid): The current object.
+
+            (grid): The current object.
+        """
+        return self.grid
+
+    def getSize(self):
+        """ Returns the size of the grid
+
+        Returns:
+
+            (int, int) : A tuple containing the x-size and y-size of the grid.
+        """
+        return (self.xsize, self.ysize)
+
+    def setAllGridValues(self, value):
+        """ This method allows to set all grid positions to a given value.
+
+        Args:
+
+            value (double): The value to which all positions will be set.
+        """
+        self.grid.fill(value)
+
+    def setGridValue(self, coordinates, value):
+        """ Sets the value of a particular position.
+
+        Args:
+            coordinate (Coordinates2D): The position we are setting the value for.
+            value (double): The value we are setting.
+        """
+        coordinates = coordinates.getCoordinates()
+        self.grid[coordinates[0], coordinates[1]] = value
+
+    def getGridValue(self, coordinates):
+        """ Returns the value of a particular position.
+
+        Args:
+
+            coordinate (Coordinates2D): The position we are retrieving the value for.
+
+        Returns:
+
+            double: The value at such position.
+        """
+        coordinates = coordinates.getCoordinates()
+        return self.grid[coordinates[0], coordinates[1]]
+
+    def getMooreNeigh(self, coordinates):
+        """ Returns the values all moore neighbourhood (radius 1) coordinates with respect to a given
+        coordinate.
+
+        Args:
+
+            coordinates (Coordinates2D): The coordinates object pointing to the center of the moore
+            neighbourhood.
+
+        Returns:
+
+            [(Coordinates => Double)]: A list of tuples where the first element is a coordinate and the second
+            element is the value at such coordinate.
+        """
+        mooreNeigh = coordinates.getMooreNeigh(self)
+
+        neigh = []
+
+        for m in mooreNeigh:
+            neigh.append((m, self.getGridValue(m)))
+
+        return neigh
+
+
+class NumericalGrid3D(NumericalGrid):
+    """ An implementation of a 3D Numerical Grid
+    """
+    coordinatesClass = Coordinates3D
+
+    def __init__(self, *args, **kwargs):
+        """ Constructor method, sets the size of the grid and the grid's name, by default all grid values
+        are set to zero.
+
+        Args:
+
+            xsize (int): The width of the grid.
+            ysize (int): The length of the grid.
+            zsize (int): The height of the grid.
+            name (string): The name of the grid.
+
+                OR
+            listOfParameters (list): A list of form [(int) xsize, (int) ysize, (int) zsize, (string) name,
+            (string) dtype], the dtype being optional.
+
+        Keyword Args:
+            dtype, doubleBuffered, memmapPath, memmapMode: See NumericalGrid.allocateValues.
+            boundary (str): "clip", "wrap" or "reflect", see Grid.
+        """
+        if(len(args) == 1):
+            args = args[0]
+            args[0] = int(args[0])
+            args[1] = int(args[1])
+            args[2] = int(args[2])
+
+            if (len(args) > 4):
+                kwargs["dtype"] = args[4]
+
+        xsize = args[0]
+        ysize = args[1]
+        zsize = args[2]
+        gridName = args[3]
+
+        super(NumericalGrid3D, self).__init__(gridName, kwargs.pop("boundary", "clip"))
+        self.xsize = xsize
+        self.ysize = ysize
+        self.zsize = zsize
+        self.allocateValues((xsize, ysize, zsize), **kwargs)
+
+    def getGrid(self):
+        """ Returns the grid object
+
+        Returns:
+
+            (grid): The current object.
+        """
+        return self.grid
+
+    def getSize(self):
+        """ Returns the size of the grid
+
+        Returns:
+
+            (int, int, int) : A tuple containing the x-size, y-size and z-size of the grid.
+        """
+        return (self.xsize, self.ysize, self.zsize)
+
+    def setAllGridValues(self, value):
+        """ This method allows to set all grid positions to a given value.
+
+        Args:
+
+            value (double): The value to which all positions will be set.
+        """
+        self.grid.fill(value)
+
+    def setGridValue(self, coordinates, value):
+        """ Sets the value of a particular position.
+
+        Args:
+            coordinate (Coordinates3D): The position we are setting the value for.
+            value (double): The value we are setting.
+        """
+        coordinates = coordinates.getCoordinates()
+        self.grid[coordinates[0], coordinates[1], coordinates[2]] = value
+
+    def getGridValue(self, coordinates):
+        """ Returns the value of a particular position.
+
+        Args:
+
+            coordinate (Coordinates3D): The position we are retrieving the value for.
+
+        Returns:
+
+            double: The value at such position.
+        """
+        coordinates = coordinates.getCoordinates()
+        return self.grid[coordinates[0], coordinates[1], coordinates[2]]
+
+    def getMooreNeigh(self, coordinates):
+        """ Returns the values all moore neighbourhood (radius 1) coordinates with respect to a given
+        coordinate.
+
+        Args:
+
+            coordinates (Coordinates3D): The coordinates object pointing to the center of the moore
+            neighbourhood.
+
+        Returns:
+
+            [(Coordinates => Double)]: A list of tuples where the first element is a coordinate and the second
+            element is the value at such coordinate.
+        """
+        mooreNeigh = coordinates.getMooreNeigh(self)
+
+        neigh = []
+
+        for m in mooreNeigh:
+            neigh.append((m, self.getGridValue(m)))
+
+        return neigh
+
+
+class SparseNumericalGrid(NumericalGrid):
+    """ A numerical grid storing only the positions whose value differs from a background value (zero by default),
+    in a dictionary indexed by coordinate tuples. Memory and iteration costs grow with the number of such positions
+    rather than with the area of the grid, which suits mostly-empty fields (Eg: pheromone trails). Positions set
+    back to the background value are dropped.
+
+    Whole-grid operations (reduceNeighbourhood, getGrid) work on a dense copy, see toDense.
+    """
+
+    def __init__(self, gridName, dtype=numpy.float64, boundary="clip"):
+        """ Constructor method.
+
+        Args:
+            gridName (str): The name of the grid.
+            dtype (numpy.dtype OR str): The type of the values, values written to the grid are cast to it.
+            boundary (str): "clip", "wrap" or "reflect", see Grid.
+        """
+        super(SparseNumericalGrid, self).__init__(gridName, boundary)
+
+        self.dtype = numpy.dtype(dtype)
+        self.backgroundValue = self.dtype.type(0)
+        self.values = {}
+
+        # sparse grids have no dense storage, buffering or memory-mapping
+        self.grid = None
+        self.nextGrid = None
+        self.doubleBuffered = False
+        self.memmapPaths = None
+
+    def getGrid(self):
+        """ Returns a dense copy of the grid, writing to it does not change the grid.
+
+        Returns:
+            numpy.ndarray: The values of all positions.
+        """
+        return self.toDense()
+
+    def toDense(self):
+        """ Exports the grid to a dense array in a single vectorized assignment.
+
+        Returns:
+            numpy.ndarray: An array with the size and dtype of the grid holding the values of all positions.
+        """
+        dense = numpy.empty(self.getSize(), dtype=self.dtype)
+        dense.fill(self.backgroundValue)
+
+        if (len(self.values) > 0):
+            index = numpy.array(list(self.values.keys())).T
+            dense[tuple(index)] = list(self.values.values())
+
+        return dense
+
+    def setAllGridValues(self, value):
+        """ Sets all grid positions to a given value, which becomes the background value.
+
+        Args:
+            value (double): The value to which all positions will be set.
+        """
+        self.values.clear()
+        self.backgroundValue = self.dtype.type(value)
+
+    def setGridValue(self, coordinates, value):
+        """ Sets the value of a particular position.
+
+        Args:
+            coordinates (Coordinates): The position we are setting the value for.
+            value (double): The value we are setting.
+
+        Raises:
+            IndexError: If the position is outside the grid.
+        """
+        coordinatesTuple = coordinates.getCoordinates()
+
+        for c, size in zip(coordinatesTuple, self.getSize()):
+            if (c < 0 or c >= size):
+                raise IndexError("Position " + str(coordinatesTuple) + " is outside the grid " + self.gridName)
+
+        value = self.dtype.type(value)
+
+        if (value == self.backgroundValue):
+            self.values.pop(coordinatesTuple, None)
+        else:
+            self.values[coordinatesTuple] = value
+
+    def getGridValue(self, coordinates):
+        """ Returns the value of a particular position.
+
+        Args:
+            coordinates (Coordinates): The position we are retrieving the value for.
+
+        Returns:
+            double: The value at such position.
+        """
+        return self.values.get(coordinates.getCoordinates(), self.backgroundValue)
+
+    def getMooreNeigh(self, coordinates):
+        """ Returns the values all moore neighbourhood (radius 1) coordinates with respect to a given
+        coordinate.
+
+        Args:
+            coordinates (Coordinates): The coordinates object pointing to the center of the moore neighbourhood.
+
+        Returns:
+            [(Coordinates => Double)]: A list of tuples where the first element is a coordinate and the second
+            element is the value at such coordinate.
+        """
+        neigh = []
+
+        for m in coordinates.getMooreNeigh(self):
+            neigh.append((m, self.getGridValue(m)))
+
+        return neigh
+
+    def getNonZeroCount(self):
+        """ Returns the number of positions whose value differs from the background value.
+
+        Returns:
+            int: The number of stored positions.
+        """
+        return len(self.values)
+
+    def iterNonZero(self):
+        """ Iterates over the positions whose value differs from the background value (zero unless changed by
+        setAllGridValues), in no particular order. The grid must not be modified during the iteration, collect the
+        updates first (Eg: with list()) when writing back to it.
+
+        Returns:
+            iterator of (Coordinates, double): The positions and their values.
+        """
+        coordinatesClass = self.coordinatesClass
+
+        for position, value in self.values.items():
+            yield (coordinatesClass(*position), value)
+
+
+class SparseNumericalGrid2D(SparseNumericalGrid):
+    """ A 2D sparse numerical grid, see SparseNumericalGrid.
+    """
+
+    coordinatesClass = Coordinates2D
+
+    def __init__(self, *args, **kwargs):
+        """ Constructor method, sets the size of the grid and the grid's name, by default all grid values
+        are set to zero.
+
+        Args:
+
+            xsize (int): The width of the grid.
+            ysize (int): The height of the grid.
+            name (string): The name of the grid.
+
+                OR
+            listOfParameters (list): A list of form [(int) xsize, (int) ysize, (string) name, (string) dtype], the
+            dtype being optional.
+
+        Keyword Args:
+            dtype (numpy.dtype OR str): The type of the values, float64 by default.
+            boundary (str): "clip", "wrap" or "reflect", see Grid.
+        """
+        if(len(args) == 1):
+            args = args[0]
+            args[0] = int(args[0])
+            args[1] = int(args[1])
+
+            if (len(args) > 3):
+                kwargs["dtype"] = args[3]
+
+        super(SparseNumericalGrid2D, self).__init__(args[2], **kwargs)
+        self.xsize = args[0]
+        self.ysize = args[1]
+
+    def getSize(self):
+        """ Returns the size of the grid
+
+        Returns:
+
+            (int, int) : A tuple containing the x-size and y-size of the grid.
+        """
+        return (self.xsize, self.ysize)
+
+
+class SparseNumericalGrid3D(SparseNumericalGrid):
+    """ A 3D sparse numerical grid, see SparseNumericalGrid.
+    """
+
+    coordinatesClass = Coordinates3D
+
+    def __init__(self, *args, **kwargs):
+        """ Constructor method, sets the size of the grid and the grid's name, by default all grid values
+        are set to zero.
+
+        Args:
+
+            xsize (int): The width of the grid.
+            ysize (int): The length of the grid.
+            zsize (int): The height of the grid.
+            name (string): The name of the grid.
+
+                OR
+            listOfParameters (list): A list of form [(int) xsize, (int) ysize, (int) zsize, (string) name,
+            (string) dtype], the dtype being optional.
+
+        Keyword Args:
+            dtype (numpy.dtype OR str): The type of the values, float64 by default.
+            boundary (str): "clip", "wrap" or "reflect", see Grid.
+        """
+        if(len(args) == 1):
+            args = args[0]
+            args[0] = int(args[0])
+            args[1] = int(args[1])
+            args[2] = int(args[2])
+
+            if (len(args) > 4):
+                kwargs["dtype"] = args[4]
+
+        super(SparseNumericalGrid3D, self).__init__(args[3], **kwargs)
+        self.xsize = args[0]
+        self.ysize = args[1]
+        self.zsize = args[2]
+
+    def getSize(self):
+        """ Returns the size of the grid
+
+        Returns:
+
+            (int, int, int) : A tuple containing the x-size, y-size and z-size of the grid.
+        """
+        return (self.xsize, self.ysize, self.zsize)
+
+
+class PositionArray(object):
+    """ Structure-of-arrays storage for the positions of agents on an ObjectGrid. Positions are kept in a single
+    contiguous integer array, one row per agent, indexed by a dense slot number. When an agent leaves, the last agent
+    takes its slot so that the live positions always occupy the first rows of the array. Views refer to their agent by
+    a handle which, unlike the slot, does not change while the agent is in the store.
+    """
+
+    def __init__(self, viewClass, capacity=1024):
+        """ Constructor method, initializes an empty store.
+
+        Args:
+            viewClass (class): The PositionView class handed out to agents, which also defines the dimensions.
+            capacity (int): The number of rows allocated up front, the array doubles in size when full.
+        """
+        self.viewClass = viewClass
+        self.positions = numpy.zeros((capacity, viewClass.dimensions), dtype=numpy.int32)
+
+        # slot => agent, slot => handle and handle => slot, handles of agents which left are reused
+        self.agents = []
+        self.handles = []
+        self.slots = []
+        self.freeHandles = []
+
+    def __len__(self):
+        """ Returns the number of agents in the store.
+
+        Returns:
+            int: The number of agents.
+        """
+        return len(self.agents)
+
+    def addAgent(self, agent, coordinatesTuple):
+        """ Gives an agent the next free slot.
+
+        Args:
+            agent (Agent): The agent we are adding.
+            coordinatesTuple ((int, int) OR (int, int, int)): The position of the agent.
+
+        Returns:
+            PositionView: The view over the agent's slot.
+        """
+        slot = len(self.agents)
+
+        if (slot == len(self.positions)):
+            grown = numpy.zeros((2 * slot, self.positions.shape[1]), dtype=self.positions.dtype)
+            grown[:slot] = self.positions
+            self.positions = grown
+
+        self.positions[slot] = coordinatesTuple
+
+        if (len(self.freeHandles) > 0):
+            handle = self.freeHandles.pop()
+            self.slots[handle] = slot
+        else:
+            handle = len(self.slots)
+            self.slots.append(slot)
+
+        self.agents.append(agent)
+        self.handles.append(handle)
+
+        return self.viewClass(self, handle)
+
+    def setPosition(self, slot, coordinatesTuple):
+        """ Updates the position held in a slot.
+
+        Args:
+            slot (int): The slot of the agent.
+            coordinatesTuple ((int, int) OR (int, int, int)): The new position.
+        """
+        self.positions[slot] = coordinatesTuple
+
+    def getPosition(self, slot):
+        """ Returns the position held in a slot.
+
+        Args:
+            slot (int): The slot of the agent.
+
+        Returns:
+            (int, int) OR (int, int, int): The position.
+        """
+        return tuple(self.positions[slot].tolist())
+
+    def removeAgent(self, slot):
+        """ Frees a slot, moving the agent in the last slot into it.
+
+        Args:
+            slot (int): The slot we are freeing.
+        """
+        last = len(self.agents) - 1
+
+        self.freeHandles.append(self.handles[slot])
+
+        if (slot != last):
+            self.positions[slot] = self.positions[last]
+            self.agents[slot] = self.agents[last]
+            self.handles[slot] = self.handles[last]
+            self.slots[self.handles[slot]] = slot
+
+        self.agents.pop()
+        self.handles.pop()
+
+    def getPositions(self):
+        """ Returns the positions of all agents in the store.
+
+        Returns:
+            numpy.ndarray: An (agents, dimensions) integer array, row i holds the position of getAgents()[i]. This is
+            a view over the store and is only valid until the next agent is added.
+        """
+        return self.positions[:len(self.agents)]
+
+    def getAgents(self):
+        """ Returns all agents in the store in slot order.
+
+        Returns:
+            [Agent]: The agents, aligned with the rows of getPositions().
+        """
+        return self.agents
+
+
+class PositionView(object):
+    """ The behaviour shared by PositionView2D and PositionView3D. Coordinates are tuples of their values, a view
+    instead reads its values from a PositionArray slot and follows the agent as it moves: comparisons, iteration and
+    indexing all see its current position. Views change and are therefore not hashable, getCoordinates gives a key
+    for their current value.
+
+    Tuples cannot hold attributes in slots, the store and the agent's handle in it are therefore the items of the
+    tuple itself, keeping views as small as coordinates.
+    """
+    __slots__ = ()
+
+    __hash__ = None
+
+    def __new__(cls, positionArray, handle):
+        """ Creates the view.
+
+         Args:
+             positionArray (PositionArray): The store holding the position.
+             handle (int): The handle of the agent in the store.
+        """
+        return tuple.__new__(cls, (positionArray, handle))
+
+    @property
+    def positionArray(self):
+        """ PositionArray: The store holding the position.
+        """
+        return tuple.__getitem__(self, 0)
+
+    @property
+    def slot(self):
+        """ int: The current slot of the agent in the store.
+        """
+        positionArray = tuple.__getitem__(self, 0)
+
+        return positionArray.slots[tuple.__getitem__(self, 1)]
+
+    def getCoordinates(self):
+        """ Returns the current position.
+
+        Returns:
+            (int, int) OR (int, int, int): The numerical values of the coordinate.
+        """
+        return self.positionArray.getPosition(self.slot)
+
+    def __eq__(self, other):
+        if (isinstance(other, PositionView)):
+            other = other.getCoordinates()
+
+        return self.getCoordinates() == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __len__(self):
+        return self.dimensions
+
+    def __iter__(self):
+        return iter(self.getCoordinates())
+
+    def __contains__(self, value):
+        return value in self.getCoordinates()
+
+    def __getitem__(self, index):
+        return self.getCoordinates()[index]
+
+    def __getslice__(self, start, stop):
+        return self.getCoordinates()[start:stop]
+
+    def __repr__(self):
+        return repr(self.getCoordinates())
+
+    def __reduce__(self):
+        # a copy of a view is a plain coordinate holding its current value
+        return (self.coordinatesClass, self.getCoordinates())
+
+
+class PositionView2D(PositionView, Coordinates2D):
+    """ A Coordinates2D reading its values from a PositionArray slot, it follows the agent as it moves. See
+    PositionView.
+    """
+    __slots__ = ()
+
+    dimensions = 2
+    coordinatesClass = Coordinates2D
+
+    @property
+    def x(self):
+        return int(self.positionArray.positions[self.slot, 0])
+
+    @property
+    def y(self):
+        return int(self.positionArray.positions[self.slot, 1])
+
+
+class PositionView3D(PositionView, Coordinates3D):
+    """ A Coordinates3D reading its values from a PositionArray slot, it follows the agent as it moves. See
+    PositionView.
+    """
+    __slots__ = ()
+
+    dimensions = 3
+    coordinatesClass = Coordinates3D
+
+    @property
+    def x(self):
+        return int(self.positionArray.positions[self.slot, 0])
+
+    @property
+    def y(self):
+        return int(self.positionArray.positions[self.slot, 1])
+
+    @property
+    def z(self):
+        return int(self.positionArray.positions[self.slot, 2])
+
+
+class CellTiles(object):
+    """ Lazily allocated cell storage for very large ObjectGrids. The grid is split into square (or cubic) tiles of
+    tileSize cells along each axis. A tile is a dictionary (cell tuple => [agents]) created when one of its cells
+    is first occupied; cell lists are dropped as soon as they are empty and tiles as soon as they hold no cell.
+    Memory therefore follows the number of occupied cells rather than the volume of the grid.
+    """
+
+    def __init__(self, tileSize):
+        """ Creates an empty store.
+
+        Args:
+            tileSize (int): The number of cells along each axis of a tile.
+        """
+        if (tileSize < 1):
+            raise ValueError("The tile size must be at least 1")
+
+        self.tileSize = tileSize
+
+        # tile tuple => {cell tuple => [agents]}
+        self.tiles = {}
+
+    def getTileKey(self, coordinatesTuple):
+        """ Returns the tile a cell belongs to.
+
+        Args:
+            coordinatesTuple ((int, int) OR (int, int, int)): The position of the cell.
+
+        Returns:
+            (int, int) OR (int, int, int): The index of the tile.
+        """
+        tileSize = self.tileSize
+
+        return tuple(c // tileSize for c in coordinatesTuple)
+
+    def getCell(self, coordinatesTuple):
+        """ Returns the agents centred at a cell, without allocating anything for empty cells.
+
+        Args:
+            coordinatesTuple ((int, int) OR (int, int, int)): The position of the cell.
+
+        Returns:
+            [Agent]: The list held for the cell, a new empty list if the cell is empty.
+        """
+        tile = self.tiles.get(self.getTileKey(coordinatesTuple))
+
+        if (tile is None):
+            return []
+
+        return tile.get(coordinatesTuple, [])
+
+    def getOrCreateCell(self, coordinatesTuple):
+        """ Returns the list held for a cell, allocating the tile and the list when needed.
+
+        Args:
+            coordinatesTuple ((int, int) OR (int, int, int)): The position of the cell.
+
+        Returns:
+            [Agent]: The list held for the cell.
+        """
+        tile = self.tiles.setdefault(self.getTileKey(coordinatesTuple), {})
+
+        return tile.setdefault(coordinatesTuple, [])
+
+    def removeFromCell(self, coordinatesTuple, agent):
+        """ Removes an agent from a cell, freeing the cell and its tile once they are empty.
+
+        Args:
+            coordinatesTuple ((int, int) OR (int, int, int)): The position of the cell.
+            agent (Agent): The agent we are removing.
+        """
+        tileKey = self.getTileKey(coordinatesTuple)
+        tile = self.tiles[tileKey]
+        cell = tile[coordinatesTuple]
+
+        cell.remove(agent)
+
+        if (len(cell) == 0):
+            del tile[coordinatesTuple]
+
+            if (len(tile) == 0):
+                del self.tiles[tileKey]
+
+    def getTileCount(self):
+        """ Returns the number of allocated tiles.
+
+        Returns:
+            int: The number of tiles holding at least one agent.
+        """
+        return len(self.tiles)
+
+    def getOccupiedCells(self):
+        """ Returns all occupied cells, tile by tile.
+
+        Returns:
+            [((int, int) OR (int, int, int), [Agent])]: The position of every occupied cell with the agents
+            centred at it.
+        """
+        return [item for tile in self.tiles.values() for item in tile.items()]
+
+
+class AgentBuckets(object):
+    """ A spatial index of the agents on an ObjectGrid for distance queries. The grid is split into square (or cubic)
+    buckets of bucketSize cells along each axis and every bucket holds the agents centred in it, so that a query
+    only looks at the buckets around its centre rather than at every agent on the grid. The index is updated as
+    agents move.
+    """
+
+    def __init__(self, bucketSize, size, boundary):
+        """ Creates an empty index.
+
+        Args:
+            bucketSize (int): The number of cells along each axis of a bucket.
+            size ((int, int) OR (int, int, int)): The size of the grid.
+            boundary (str): The boundary mode of the grid, distances are periodic on wrapped grids.
+        """
+        if (bucketSize < 1):
+            raise ValueError("The bucket size must be at least 1")
+
+        self.bucketSize = bucketSize
+        self.size = tuple(size)
+        self.boundary = boundary
+
+        # bucket tuple => {agent id => (position tuple, agent)}
+        self.buckets = {}
+
+    def getBucketKey(self, coordinatesTuple):
+        """ Returns the bucket a position belongs to.
+
+        Args:
+            coordinatesTuple ((int, int) OR (int, int, int)): The position.
+
+        Returns:
+            (int, int) OR (int, int, int): The index of the bucket.
+        """
+        bucketSize = self.bucketSize
+
+        return tuple(c // bucketSize for c in coordinatesTuple)
+
+    def addAgent(self, agent, coordinatesTuple):
+        """ Adds an agent centred at a position.
+
+        Args:
+            agent (Agent): The agent we are adding.
+            coordinatesTuple ((int, int) OR (int, int, int)): Its position.
+        """
+        bucket = self.buckets.setdefault(self.getBucketKey(coordinatesTuple), {})
+        bucket[agent.getId()] = (coordinatesTuple, agent)
+
+    def removeAgent(self, agent, coordinatesTuple):
+        """ Removes an agent centred at a position, freeing its bucket once empty.
+
+        Args:
+            agent (Agent): The agent we are removing.
+            coordinatesTuple ((int, int) OR (int, int, int)): Its position.
+        """
+        bucketKey = self.getBucketKey(coordinatesTuple)
+        bucket = self.buckets[bucketKey]
+
+        del bucket[agent.getId()]
+
+        if (len(bucket) == 0):
+            del self.buckets[bucketKey]
+
+    def getAxisBuckets(self, axis, coordinate, reach):
+        """ Returns the buckets along an axis holding the positions within a given distance of a coordinate.
+
+        Args:
+            axis (int): The axis.
+            coordinate (int): The coordinate along the axis.
+            reach (int): The largest distance along the axis.
+
+        Returns:
+            [int]: The bucket indices along the axis, each once.
+        """
+        size = self.size[axis]
+        bucketSize = self.bucketSize
+
+        low = coordinate - reach
+        high = coordinate + reach
+
+        if (self.boundary != "wrap"):
+            # reflected positions fold back inside the clipped range
+            intervals = [(max(low, 0), min(high, size - 1))]
+        elif (high - low + 1 >= size):
+            intervals = [(0, size - 1)]
+        elif (low < 0):
+            intervals = [(0, high), (low + size, size - 1)]
+        elif (high >= size):
+            intervals = [(low, size - 1), (0, high - size)]
+        else:
+            intervals = [(low, high)]
+
+        buckets = set()
+
+        for start, stop in intervals:
+            buckets.update(range(start // bucketSize, stop // bucketSize + 1))
+
+        return sorted(buckets)
+
+    def getBucketsWithin(self, coordinatesTuple, reach):
+        """ Returns the keys of all buckets holding positions within a given Chebyshev distance of a position, empty
+        buckets included.
+
+        Args:
+            coordinatesTuple ((int, int) OR (int, int, int)): The position.
+            reach (int): The largest distance along any axis.
+
+        Returns:
+            [(int, int)] OR [(int, int, int)]: The bucket keys.
+        """
+        axes = [self.getAxisBuckets(axis, c, reach) for axis, c in enumerate(coordinatesTuple)]
+
+        return list(itertools.product(*axes))
+
+    def getEntries(self, bucketKeys):
+        """ Returns the agents held by some buckets.
+
+        Args:
+            bucketKeys ([tuple]): The bucket keys.
+
+        Returns:
+            [((int, int) OR (int, int, int), Agent)]: The position of every agent in the buckets with the agent.
+        """
+        buckets = self.buckets
+        entries = []
+
+        for bucketKey in bucketKeys:
+            bucket = buckets.get(bucketKey)
+
+            if (bucket):
+                entries.extend(bucket.values())
+
+        return entries
+
+    def getDistances(self, coordinatesTuple, positions, metric):
+        """ Calculates the distances between a position and many others.
+
+        Args:
+            coordinatesTuple ((int, int) OR (int, int, int)): The position.
+            positions ([tuple]): The other positions.
+            metric (str): "euclidean", "manhattan" or "chebyshev".
+
+        Returns:
+            numpy.ndarray: The distances, aligned with positions.
+        """
+        differences = numpy.abs(numpy.array(positions, dtype=float).reshape(len(positions), len(self.size)) -
+                                coordinatesTuple)
+
+        if (self.boundary == "wrap"):
+            # the shortest way round the grid
+            differences = numpy.minimum(differences, numpy.array(self.size) - differences)
+
+        if (metric == "euclidean"):
+            return numpy.sqrt((differences ** 2).sum(axis=1))
+        elif (metric == "manhattan"):
+            return differences.sum(axis=1)
+
+        return differences.max(axis=1)
+
+
+class ObjectGrid(Grid):
+    __metaclass__ = abc.ABCMeta
+
+
+    def __init__(self, gridName, positionStorage="objects", cellStorage="dense", tileSize=16, bucketSize=8,
+                 boundary="clip"):
+        """ Constructor method, sets the name of the grid and initializes the grid with no agents.
+
+        Args:
+
+            gridName (str): The name of the grid.
+            positionStorage (str): "objects" to keep a Coordinates object per agent, "array" to keep all positions
+            in a PositionArray and give agents views over it.
+            cellStorage (str): "dense" to allocate a list for every cell up front, "tiled" to allocate cells lazily
+            in tiles (see CellTiles). Tiled grids keep no agent counts array, counts are then taken from the cells
+            and getGrid returns None.
+            tileSize (int): The number of cells along each axis of a tile when cells are tiled.
+            bucketSize (int): The number of cells along each axis of a bucket of the index used by distance queries
+            (see AgentBuckets), the index is built on the first query.
+            boundary (str): "clip", "wrap" or "reflect", see Grid.
+        """
+        # All agents on the grid, agent id => (Coordinates, agent), in the order they were first placed
+        self.agentRegistry = OrderedDict()
+
+        if (positionStorage == "objects"):
+            self.positionArray = None
+        elif (positionStorage == "array"):
+            self.positionArray = PositionArray(self.positionViewClass)
+        else:
+            raise ValueError("Unknown position storage: " + str(positionStorage))
+
+        if (cellStorage == "dense"):
+            self.cellTiles = None
+        elif (cellStorage == "tiled"):
+            self.cellTiles = CellTiles(int(tileSize))
+        else:
+            raise ValueError("Unknown cell storage: " + str(cellStorage))
+
+        # Agents with a radius larger than 1 span multiple grid cells. Every cell such an agent reaches into, other
+        # than the one it is centred on, is recorded here (cell tuple => [agents]) so that getAtPos only has to
+        # look at the agents actually covering a cell instead of checking every agent on the grid.
+        self.spanIndex = {}
+
+        # The order in which agents were first placed on the grid (agent id => int), agents at a position are
+        # always returned in this order.
+        self.agentOrder = {}
+        self.agentCounter = 0
+
+        # The index used by getAgentsWithinDistance and getNearestAgents, None until first needed
+        self.bucketSize = int(bucketSize)
+        self.agentBuckets = None
+
+        # Called whenever an agent moves, see addMoveListener
+        self.moveListeners = []
+
+        super(ObjectGrid, self).__init__(gridName, boundary)
+
+    @property
+    def gridAgents(self):
+        """ Returns all agents on the grid together with their position, in the order they were first placed. This
+        is built from the agent registry on every access and kept for compatibility, use agentRegistry when looking
+        up a single agent.
+
+        Returns:
+            [(Coordinates, Agent)]: A list of tuples where the first element is the position of the agent and the
+            second element is the agent itself.
+        """
+        return list(self.agentRegistry.values())
+
+    def registerAgentOrder(self, agent):
+        """ Remembers the order in which an agent was first placed on the grid.
+
+        Args:
+            agent (Agent): The agent being placed on the grid for the first time.
+        """
+        self.agentOrder[agent.getId()] = self.agentCounter
+        self.agentCounter += 1
+
+    def addToCell(self, cell, agent):
+        """ Adds an agent to the list of agents held by a cell, keeping the list sorted by the order in which agents
+        were first placed on the grid.
+
+        Args:
+            cell ([Agent]): The list of agents held by the cell.
+            agent (Agent): The agent we are adding.
+        """
+        agentOrder = self.agentOrder
+        position = agentOrder[agent.getId()]
+
+        i = len(cell)
+
+        while (i > 0 and agentOrder[cell[i - 1].getId()] > position):
+            i -= 1
+
+        cell.insert(i, agent)
+
+    def getOrCreateCell(self, coordinatesTuple):
+        """ Returns the list of agents centred at a position, allocating it first when cells are tiled.
+
+        Args:
+            coordinatesTuple ((int, int) OR (int, int, int)): The position on the grid.
+
+        Returns:
+            [Agent]: The list held by the grid for such position.
+        """
+        if (self.cellTiles is not None):
+            return self.cellTiles.getOrCreateCell(coordinatesTuple)
+
+        return self.getCell(coordinatesTuple)
+
+    def removeFromCell(self, coordinatesTuple, agent):
+        """ Removes an agent from the list of agents centred at a position.
+
+        Args:
+            coordinatesTuple ((int, int) OR (int, int, int)): The position on the grid.
+            agent (Agent): The agent we are removing.
+        """
+        if (self.cellTiles is not None):
+            self.cellTiles.removeFromCell(coordinatesTuple, agent)
+        else:
+            self.getCell(coordinatesTuple).remove(agent)
+
+    def allocateCells(self):
+        """ Creates the cell storage and agent counts once the size of the grid is known, called by the
+        constructors.
+        """
+        if (self.cellTiles is not None):
+            self.grid = None
+            self.agentCounts = None
+            return
+
+        # creating the general grid object, nested lists with a list of agents per position
+        def allocate(sizes):
+            if (len(sizes) == 0):
+                return []
+
+            return [allocate(sizes[1:]) for i in range(sizes[0])]
+
+        self.grid = allocate(self.getSize())
+
+        # the number of agents covering each position, kept up to date as agents move
+        self.agentCounts = numpy.zeros(self.getSize(), dtype=numpy.int32)
+
+    def indexSpan(self, agent, coordinatesTuple):
+        """ Records all cells an agent with radius > 1 centred at the given position reaches into.
+
+        Args:
+            agent (Agent): The agent we are indexing.
+            coordinatesTuple ((int, int) OR (int, int, int)): The position the agent is centred at.
+        """
+        for cell in self.getSpannedCells(coordinatesTuple, agent.getRadius()):
+            self.spanIndex.setdefault(cell, []).append(agent)
+
+    def unindexSpan(self, agent, coordinatesTuple):
+        """ Removes an agent centred at the given position from all the cells it reaches into.
+
+        Args:
+            agent (Agent): The agent we are removing from the index.
+            coordinatesTuple ((int, int) OR (int, int, int)): The position the agent is centred at.
+        """
+        for cell in self.getSpannedCells(coordinatesTuple, agent.getRadius()):
+            spanning = self.spanIndex[cell]
+            spanning.remove(agent)
+
+            if (len(spanning) == 0):
+                del self.spanIndex[cell]
+
+    def placeAgent(self, coordinates, coordinatesTuple, agent):
+        """ Registers an agent at a position already known to be on the grid and moves it between cells. Agent counts
+        are left to the caller.
+
+        Args:
+            coordinates (Coordinates): The position the agent is moved to.
+            coordinatesTuple ((int, int) OR (int, int, int)): The same position as a tuple.
+            agent (Agent): The agent we are moving.
+
+        Returns:
+            (int, int) OR (int, int, int): The previous position of the agent, None if it wasn't on the grid.
+        """
+        # We first check if the agent is known to the grid
+        agentId = agent.getId()
+        registered = self.agentRegistry.get(agentId)
+
+        coordinatesOld = None
+
+        if (registered is not None):
+            # from the registry, we get its current position
+            coordinatesOld = registered[0].getCoordinates()
+
+        if (self.positionArray is None):
+            # a fresh copy, the caller's coordinates may be a view following the agent on another grid
+            coordinates = self.coordinatesClass(*coordinatesTuple)
+
+            # Storing the agent's position for this grid in the agent itself too
+            agent.gridPositions[self.gridName] = coordinates
+
+            # registering the new position, known agents keep their place in the registry
+            self.agentRegistry[agentId] = (coordinates, agent)
+
+        elif (registered is None):
+            # the agent and the registry share a view over the agent's slot, which follows it from now on
+            view = self.positionArray.addAgent(agent, coordinatesTuple)
+
+            agent.gridPositions[self.gridName] = view
+            self.agentRegistry[agentId] = (view, agent)
+
+        else:
+            self.positionArray.setPosition(registered[0].slot, coordinatesTuple)
+
+        if (registered is None):
+            # The agent is not known to the system, let's make them known
+            self.registerAgentOrder(agent)
+
+        self.moveBetweenCells(agent, coordinatesOld, coordinatesTuple)
+
+        return coordinatesOld
+
+    def moveBetweenCells(self, agent, coordinatesOld, coordinatesNew):
+        """ Moves a registered agent from the cell, span index and buckets entries of a position to those of another.
+
+        Args:
+            agent (Agent): The agent we are moving.
+            coordinatesOld ((int, int) OR (int, int, int)): Its previous position, None if it wasn't on the grid.
+            coordinatesNew ((int, int) OR (int, int, int)): Its new position.
+        """
+        # only agents with radius > 1 reach into other cells
+        spanning = agent.getRadius() > 1
+
+        if (coordinatesOld is not None):
+            # physically removing the agent from the old position on the grid
+            self.removeFromCell(coordinatesOld, agent)
+
+            if (spanning):
+                self.unindexSpan(agent, coordinatesOld)
+
+            if (self.agentBuckets is not None):
+                self.agentBuckets.removeAgent(agent, coordinatesOld)
+
+        # ...and physically adding it to the new position on the grid
+        self.addToCell(self.getOrCreateCell(coordinatesNew), agent)
+
+        if (spanning):
+            self.indexSpan(agent, coordinatesNew)
+
+        if (self.agentBuckets is not None):
+            self.agentBuckets.addAgent(agent, coordinatesNew)
+
+    def unregisterAgent(self, agent):
+        """ Removes an agent from the registry and, when positions are stored in an array, frees its slot. The agent
+        keeps a plain copy of its last position.
+
+        Args:
+            agent (Agent): The agent we are removing.
+
+        Returns:
+            (int, int) OR (int, int, int): The last position of the agent.
+        """
+        coordinates = self.agentRegistry.pop(agent.getId())[0]
+        coordinatesTuple = coordinates.getCoordinates()
+
+        if (self.agentBuckets is not None):
+            self.agentBuckets.removeAgent(agent, coordinatesTuple)
+
+        if (self.positionArray is not None):
+            self.positionArray.removeAgent(coordinates.slot)
+            agent.gridPositions[self.gridName] = self.coordinatesClass(*coordinatesTuple)
+
+        del self.agentOrder[agent.getId()]
+
+        return coordinatesTuple
+
+    def addMoveListener(self, listener):
+        """ Registers a function called whenever an agent is placed on, moved on or removed from the grid, Eg: to
+        wake the agents around it (see ActiveSchedule.watchGrid).
+
+        Args:
+            listener (callable): Called as listener(grid, agent, coordinatesOld, coordinatesNew) with position tuples,
+            coordinatesOld is None when the agent arrives on the grid and coordinatesNew when it leaves.
+        """
+        self.moveListeners.append(listener)
+
+    def notifyMove(self, agent, coordinatesOld, coordinatesNew):
+        """ Calls the move listeners once a move is complete, see addMoveListener.
+
+        Args:
+            agent (Agent): The agent which moved.
+            coordinatesOld ((int, int) OR (int, int, int)): Its previous position, None if it arrived on the grid.
+            coordinatesNew ((int, int) OR (int, int, int)): Its new position, None if it left the grid.
+        """
+        for listener in self.moveListeners:
+            listener(self, agent, coordinatesOld, coordinatesNew)
+
+    def getPositionArray(self):
+        """ Returns the positions of all agents on the grid as a single array, for vectorized analysis. When
+        positions are stored in an array this is a view over the store and costs nothing, otherwise it is built
+        from the registry.
+
+        Returns:
+            numpy.ndarray: An (agents, dimensions) integer array, row i holds the position of
+            getPositionArrayAgents()[i].
+        """
+        if (self.positionArray is not None):
+            return self.positionArray.getPositions()
+
+        positions = [c.getCoordinates() for c, a in self.agentRegistry.values()]
+
+        return numpy.array(positions, dtype=numpy.int32).reshape(len(positions), len(self.getSize()))
+
+    def getPositionArrayAgents(self):
+        """ Returns the agents matching the rows of getPositionArray().
+
+        Returns:
+            [Agent]: The agents on the grid.
+        """
+        if (self.positionArray is not None):
+            return self.positionArray.getAgents()
+
+        return [a for c, a in self.agentRegistry.values()]
+
+    def moveAgentsToPositions(self, agents, positions):
+        """ Moves many agents at once, see ObjectGrid2D.moveAgents and ObjectGrid3D.moveAgents.
+
+        Bringing positions back onto the grid, finding the agents whose position changed, storing positions in
+        array mode and updating the counts of agents with radius 1 are vectorized. Cell lists, the span index, the
+        buckets and, in objects mode, the Coordinates held by the registry are still updated one agent at a time,
+        only for the agents which moved, and only those are passed to the move listeners. Looking up where agents
+        are costs one registry access per agent, except in array mode when agents are exactly
+        getPositionArrayAgents(), which is then free.
+
+        Args:
+            agents ([Agent]): The agents we want to move, each at most once.
+            positions ([numpy.ndarray]): One array of positions per axis, aligned with agents.
+
+        Returns:
+            (numpy.ndarray, ...): The positions the agents were moved to, one integer array per axis.
+        """
+        # Truncating like the coordinates arithmetic does, then bringing agents back onto the grid
+        clamped = self.mapPositionArrays(positions)
+
+        if (len(agents) == 0):
+            return clamped
+
+        positionsNew = numpy.column_stack(clamped)
+        positionArray = self.positionArray
+
+        if (positionArray is not None and len(agents) == len(positionArray) and agents == positionArray.agents):
+            # moving every agent in slot order, Eg: after updating getPositionArray()
+            known = numpy.ones(len(agents), dtype=bool)
+            positionsOld = positionArray.getPositions().copy()
+            slots = numpy.arange(len(agents))
+        else:
+            entries = list(map(self.agentRegistry.get, map(methodcaller("getId"), agents)))
+            known = numpy.fromiter((e is not None for e in entries), dtype=bool, count=len(entries))
+
+            # the current positions of known agents, unknown ones are placed whatever they are set to
+            positionsOld = numpy.zeros_like(positionsNew)
+
+            if (positionArray is not None):
+                slots = numpy.array([e[0].slot if e is not None else 0 for e in entries], dtype=numpy.intp)
+                positionsOld[known] = positionArray.positions[slots[known]]
+            elif (known.any()):
+                # coordinates are tuples, chaining them is much cheaper than converting a list of them
+                registered = [e[0] for e in entries if e is not None]
+                dimensions = positionsNew.shape[1]
+                values = numpy.fromiter(itertools.chain.from_iterable(registered), dtype=positionsNew.dtype,
+                                        count=len(registered) * dimensions)
+
+                positionsOld[known] = values.reshape(-1, dimensions)
+
+        changed = ~known | (positionsOld != positionsNew).any(axis=1)
+
+        if (positionArray is not None):
+            moving = known & changed
+            positionArray.positions[slots[moving]] = positionsNew[moving]
+
+        indices = numpy.flatnonzero(changed)
+
+        if (len(indices) == 0):
+            return clamped
+
+        movedAgents = [agents[i] for i in indices.tolist()]
+        movedKnown = known[indices]
+        rowsOld = positionsOld[indices]
+        rowsNew = positionsNew[indices]
+
+        for agent, isKnown, coordinatesOld, coordinatesTuple in zip(movedAgents, movedKnown.tolist(),
+                                                                    map(tuple, rowsOld.tolist()),
+                                                                    map(tuple, rowsNew.tolist())):
+            if (not isKnown):
+                self.placeAgent(self.coordinatesClass(*coordinatesTuple), coordinatesTuple, agent)
+                continue
+
+            if (positionArray is None):
+                coordinates = self.coordinatesClass(*coordinatesTuple)
+
+                agent.gridPositions[self.gridName] = coordinates
+                self.agentRegistry[agent.getId()] = (coordinates, agent)
+
+            self.moveBetweenCells(agent, coordinatesOld, coordinatesTuple)
+
+        # Agents with radius 1 only count in a single cell, their counts are updated together
+        radii = numpy.fromiter(map(methodcaller("getRadius"), movedAgents), dtype=int, count=len(movedAgents))
+        single = radii <= 1
+
+        if (self.agentCounts is not None):
+            numpy.subtract.at(self.agentCounts, tuple(rowsOld[single & movedKnown].T), 1)
+            numpy.add.at(self.agentCounts, tuple(rowsNew[single].T), 1)
+
+        for i in numpy.flatnonzero(~single).tolist():
+            if (movedKnown[i]):
+                self.updateAgentCounts(tuple(rowsOld[i].tolist()), radii[i], -1)
+
+            self.updateAgentCounts(tuple(rowsNew[i].tolist()), radii[i], 1)
+
+        if (len(self.moveListeners) > 0):
+            for agent, isKnown, coordinatesOld, coordinatesTuple in zip(movedAgents, movedKnown.tolist(),
+                                                                        rowsOld.tolist(), rowsNew.tolist()):
+                self.notifyMove(agent, tuple(coordinatesOld) if isKnown else None, tuple(coordinatesTuple))
+
+        return clamped
+
+    def getIndexedAtPos(self, cell, coordinatesTuple):
+        """ Merges the agents centred at a cell with those reaching into it from neighbouring cells.
+
+        Args:
+            cell ([Agent]): The list of agents centred at the cell.
+            coordinatesTuple ((int, int) OR (int, int, int)): The position of the cell.
+
+        Returns:
+            [agent] : A list of agents containing all agents at such position.
+        """
+        agentsAtPos = list(cell)
+
+        spanning = self.spanIndex.get(coordinatesTuple)
+
+        if (spanning):
+            agentOrder = self.agentOrder
+
+            agentsAtPos.extend(spanning)
+            agentsAtPos.sort(key=lambda a: agentOrder[a.getId()])
+
+        return agentsAtPos
+
+    def updateAgentCounts(self, coordinatesTuple, radius, increment):
+        """ Adds an increment to the agent count of every cell covered by an agent of a given radius centred at a
+        given position.
+
+        Args:
+            coordinatesTuple ((int, int) OR (int, int, int)): The position the agent is centred at.
+            radius (int): The radius of the agent.
+            increment (int): 1 when an agent is placed, -1 when it leaves.
+        """
+        if (self.agentCounts is None):
+            return
+
+        self.agentCounts[self.getFootprintIndex(coordinatesTuple, radius)] += increment
+
+    def getFootprintIndex(self, coordinatesTuple, radius):
+        """ Returns an index into an array shaped like the grid selecting every cell covered by an agent of a given
+        radius centred at a given position, each cell once.
+
+        Args:
+            coordinatesTuple ((int, int) OR (int, int, int)): The position the agent is centred at.
+            radius (int): The radius of the agent.
+
+        Returns:
+            tuple: One slice per axis when clipping, an open mesh of positions (see numpy.ix_) otherwise.
+        """
+        span = max(radius - 1, 0)
+
+        if (self.boundary == "clip"):
+            return tuple(slice(max(c - span, 0), min(c + span, size - 1) + 1)
+                         for c, size in zip(coordinatesTuple, self.getSize()))
+
+        return numpy.ix_(*[self.getAxisNeighbours(axis, c, span) for axis, c in enumerate(coordinatesTuple)])
+
+    def getAgentCounts(self):
+        """ Returns the number of agents at each position, agents with radius > 1 are counted in every cell they
+        span. The array is updated in place as agents move and should not be modified. When cells are tiled there
+        is no such array and a new one is built from the agent registry on every call.
+
+        Returns:
+            numpy.ndarray: An integer array with the same shape as the grid.
+        """
+        if (self.agentCounts is not None):
+            return self.agentCounts
+
+        counts = numpy.zeros(self.getSize(), dtype=numpy.int32)
+
+        for coordinates, agent in self.agentRegistry.values():
+            counts[self.getFootprintIndex(coordinates.getCoordinates(), agent.getRadius())] += 1
+
+        return counts
+
+    def getWindowCounts(self, window):
+        """ Returns the number of agents at each position of a box of the grid.
+
+        Args:
+            window ((slice, ...)): One slice per axis, within the grid.
+
+        Returns:
+            numpy.ndarray: The agent counts of the box, as a new array.
         """
-        return self.grid
+        if (self.agentCounts is not None):
+            return self.agentCounts[window].copy()
 
-    def getSize(self):
-        """ Returns the size of the grid
+        # tiled cells, counting the agents covering every cell of the (small) box
+        ranges = [range(w.start, w.stop) for w in window]
+        counts = numpy.zeros([len(r) for r in ranges], dtype=numpy.int32)
 
-        Returns:
+        for cell in itertools.product(*ranges):
+            index = tuple(c - w.start for c, w in zip(cell, window))
+            counts[index] = len(self.cellTiles.getCell(cell)) + len(self.spanIndex.get(cell, ()))
 
-            (int, int) : A tuple containing the x-size and y-size of the grid.
-        """
-        return (self.xsize, self.ysize)
+        return counts
 
-    def setAllGridValues(self, value):
-        """ This method allows to set all grid positions to a given value.
+    def getCellCounts(self, cells):
+        """ Returns the number of agents covering some cells.
 
         Args:
+            cells ([(int, int)] OR [(int, int, int)]): The cells, within the grid.
 
-            value (double): The value to which all positions will be set.
+        Returns:
+            numpy.ndarray: The agent counts, aligned with cells.
         """
-        newGrid = numpy.ones((self.xsize, self.ysize))
-        newGrid = value * newGrid
+        if (self.agentCounts is not None):
+            return self.agentCounts[tuple(zip(*cells))]
 
-        self.grid = newGrid
+        return numpy.array([len(self.getCell(c)) + len(self.spanIndex.get(c, ())) for c in cells], dtype=numpy.int32)
 
-    def setGridValue(self, coordinates, value):
-        """ Sets the value of a particular position.
+    def isFootprintFree(self, coordinates, radius, agent=None):
+        """ Checks if an agent of a given radius could be centred at a position without sharing any cell with
+        another agent, Eg: before placing a large cell cluster. This reads the agent counts over the footprint, no
+        agent is looked at.
 
         Args:
-            coordinate (Coordinates2D): The position we are setting the value for.
-            value (double): The value we are setting.
+            coordinates (Coordinates): The position the agent would be centred at, within the grid.
+            radius (int): The radius of the agent.
+            agent (Agent): An agent already on the grid whose own footprint should not count, Eg: when checking
+            whether it can move.
+
+        Returns:
+            bool: True if no other agent covers any cell of the footprint.
         """
-        coordinates = coordinates.getCoordinates()
-        self.grid[coordinates[0], coordinates[1]] = value
+        coordinatesTuple = coordinates.getCoordinates()
 
-    def getGridValue(self, coordinates):
-        """ Returns the value of a particular position.
+        if (agent is None or agent.getId() not in self.agentRegistry):
+            if (self.agentCounts is not None):
+                return not self.agentCounts[self.getFootprintIndex(coordinatesTuple, radius)].any()
 
-        Args:
+            cells = [coordinatesTuple] + self.getSpannedCells(coordinatesTuple, radius)
 
-            coordinate (Coordinates2D): The position we are retrieving the value for.
+            return not self.getCellCounts(cells).any()
 
-        Returns:
+        # the agent covers each cell of its own footprint once
+        agentTuple = self.agentRegistry[agent.getId()][0].getCoordinates()
+        own = set([agentTuple] + self.getSpannedCells(agentTuple, agent.getRadius()))
 
-            double: The value at such position.
-        """
-        coordinates = coordinates.getCoordinates()
-        return self.grid[coordinates[0], coordinates[1]]
+        cells = [coordinatesTuple] + self.getSpannedCells(coordinatesTuple, radius)
+        allowed = numpy.array([c in own for c in cells], dtype=numpy.int32)
 
-    def getMooreNeigh(self, coordinates):
-        """ Returns the values all moore neighbourhood (radius 1) coordinates with respect to a given
-        coordinate.
+        return bool((self.getCellCounts(cells) <= allowed).all())
 
-        Args:
+    def getPopulatedMooreNeighTuple(self, coordinatesTuple, mostPopulated):
+        """ Finds the moore neighbour with the fewest or most agents straight from the agent counts. Ties are broken
+        at random.
 
-            coordinates (Coordinates2D): The coordinates object pointing to the center of the moore
-            neighbourhood.
+        Args:
+            coordinatesTuple ((int, int) OR (int, int, int)): The centre of the moore neighbourhood.
+            mostPopulated (bool): True to look for the most populated neighbour, False for the least populated.
 
         Returns:
-
-            [(Coordinates => Double)]: A list of tuples where the first element is a coordinate and the second
-            element is the value at such coordinate.
+            (int, int) OR (int, int, int): The position of the chosen neighbour.
         """
-        mooreNeigh = coordinates.getMooreNeigh(self)
+        if (self.boundary != "clip"):
+            return self.getPopulatedNeighbourTuple(coordinatesTuple, mostPopulated)
 
-        neigh = []
+        lower = [max(c - 1, 0) for c in coordinatesTuple]
+        window = tuple(slice(low, min(c + 1, size - 1) + 1)
+                       for low, c, size in zip(lower, coordinatesTuple, self.getSize()))
 
-        for m in mooreNeigh:
-            neigh.append((m, self.getGridValue(m)))
+        counts = self.getWindowCounts(window).astype(float)
 
-        return neigh
+        # the centre is not part of its own moore neighbourhood
+        centre = tuple(c - low for c, low in zip(coordinatesTuple, lower))
 
+        if (mostPopulated):
+            counts[centre] = -numpy.inf
+            best = counts.max()
+        else:
+            counts[centre] = numpy.inf
+            best = counts.min()
 
-class NumericalGrid3D(NumericalGrid):
-    """ An implementation of a 3D Numerical Grid
-    """
+        candidates = numpy.argwhere(counts == best)
+        chosen = candidates[randrange(len(candidates))]
 
-    def __init__(self, xsize, ysize, zsize, gridName):
-        """ Constructor method, sets the size of the grid and the grid's name, by default all grid values
-        are set to zero.
+        return tuple(int(low + offset) for low, offset in zip(lower, chosen))
 
-        Args:
+    def getNeighbourhood(self, coordinates, radius=1, kind="moore"):
+        """ Returns all neighbours of a position within a given radius and the agents at each of them.
 
-            xsize (int): The width of the grid.
-            ysize (int): The length of the grid.
-            zsize (int): The height of the grid.
-            name (string): The name of the grid.
+        Args:
+            coordinates (Coordinates): The centre of the neighbourhood.
+            radius (int): The largest distance of a neighbour.
+            kind (str): "moore", "vonneumann" or "euclidean", see Grid.getNeighbourhoodPositions.
 
-                OR
-            listOfParameters (list): A list of form [(int) xsize, (int) ysize, (int) zsize, (string) name]
+        Returns:
+            [(Coordinates, [Agent])] : A list of tuples where the first element is a coordinate and the second
+            element is the list of agents at such position.
         """
-        super(NumericalGrid3D, self).__init__(gridName)
-        self.xsize = xsize
-        self.ysize = ysize
-        self.zsize = zsize
-        self.grid = numpy.zeros((xsize, ysize, zsize))
+        coordinatesClass = self.coordinatesClass
+        neigh = []
 
-    def getGrid(self):
-        """ Returns the grid object
+        for p in self.getNeighbourhoodPositions(coordinates.getCoordinates(), radius, kind).tolist():
+            p = tuple(p)
+            neigh.append((coordinatesClass(*p), self.getIndexedAtPos(self.getCell(p), p)))
 
-        Returns:
+        return neigh
 
-            (grid): The current object.
-        """
-        return self.grid
+    def getAgentsInNeighbourhood(self, coordinates, radius=1, kind="moore"):
+        """ Returns the agents found at the neighbours of a position within a given radius, Eg: for sensing. Empty
+        neighbours are skipped using the agent counts and an agent spanning several neighbours is returned once.
 
-    def getSize(self):
-        """ Returns the size of the grid
+        Args:
+            coordinates (Coordinates): The centre of the neighbourhood.
+            radius (int): The largest distance of a neighbour.
+            kind (str): "moore", "vonneumann" or "euclidean", see Grid.getNeighbourhoodPositions.
 
         Returns:
+            [Agent]: The agents, in the order they were first placed on the grid.
+        """
+        positions = self.getNeighbourhoodPositions(coordinates.getCoordinates(), radius, kind)
 
-            (int, int, int) : A tuple containing the x-size, y-size and z-size of the grid.
+        if (self.agentCounts is not None):
+            positions = positions[self.agentCounts[tuple(positions.T)] > 0]
+
+        agents = {}
+
+        for p in positions.tolist():
+            p = tuple(p)
+
+            for agent in self.getIndexedAtPos(self.getCell(p), p):
+                agents[agent.getId()] = agent
+
+        agentOrder = self.agentOrder
+
+        return sorted(agents.values(), key=lambda a: agentOrder[a.getId()])
+
+    def getAgentBuckets(self):
+        """ Returns the index used by distance queries, building it from the agent registry the first time. From
+        then on it is kept up to date as agents move.
+
+        Returns:
+            AgentBuckets: The index.
         """
-        return (self.xsize, self.ysize, self.zsize)
+        if (self.agentBuckets is None):
+            agentBuckets = AgentBuckets(self.bucketSize, self.getSize(), self.boundary)
 
-    def setAllGridValues(self):
-        """ This method allows to set all grid positions to a given value.
+            for coordinates, agent in self.agentRegistry.values():
+                agentBuckets.addAgent(agent, coordinates.getCoordinates())
+
+            self.agentBuckets = agentBuckets
+
+        return self.agentBuckets
+
+    def getAgentsWithinDistance(self, coordinates, distance, metric="euclidean", exclude=None):
+        """ Returns the agents whose position lies within a given distance of a position. Only the buckets around
+        the position are searched (see AgentBuckets), so the cost follows the number of agents nearby rather than
+        the population of the grid. Distances are measured between positions, the radius of agents is ignored, and
+        go the shortest way round wrapped grids.
 
         Args:
+            coordinates (Coordinates): The position.
+            distance (double): The largest distance, inclusive.
+            metric (str): "euclidean", "manhattan" or "chebyshev".
+            exclude (Agent): An agent to leave out, Eg: the one issuing the query.
 
-            value (double): The value to which all positions will be set.
+        Returns:
+            [Agent]: The agents, in the order they were first placed on the grid.
         """
-        pass
+        if (metric not in ("euclidean", "manhattan", "chebyshev")):
+            raise ValueError("Unknown metric: " + str(metric))
 
-    def setGridValue(self, coordinates, value):
-        """ Sets the value of a particular position.
+        if (distance < 0):
+            return []
+
+        coordinatesTuple = coordinates.getCoordinates()
+        agentBuckets = self.getAgentBuckets()
+
+        entries = [e for e in agentBuckets.getEntries(agentBuckets.getBucketsWithin(coordinatesTuple, int(distance)))
+                   if e[1] is not exclude]
+
+        if (len(entries) == 0):
+            return []
+
+        distances = agentBuckets.getDistances(coordinatesTuple, [p for p, a in entries], metric)
+
+        agentOrder = self.agentOrder
+
+        return sorted([a for (p, a), d in zip(entries, distances.tolist()) if d <= distance],
+                      key=lambda a: agentOrder[a.getId()])
+
+    def getNearestAgents(self, coordinates, k, metric="euclidean", exclude=None):
+        """ Returns the k agents closest to a position. Buckets are searched in growing rings around the position
+        until no agent outside them can be closer than the k-th found, see getAgentsWithinDistance.
 
         Args:
-            coordinate (Coordinates3D): The position we are setting the value for.
-            value (double): The value we are setting.
+            coordinates (Coordinates): The position.
+            k (int): The number of agents wanted.
+            metric (str): "euclidean", "manhattan" or "chebyshev".
+            exclude (Agent): An agent to leave out, Eg: the one issuing the query.
+
+        Returns:
+            [Agent]: Up to k agents, closest first. Agents at the same distance are in the order they were first
+            placed on the grid.
         """
-        coordinates = coordinates.getCoordinates()
-        self.grid[coordinates[0], coordinates[1], coordinates[2]] = value
+        if (metric not in ("euclidean", "manhattan", "chebyshev")):
+            raise ValueError("Unknown metric: " + str(metric))
 
-    def getGridValue(self, coordinates):
-        """ Returns the value of a particular position.
+        if (k <= 0):
+            return []
 
-        Args:
+        coordinatesTuple = coordinates.getCoordinates()
+        agentBuckets = self.getAgentBuckets()
+        bucketSize = self.bucketSize
+        largestSize = max(self.getSize())
 
-            coordinate (Coordinates3D): The position we are retrieving the value for.
+        visited = set()
+        entries = []
 
-        Returns:
+        ring = 0
 
-            double: The value at such position.
-        """
-        coordinates = coordinates.getCoordinates()
-        return self.grid[coordinates[0], coordinates[1], coordinates[2]]
+        while (True):
+            # every agent outside the buckets searched so far is further than reach along some axis
+            reach = ring * bucketSize
 
-    def getMooreNeigh(self, coordinates):
-        """ Returns the values all moore neighbourhood (radius 1) coordinates with respect to a given
-        coordinate.
+            bucketKeys = [b for b in agentBuckets.getBucketsWithin(coordinatesTuple, reach) if b not in visited]
+            visited.update(bucketKeys)
 
-        Args:
+            entries.extend(e for e in agentBuckets.getEntries(bucketKeys) if e[1] is not exclude)
 
-            coordinates (Coordinates3D): The coordinates object pointing to the center of the moore
-            neighbourhood.
+            if (reach >= largestSize):
+                break
 
-        Returns:
+            if (len(entries) >= k):
+                distances = agentBuckets.getDistances(coordinatesTuple, [p for p, a in entries], metric)
 
-            [(Coordinates => Double)]: A list of tuples where the first element is a coordinate and the second
-            element is the value at such coordinate.
+                if (numpy.partition(distances, k - 1)[k - 1] <= reach):
+                    break
+
+            ring += 1
+
+        if (len(entries) == 0):
+            return []
+
+        distances = agentBuckets.getDistances(coordinatesTuple, [p for p, a in entries], metric).tolist()
+
+        agentOrder = self.agentOrder
+        ranked = sorted(zip(distances, entries), key=lambda de: (de[0], agentOrder[de[1][1].getId()]))
+
+        return [a for d, (p, a) in ranked[:k]]
+
+    def getPopulatedNeighbourTuple(self, coordinatesTuple, mostPopulated):
+        """ Finds the moore neighbour with the fewest or most agents among the neighbours given by the boundary
+        mode. Ties are broken at random.
+
+        Args:
+            coordinatesTuple ((int, int) OR (int, int, int)): The centre of the moore neighbourhood.
+            mostPopulated (bool): True to look for the most populated neighbour, False for the least populated.
+
+        Returns:
+            (int, int) OR (int, int, int): The position of the chosen neighbour.
         """
-        pass
+        neigh = self.getNeighbourTuples(coordinatesTuple, "moore")
+        counts = self.getCellCounts(neigh).tolist()
 
+        best = max(counts) if mostPopulated else min(counts)
+        candidates = [c for c, n in zip(neigh, counts) if n == best]
 
-class ObjectGrid(Grid):
-    __metaclass__ = abc.ABCMeta
+        return candidates[randrange(len(candidates))]
 
+    def getSpannedCells(self, coordinatesTuple, radius):
+        """ Returns all cells, other than the central one, covered by an agent of a given radius centred at a
+        given position. Cells lying outside the grid are not returned, on wrapped or reflected grids the
+        footprint folds back onto the grid and each cell is returned once.
 
-    def __init__(self, gridName):
-        """ Constructor method, sets the name of the grid and initializes the grid with no agents.
+        Args:
+            coordinatesTuple ((int, int) OR (int, int, int)): The position the agent is centred at.
+            radius (int): The radius of the agent.
+
+        Returns:
+            [(int, int)] OR [(int, int, int)]: The cells covered by the agent.
+        """
+        if (radius <= 1):
+            return []
+
+        span = radius - 1
+        axes = [self.getAxisNeighbours(axis, c, span) for axis, c in enumerate(coordinatesTuple)]
+
+        return [cell for cell in itertools.product(*axes) if cell != coordinatesTuple]
+
+    @abc.abstractmethod
+    def getCell(self, coordinatesTuple):
+        """ Returns the list of agents centred at a position.
 
         Args:
+            coordinatesTuple ((int, int) OR (int, int, int)): The position on the grid.
 
-            gridName (str): The name of the grid.
+        Returns:
+            [Agent]: The list held by the grid for such position. When cells are tiled, an empty position gives a
+            new empty list which is not stored, use getOrCreateCell to add agents.
         """
-        self.gridAgents = []
-        super(ObjectGrid, self).__init__(gridName)
+        pass
 
 
     @abc.abstractmethod
@@ -399,8 +2510,10 @@ class ObjectGrid(Grid):
 class ObjectGrid2D(ObjectGrid):
     """ An implementation of an ObjectGrid2D.
     """
+    coordinatesClass = Coordinates2D
+    positionViewClass = PositionView2D
 
-    def __init__(self, *args):
+    def __init__(self, *args, **kwargs):
         """ Initializes the grid. Initially, all positions are empty.
 
          Args:
@@ -411,6 +2524,9 @@ class ObjectGrid2D(ObjectGrid):
                 OR
 
             [(int) xsize, (int) ysize, (str) name] : A list containing the three parameters.
+
+         Keyword Args:
+             positionStorage, cellStorage, tileSize, bucketSize, boundary: See ObjectGrid.
         """
 
         # Not a beautiful solution but we need to account for arguments being given explicitly
@@ -425,25 +2541,11 @@ class ObjectGrid2D(ObjectGrid):
         ysize = args[1]
         name = args[2]
 
-        super(ObjectGrid2D, self).__init__(name)
-        self.xsize = args[0]
-        self.ysize = args[1]
-
-        # creating the general grid object
-        grid = []
-
-        for i in range(xsize):
-
-            # creating a column
-            col = []
-
-            for j in range(ysize):
-                # adding row elements to the column
-                col.append([])
-
-            grid.append(col)
+        super(ObjectGrid2D, self).__init__(name, **kwargs)
+        self.xsize = xsize
+        self.ysize = ysize
 
-        self.grid = grid
+        self.allocateCells()
 
     def getSize(self):
         """ Returns the size of the grid
@@ -459,7 +2561,7 @@ class ObjectGrid2D(ObjectGrid):
 
         Returns:
 
-            (grid): The current object.
+            (grid): The current object, None when cells are tiled.
         """
         return self.grid
 
@@ -477,25 +2579,26 @@ class ObjectGrid2D(ObjectGrid):
         x = coordinates[0]
         y = coordinates[1]
 
-        agentsAtPos = []
+        if (x < 0 or x >= self.xsize or y < 0 or y >= self.ysize):
+            return []
 
-        for a in self.gridAgents:
-            a = a[1]
-            agentPos = self.getAgentPosition(a)
+        # Remember agents with radius > 1 span multiple grid cells, the span index holds all agents spanning into
+        # this cell and not only those centered at it.
+        return self.getIndexedAtPos(self.getCell((x, y)), (x, y))
 
-            agentRadius = a.getRadius()
-            agentCoords = agentPos.getCoordinates()
+    def getCell(self, coordinatesTuple):
+        """ Returns the list of agents centred at a position.
 
-            agentX = agentCoords[0]
-            agentY = agentCoords[1]
-
-            # Remember agents with radius > 1 span multiple grid cells. This is where we make sure we include
-            # all agents spanning into this cell and not only those centered at it.
-            if((agentX-(agentRadius-1) <= x and agentX+(agentRadius-1) >= x)) and ( (agentY-(agentRadius-1) <= y and agentY+(agentRadius-1) >= y )):
-                agentsAtPos.append(a)
+        Args:
+            coordinatesTuple ((int, int)): The position on the grid.
 
-        return agentsAtPos
+        Returns:
+            [Agent]: The list held by the grid for such position.
+        """
+        if (self.cellTiles is not None):
+            return self.cellTiles.getCell(coordinatesTuple)
 
+        return self.grid[coordinatesTuple[0]][coordinatesTuple[1]]
 
     def moveAgent(self, coordinates, agent):
         """ Moves an agent to a certain position on the grid. If the agent wasn't on the grid, it is added.
@@ -508,61 +2611,36 @@ class ObjectGrid2D(ObjectGrid):
         # The actual x/y tuple representing the coordinates we want to move our agent to
         coordinatesTuple = coordinates.getCoordinates()
 
-        # We first check if the agent is known to the grid
-        matching = [agent_coords for agent_coords in self.gridAgents if agent_coords[1] == agent]
-
-        # Storing the agent's position for this grid in the agent itself too
-        agent.gridPositions[self.gridName] = coordinates
-
-        if (len(matching) == 0):
-            # The agent is not known to the system, let's make them known
-            self.gridAgents.append((coordinates, agent))
-
-            # And we add them to the grid
-            self.grid[coordinatesTuple[0]][coordinatesTuple[1]].append(agent)
-
-        else:
-
-            x = coordinatesTuple[0]
-            y = coordinatesTuple[1]
-
-
-            # preventing an agent from moving off the grid
-            if(x < 0):
-                x = 0
-
-            if(x > self.xsize-1):
-                x = self.xsize-1
-
-            if(y < 0):
-                y = 0
-
-            if(y > self.ysize-1):
-                y = self.ysize-1
+        # preventing an agent from moving off the grid, according to the boundary mode
+        x, y = self.mapPosition(coordinatesTuple)
 
+        if((x, y) != coordinatesTuple):
             coordinates = Coordinates2D(x,y)
 
-            # getting the tuple representing the current location
-            listTuple = matching[0]
-
-            # from it, we get its current position
-            coordinatesOld = listTuple[0].getCoordinates()
-
-            # creating a new tuple representing the new coordinates
-            newTuple = (coordinates, agent)
+        coordinatesOld = self.placeAgent(coordinates, (x, y), agent)
 
-            # and registering it
-            loc = self.gridAgents.index(listTuple)
-            self.gridAgents[loc] = newTuple
+        radius = agent.getRadius()
 
-            # physically removing the agent from the old position on the grid
-            self.grid[coordinatesOld[0]][coordinatesOld[1]].remove(agent)
+        if (coordinatesOld is not None):
+            self.updateAgentCounts(coordinatesOld, radius, -1)
 
+        self.updateAgentCounts((x, y), radius, 1)
+        self.notifyMove(agent, coordinatesOld, (x, y))
 
+    def moveAgents(self, agents, xs, ys):
+        """ Moves many agents at once. Positions are truncated to integers and brought back onto the grid (see
+        Grid.mapPosition) in a single vectorized pass, agents which weren't on the grid are added. Only the agents
+        whose position changed are moved between cells, see ObjectGrid.moveAgentsToPositions.
 
+         Args:
+             agents ([Agent]): The agents we want to move.
+             xs (numpy.ndarray): The x-positions we want to move the agents to, aligned with agents.
+             ys (numpy.ndarray): The y-positions we want to move the agents to, aligned with agents.
 
-            # ...and physically adding it to the new position on the grid
-            self.grid[x][y].append(agent)
+         Returns:
+             (numpy.ndarray, numpy.ndarray): The x and y positions the agents were actually moved to.
+        """
+        return self.moveAgentsToPositions(agents, (xs, ys))
 
     def getAgentPosition(self, agent):
         """ Returns the position of an agent on this grid.
@@ -571,9 +2649,15 @@ class ObjectGrid2D(ObjectGrid):
             agent (Agent): The agent whose position we want to find.
 
         Returns:
-            Coordinates2D: Coordinates representing the position of the agent.
+            Coordinates2D: Coordinates representing the position of the agent. When positions are stored in an
+            array this is a copy, the agent itself holds a view which follows it as it moves.
         """
-        return agent.gridPositions[self.gridName]
+        position = agent.gridPositions[self.gridName]
+
+        if (self.positionArray is not None):
+            return Coordinates2D(*position.getCoordinates())
+
+        return position
 
     def removeAgent(self, agent):
         """ Removes an agent from the grid.
@@ -582,16 +2666,13 @@ class ObjectGrid2D(ObjectGrid):
             agent (Agent): The agent we want to remove.
         """
 
-        agentPosition = self.getAgentPosition(agent)
-
-        agentCoords = agentPosition.getCoordinates()
-
-        matching = [agent_coords for agent_coords in self.gridAgents if agent_coords[1] == agent]
-
-        # removing the agent from the agent grid
-        self.gridAgents.remove(matching[0])
+        # removing the agent from the agent registry
+        agentCoords = self.unregisterAgent(agent)
 
-        self.grid[agentCoords[0]][agentCoords[1]].remove(agent)
+        self.removeFromCell(agentCoords, agent)
+        self.unindexSpan(agent, agentCoords)
+        self.updateAgentCounts(agentCoords, agent.getRadius(), -1)
+        self.notifyMove(agent, agentCoords, None)
 
     def getMooreNeigh(self, coordinates):
         """ Returns moore neighbourhood coordinates and a list of agents at each such coordinate.
@@ -623,24 +2704,9 @@ class ObjectGrid2D(ObjectGrid):
         Returns:
             Coordinates2D: The coordinates referring to the least populated moore neighbourhood.
         """
-        mooreNeigh = self.getMooreNeigh(coordinates)
-        shuffle(mooreNeigh)
+        bestCoord = self.getPopulatedMooreNeighTuple(coordinates.getCoordinates(), False)
 
-        first = mooreNeigh[0]
-
-        bestCoord = first[0]
-        highestPop = len(first[1])
-
-        for n in mooreNeigh:
-            c = n[0]
-            a = n[1]
-            nA = len(a)
-
-            if (nA <= highestPop):
-                highestPop = nA
-                bestCoord = c
-
-        return bestCoord
+        return Coordinates2D(*bestCoord)
 
     def getMostPopulatedMooreNeigh(self, coordinates):
         """ Returns the coordinates of the moore neighbour with the most agents. If there are more than one
@@ -652,32 +2718,18 @@ class ObjectGrid2D(ObjectGrid):
         Returns:
             Coordinates2D: The coordinates referring to the most populated moore neighbourhood.
         """
-        mooreNeigh = self.getMooreNeigh(coordinates)
-        shuffle(mooreNeigh)
-
-        first = mooreNeigh[0]
-
-        bestCoord = first[0]
-        highestPop = len(first[1])
-
-        for n in mooreNeigh:
-            c = n[0]
-            a = n[1]
-            nA = len(a)
-
-            if (nA >= highestPop):
-                highestPop = nA
-                bestCoord = c
+        bestCoord = self.getPopulatedMooreNeighTuple(coordinates.getCoordinates(), True)
 
-        return bestCoord
+        return Coordinates2D(*bestCoord)
 
 
 class ObjectGrid3D(ObjectGrid):
     """ An implementation of a 3D Object Grid
     """
+    coordinatesClass = Coordinates3D
+    positionViewClass = PositionView3D
 
-
-    def __init__(self, *args):
+    def __init__(self, *args, **kwargs):
         """ Initializes the grid. Initially, all positions are empty.
 
          Args:
@@ -688,7 +2740,10 @@ class ObjectGrid3D(ObjectGrid):
 
                 OR
 
-            [(int) xsize, (int) ysize, (int) zsize, (str) name] : A list containing the three parameters.
+            [(int) xsize, (int) ysize, (int) zsize, (str) name] : A list containing the four parameters.
+
+         Keyword Args:
+             positionStorage, cellStorage, tileSize, bucketSize, boundary: See ObjectGrid.
         """
 
         # Not a beautiful solution but we need to account for arguments being given explicitly
@@ -708,39 +2763,19 @@ class ObjectGrid3D(ObjectGrid):
         zsize = args[2]
         name = args[3]
 
-        super(ObjectGrid3D, self).__init__(name)
-        self.xsize = args[0]
-        self.ysize = args[1]
-        self.zsize = args[2]
-
-        # creating the general grid object
-        grid = []
-
-        for i in range(xsize):
-
-            # creating a column
-            col = []
-
-            for j in range(ysize):
-                # adding row elements to the column
-
-                colB = []
-
-                for k in range(zsize):
-                    colB.append([])
-
-                col.append(colB)
-
-            grid.append(col)
+        super(ObjectGrid3D, self).__init__(name, **kwargs)
+        self.xsize = xsize
+        self.ysize = ysize
+        self.zsize = zsize
 
-        self.grid = grid
+        self.allocateCells()
 
     def getGrid(self):
         """ Returns the grid object
 
         Returns:
 
-            (grid): The current object.
+            (grid): The current object, None when cells are tiled.
         """
         return self.grid
 
@@ -773,70 +2808,41 @@ class ObjectGrid3D(ObjectGrid):
              agent (Agent): The agent we want to move.
         """
 
-        # The actual x/y tuple representing the coordinates we want to move our agent to
+        # The actual x/y/z triplet representing the coordinates we want to move our agent to
         coordinatesTuple = coordinates.getCoordinates()
 
-        # We first check if the agent is known to the grid
-        matching = [agent_coords for agent_coords in self.gridAgents if agent_coords[1] == agent]
-
-        agent.gridPositions[self.gridName] = coordinates
-
-        if (len(matching) == 0):
-            # The agent is not known to the system, let's make them known
-            self.gridAgents.append((coordinates, agent))
-
-            # And we add them to the grid
-            self.grid[coordinatesTuple[0]][coordinatesTuple[1]][coordinatesTuple[2]].append(agent)
-
-        else:
-
-            x = coordinatesTuple[0]
-            y = coordinatesTuple[1]
-            z = coordinatesTuple[2]
-
-            # preventing an agent from moving off the grid
-            if(x < 0):
-                x = 0
-
-            if(x > self.xsize-1):
-                x = self.xsize-1
-
-            if(y < 0):
-                y = 0
-
-            if(y > self.ysize-1):
-                y = self.ysize-1
-
-            if(z < 0):
-                z = 0
-
-            if(z > self.zsize-1):
-                z = self.zsize-1
+        # preventing an agent from moving off the grid, according to the boundary mode
+        x, y, z = self.mapPosition(coordinatesTuple)
 
+        if((x, y, z) != coordinatesTuple):
             coordinates = Coordinates3D(x,y,z)
 
-            # getting the tuple representing the current location
-            listTuple = matching[0]
+        coordinatesOld = self.placeAgent(coordinates, (x, y, z), agent)
 
-            # from it, we get its current position
-            coordinatesOld = listTuple[0].getCoordinates()
-
-            # creating a new tuple representing the new coordinates
-            newTuple = (coordinates, agent)
-
-            # and registering it
-            loc = self.gridAgents.index(listTuple)
-            self.gridAgents[loc] = newTuple
-
-            # physically removing the agent from the old position on the grid
-            self.grid[coordinatesOld[0]][coordinatesOld[1]][coordinatesOld[2]].remove(agent)
+        radius = agent.getRadius()
 
+        if (coordinatesOld is not None):
+            self.updateAgentCounts(coordinatesOld, radius, -1)
 
+        self.updateAgentCounts((x, y, z), radius, 1)
+        self.notifyMove(agent, coordinatesOld, (x, y, z))
 
+    def moveAgents(self, agents, xs, ys, zs):
+        """ Moves many agents at once. Positions are truncated to integers and brought back onto the grid (see
+        Grid.mapPosition) in a single vectorized pass, agents which weren't on the grid are added. Only the agents
+        whose position changed are moved between cells, see ObjectGrid.moveAgentsToPositions.
 
-            # ...and physically adding it to the new position on the grid
-            self.grid[x][y].append(agent)
-
+         Args:
+             agents ([Agent]): The agents we want to move.
+             xs (numpy.ndarray): The x-positions we want to move the agents to, aligned with agents.
+             ys (numpy.ndarray): The y-positions we want to move the agents to, aligned with agents.
+             zs (numpy.ndarray): The z-positions we want to move the agents to, aligned with agents.
+
+         Returns:
+             (numpy.ndarray, numpy.ndarray, numpy.ndarray): The x, y and z positions the agents were actually moved
+             to.
+        """
+        return self.moveAgentsToPositions(agents, (xs, ys, zs))
 
     def getSize(self):
         """ Returns the size of the grid
@@ -854,9 +2860,15 @@ class ObjectGrid3D(ObjectGrid):
             agent (Agent): The agent whose position we want to find.
 
         Returns:
-            Coordinates3D: Coordinates representing the position of the agent.
+            Coordinates3D: Coordinates representing the position of the agent. When positions are stored in an
+            array this is a copy, the agent itself holds a view which follows it as it moves.
         """
-        return agent.gridPositions[self.gridName]
+        position = agent.gridPositions[self.gridName]
+
+        if (self.positionArray is not None):
+            return Coordinates3D(*position.getCoordinates())
+
+        return position
 
     def getAtPos(self, coordinates):
         """ Returns a list containing all agents at a given position.
@@ -874,23 +2886,24 @@ class ObjectGrid3D(ObjectGrid):
         y = coordinates[1]
         z = coordinates[2]
 
-        agentsAtPos = []
+        if (x < 0 or x >= self.xsize or y < 0 or y >= self.ysize or z < 0 or z >= self.zsize):
+            return []
 
-        for a in self.gridAgents:
-            a = a[1]
-            agentPos = self.getAgentPosition(a)
+        return self.getIndexedAtPos(self.getCell((x, y, z)), (x, y, z))
 
-            agentRadius = a.getRadius()
-            agentCoords = agentPos.getCoordinates()
+    def getCell(self, coordinatesTuple):
+        """ Returns the list of agents centred at a position.
 
-            agentX = agentCoords[0]
-            agentY = agentCoords[1]
-            agentZ = agentCoords[2]
+        Args:
+            coordinatesTuple ((int, int, int)): The position on the grid.
 
-            if((agentX-(agentRadius-1) <= x and agentX+(agentRadius-1) >= x)) and ( (agentY-(agentRadius-1) <= y and agentY+(agentRadius-1) >= y )) and ((agentZ-(agentRadius-1) <= z and agentZ+(agentRadius-1) >= z )):
-                agentsAtPos.append(a)
+        Returns:
+            [Agent]: The list held by the grid for such position.
+        """
+        if (self.cellTiles is not None):
+            return self.cellTiles.getCell(coordinatesTuple)
 
-        return agentsAtPos
+        return self.grid[coordinatesTuple[0]][coordinatesTuple[1]][coordinatesTuple[2]]
 
     def getLeastPopulatedMooreNeigh(self, coordinates):
         """ Returns the coordinates of the moore neighbour with the fewest agents. If there are more than one
@@ -902,24 +2915,9 @@ class ObjectGrid3D(ObjectGrid):
         Returns:
             Coordinates3D: The coordinates referring to the least populated moore neighbourhood.
         """
-        mooreNeigh = self.getMooreNeigh(coordinates)
-        shuffle(mooreNeigh)
-
-        first = mooreNeigh[0]
-
-        bestCoord = first[0]
-        highestPop = len(first[1])
-
-        for n in mooreNeigh:
-            c = n[0]
-            a = n[1]
-            nA = len(a)
+        bestCoord = self.getPopulatedMooreNeighTuple(coordinates.getCoordinates(), False)
 
-            if (nA <= highestPop):
-                highestPop = nA
-                bestCoord = c
-
-        return bestCoord
+        return Coordinates3D(*bestCoord)
 
 
     def getMostPopulatedMooreNeigh(self, coordinates):
@@ -932,24 +2930,9 @@ class ObjectGrid3D(ObjectGrid):
         Returns:
             Coordinates2D: The coordinates referring to the most populated moore neighbourhood.
         """
-        mooreNeigh = self.getMooreNeigh(coordinates)
-        shuffle(mooreNeigh)
-
-        first = mooreNeigh[0]
-
-        bestCoord = first[0]
-        highestPop = len(first[1])
-
-        for n in mooreNeigh:
-            c = n[0]
-            a = n[1]
-            nA = len(a)
+        bestCoord = self.getPopulatedMooreNeighTuple(coordinates.getCoordinates(), True)
 
-            if (nA >= highestPop):
-                highestPop = nA
-                bestCoord = c
-
-        return bestCoord
+        return Coordinates3D(*bestCoord)
 
     def removeAgent(self, agent):
         """ Removes an agent from the grid.
@@ -958,13 +2941,10 @@ class ObjectGrid3D(ObjectGrid):
             agent (Agent): The agent we want to remove.
         """
 
-        agentPosition = self.getAgentPosition(agent)
-
-        agentCoords = agentPosition.getCoordinates()
-
-        matching = [agent_coords for agent_coords in self.gridAgents if agent_coords[1] == agent]
-
-        # removing the agent from the agent grid
-        self.gridAgents.remove(matching[0])
+        # removing the agent from the agent registry
+        agentCoords = self.unregisterAgent(agent)
 
-        self.grid[agentCoords[0]][agentCoords[1]][agentCoords[2]].remove(agent)
\ No newline at end of file
+        self.removeFromCell(agentCoords, agent)
+        self.unindexSpan(agent, agentCoords)
+        self.updateAgentCounts(agentCoords, agent.getRadius(), -1)
+        self.notifyMove(agent, agentCoords, None)
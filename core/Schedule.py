@@ -3,25 +3,242 @@ of the model by calling their respective "step" methods.
 
 .. moduleauthor:: Dario Panada <dario.panada@postgrad.manchester.ac.uk>
 """
-from random import shuffle
+import dis
+import functools
+import heapq
+import multiprocessing
+import os
+import random
+import traceback
+from collections import OrderedDict
+
+import numpy
+
+from panacea.core.Steppables import Helper
+
+
+PHASES = ("stepPrologue", "stepMain", "stepEpilogue")
+
+# the orders agents can be stepped in, see Schedule.orderAgents
+ORDERS = ("shuffle", "permutation", "cyclic", "sequential")
+
+LOAD_CONST = dis.opmap["LOAD_CONST"]
+RETURN_VALUE = dis.opmap["RETURN_VALUE"]
+
+
+def isNoOp(function):
+    """ Checks if a function does nothing, that is its body is only pass (and possibly a docstring).
+
+    Args:
+        function (function OR method): The function.
+
+    Returns:
+        bool: True if calling the function has no effect.
+    """
+    code = getattr(function, "__code__", None)
+
+    if (code is None):
+        return False
+
+    # the whole body compiles to "return None"
+    instructions = bytearray(code.co_code)
+
+    if (len(instructions) != 4 or instructions[0] != LOAD_CONST):
+        return False
+
+    if (instructions[3] == RETURN_VALUE):
+        index = instructions[1] | instructions[2] << 8
+    elif (instructions[2] == RETURN_VALUE):
+        index = instructions[1]
+    else:
+        return False
+
+    return code.co_consts[index] is None
+
+
+# steppable class => the phases its instances have to be stepped in, see getSteppedPhases
+steppedPhasesCache = {}
+
+
+def getSteppedPhases(steppableClass):
+    """ Returns the phases in which the step method of a class does something. Classes are checked once and the
+    result shared afterwards.
+
+    Args:
+        steppableClass (class): The class of a steppable.
+
+    Returns:
+        (bool, bool, bool): For stepPrologue, stepMain and stepEpilogue, False if the method is a no-op.
+    """
+    phases = steppedPhasesCache.get(steppableClass)
+
+    if (phases is None):
+        phases = tuple(not isNoOp(getattr(steppableClass, phase, None)) for phase in PHASES)
+        steppedPhasesCache[steppableClass] = phases
+
+    return phases
+
+
+# steppable class => the phases it defines a batch hook for, see getBatchPhases
+batchPhasesCache = {}
+
+
+def getBatchPhases(steppableClass):
+    """ Returns the phases for which a class defines a batch hook, a classmethod named after the phase with a "Batch"
+    suffix (Eg: stepMainBatch(cls, agents, model)) stepping all agents of the class at once.
+
+    Args:
+        steppableClass (class): The class of a steppable.
+
+    Returns:
+        (bool, bool, bool): For stepPrologue, stepMain and stepEpilogue, True if the class has a batch hook.
+    """
+    phases = batchPhasesCache.get(steppableClass)
+
+    if (phases is None):
+        phases = tuple(callable(getattr(steppableClass, phase + "Batch", None)) for phase in PHASES)
+        batchPhasesCache[steppableClass] = phases
+
+    return phases
+
+
+def getBoundSteps(steppable):
+    """ Returns the step methods of a steppable bound to it, None for the phases it does nothing in and its class
+    for the phases the class steps in batch.
+
+    Args:
+        steppable (Steppable): The agent or helper.
+
+    Returns:
+        (method, method, method): The stepPrologue, stepMain and stepEpilogue methods.
+    """
+    steppableClass = type(steppable)
+    steps = []
+
+    for phase, stepped, batch in zip(PHASES, getSteppedPhases(steppableClass), getBatchPhases(steppableClass)):
+        if (batch):
+            steps.append(steppableClass)
+        elif (stepped):
+            steps.append(getattr(steppable, phase))
+        else:
+            steps.append(None)
+
+    return tuple(steps)
+
 
 class Schedule(object):
-    """ The main schedule class.
+    """ The main schedule class. Step methods are called through per-phase dispatch lists of bound methods, steppables
+    whose class only has a no-op (pass) body for a phase are left out of that phase. The lists are rebuilt whenever
+    agents or helpers are added, removed or reordered, which should therefore only be done through the schedule.
+
+    A class may step all its agents at once in a phase, Eg: with numpy operations over their state, by defining a
+    batch hook (see getBatchPhases). The hook is then called once per phase with the agents of the class, in stepping
+    order, when the first of them is due, instead of their step methods.
+
+    Agents added or removed while stepping are queued as births and deaths, applied together between phases: an agent
+    removed during a phase still completes that phase and one added is stepped from the next phase on. Removed agents
+    are dropped from the agents list in a single pass the next time it is needed, so removing many agents costs one
+    pass over the list rather than one per agent.
+
+    The order agents are stepped in at each time-step is one of:
+        "shuffle": a new random order, the default.
+        "permutation": a new random order drawn by numpy, cheaper than shuffle on large lists.
+        "cyclic": the same order, starting from a random agent.
+        "sequential": the order agents were added in, for models where it does not matter (Eg: agents which only
+        read the state of others in stepMain and update their own in stepEpilogue). Step methods are then not
+        looked up again while the agents stay the same.
+    Random orders are drawn from the schedule's own generators when it is given a seed, making runs reproducible,
+    otherwise from the global random and numpy.random states.
     """
 
-    def __init__(self):
+    def __init__(self, order="shuffle", seed=None):
         """ Constructor, initiates the agents and helpers lists to empty.
+
+        Args:
+            order (str): The order agents are stepped in, "shuffle", "permutation", "cyclic" or "sequential".
+            seed (int): The seed of the schedule's random generators, None to use the global ones.
         """
-        self.agents = []
+        if (order not in ORDERS):
+            raise ValueError("Unknown order: " + str(order))
+
+        self.order = order
+        self.random = random if seed is None else random.Random(seed)
+        self.numpyRandom = numpy.random if seed is None else numpy.random.RandomState(seed)
+
+        self.agentList = []
         self.helpers = []
 
+        # id(steppable) => bound step methods, see getBoundSteps
+        self.boundSteps = {}
+
+        # phase index => [bound methods], None when they have to be rebuilt
+        self.agentDispatch = None
+        self.helperDispatch = None
+
+        # the agents and helpers stepped in the current step, None for all of them
+        self.activeAgents = None
+        self.activeHelpers = None
+
+        # id(agent) => agent, for the agents added while stepping and those removed but still in the agents list
+        self.births = OrderedDict()
+        self.deaths = {}
+
+        self.stepping = False
+
+    @property
+    def agents(self):
+        """ Returns all agents in the schedule, applying pending removals first when not stepping.
+
+        Returns:
+            [Agent]: The agents, in stepping order.
+        """
+        if (len(self.deaths) > 0 and not self.stepping):
+            self.applyBirthsAndDeaths()
+
+        return self.agentList
+
+    def isScheduled(self, steppable):
+        """ Checks if an agent or helper is in the schedule, in constant time. Agents added while stepping are in the
+        schedule straight away and removed ones are not, even before the change is applied.
+
+        Args:
+            steppable (Steppable): The agent or helper.
+
+        Returns:
+            bool: True if the steppable is in the schedule.
+        """
+        steppableId = id(steppable)
+
+        return steppableId in self.births or (steppableId in self.boundSteps and steppableId not in self.deaths)
+
+    def hasAgent(self, agent):
+        """ Checks if an agent is in the schedule, see isScheduled. Helpers are not agents.
+
+        Args:
+            agent (Agent): The agent.
+
+        Returns:
+            bool: True if the agent is in the schedule and not waiting to be removed.
+        """
+        return not isinstance(agent, Helper) and self.isScheduled(agent)
+
     def addAgent(self, agent):
-        """ Adds an agent to the schedule.
+        """ Adds an agent to the schedule. While stepping, the agent is queued until the end of the current phase.
 
         Args:
             agent (agent): The agent we want to add.
         """
-        self.agents.append(agent)
+        agentId = id(agent)
+
+        if (agentId in self.deaths):
+            # removed and added back before the removal was applied, the agent keeps its place
+            del self.deaths[agentId]
+        elif (self.stepping):
+            self.births[agentId] = agent
+        else:
+            self.agentList.append(agent)
+            self.boundSteps[agentId] = getBoundSteps(agent)
+            self.agentDispatch = None
 
     def addHelper(self, helper):
         """ Adds an helper to the schedule.
@@ -30,14 +247,60 @@ class Schedule(object):
             helper (helper): The helper we want to add.
         """
         self.helpers.append(helper)
+        self.boundSteps[id(helper)] = getBoundSteps(helper)
+        self.helperDispatch = None
 
     def removeAgent(self, agent):
-        """ Removes an agent from the schedule.
+        """ Removes an agent from the schedule, in constant time. The agent is dropped from the agents list later, in
+        bulk: between phases while stepping, otherwise when the list is next needed.
 
         Args:
             agent (agent): The agent we want to remove.
         """
-        self.agents.remove(agent)
+        agentId = id(agent)
+
+        if (agentId in self.births):
+            del self.births[agentId]
+            return
+
+        if (agentId not in self.boundSteps or agentId in self.deaths):
+            raise ValueError("The agent is not in the schedule")
+
+        self.deaths[agentId] = agent
+
+        if (not self.stepping):
+            self.agentDispatch = None
+
+    def applyBirthsAndDeaths(self):
+        """ Applies the pending births and deaths in one pass over the agents list.
+
+        Returns:
+            bool: True if agents were removed.
+        """
+        deaths = self.deaths
+        births = self.births
+
+        if (len(deaths) > 0):
+            self.agentList[:] = [a for a in self.agentList if id(a) not in deaths]
+
+            if (self.activeAgents is not None):
+                self.activeAgents = [a for a in self.activeAgents if id(a) not in deaths]
+
+            for agentId in deaths:
+                del self.boundSteps[agentId]
+
+            self.deaths = {}
+            self.agentDispatch = None
+
+        if (len(births) > 0):
+            for agentId, agent in births.items():
+                self.agentList.append(agent)
+                self.boundSteps[agentId] = getBoundSteps(agent)
+
+            self.births = OrderedDict()
+            self.agentDispatch = None
+
+        return len(deaths) > 0
 
     def removeHelper(self, helper):
         """ Removes an helper from the schedule.
@@ -46,21 +309,163 @@ class Schedule(object):
             helper (helper): The helper we want to remove.
         """
         self.helpers.remove(helper)
+        del self.boundSteps[id(helper)]
+        self.helperDispatch = None
+
+    def buildDispatch(self, steppables):
+        """ Builds the per-phase lists of bound step methods of some steppables, keeping their order. Steppables of a
+        class with a batch hook are replaced by a single call to the hook.
+
+        Args:
+            steppables ([Steppable]): The agents or helpers.
+
+        Returns:
+            [[callable], [callable], [callable]]: The methods to call in stepPrologue, stepMain and stepEpilogue,
+            each taking the model.
+        """
+        steps = list(map(self.boundSteps.__getitem__, map(id, steppables)))
+        dispatch = []
+
+        for i, phase in enumerate(PHASES):
+            calls = [s[i] for s in steps if s[i] is not None]
+
+            if (any(isinstance(c, type) for c in calls)):
+                calls = self.batchCalls(calls, [p for p, s in zip(steppables, steps) if s[i] is not None],
+                                        phase + "Batch")
+
+            dispatch.append(calls)
+
+        return dispatch
+
+    @staticmethod
+    def batchCalls(calls, steppables, hook, prepared=None):
+        """ Replaces the steppables stepped in batch by one call to the hook of their class, placed where the first
+        of them was.
+
+        Args:
+            calls ([method OR class]): The step methods of a phase, or the class of steppables stepped in batch.
+            steppables ([Steppable]): The steppables, aligned with calls.
+            hook (str): The name of the batch hook.
+            prepared (dict): class => value passed to the hook of the class as its prepared keyword argument, see
+            ParallelSchedule.
+
+        Returns:
+            [callable]: The calls of the phase.
+        """
+        batches = {}
+        batched = []
+
+        for call, steppable in zip(calls, steppables):
+            if (not isinstance(call, type)):
+                batched.append(call)
+            elif (call in batches):
+                batches[call].append(steppable)
+            else:
+                batches[call] = [steppable]
+
+                if (prepared is not None and call in prepared):
+                    batched.append(functools.partial(getattr(call, hook), batches[call], prepared=prepared[call]))
+                else:
+                    batched.append(functools.partial(getattr(call, hook), batches[call]))
+
+        return batched
+
+    def getDispatch(self, phaseIndex):
+        """ Returns the helper and agent step methods to call in a phase, rebuilding the lists when needed.
+
+        Args:
+            phaseIndex (int): 0 for stepPrologue, 1 for stepMain and 2 for stepEpilogue.
+
+        Returns:
+            ([method], [method]): The helper methods and agent methods, in stepping order.
+        """
+        if (self.helperDispatch is None):
+            helpers = self.helpers if self.activeHelpers is None else self.activeHelpers
+            self.helperDispatch = self.buildDispatch(helpers)
+
+        if (self.agentDispatch is None):
+            agents = self.agents if self.activeAgents is None else self.activeAgents
+            self.agentDispatch = self.buildDispatch(agents)
+
+        return self.helperDispatch[phaseIndex], self.agentDispatch[phaseIndex]
+
+    def stepActive(self, model, agents=None, helpers=None):
+        """ Runs the three acts over the given agents and helpers, applying births and deaths between acts.
+
+        Args:
+            model (model): The current model.
+            agents ([Agent]): The agents to step, in order, None for all of them.
+            helpers ([Helper]): The helpers to step, None for all of them.
+        """
+        self.activeAgents = agents
+        self.activeHelpers = helpers
+
+        # the dispatch of all agents or helpers stays valid until they change
+        if (agents is not None):
+            self.agentDispatch = None
+
+        if (helpers is not None):
+            self.helperDispatch = None
+
+        self.stepping = True
+
+        try:
+            self.stepPrologue(model)
+            self.applyBirthsAndDeaths()
+
+            self.stepMain(model)
+            self.applyBirthsAndDeaths()
+
+            self.stepEpilogue(model)
+        finally:
+            self.stepping = False
+            self.applyBirthsAndDeaths()
+
+            if (agents is not None):
+                self.agentDispatch = None
+
+            if (helpers is not None):
+                self.helperDispatch = None
+
+            self.activeAgents = None
+            self.activeHelpers = None
+
+    def orderAgents(self, agents):
+        """ Puts a list of agents in the order they are to be stepped in, in place, following the schedule's order.
+
+        Args:
+            agents ([Agent]): The agents.
+
+        Returns:
+            bool: True if the list was reordered.
+        """
+        if (self.order == "sequential" or len(agents) < 2):
+            return False
+
+        if (self.order == "shuffle"):
+            self.random.shuffle(agents)
+        elif (self.order == "permutation"):
+            agents[:] = [agents[i] for i in self.numpyRandom.permutation(len(agents)).tolist()]
+        else:
+            offset = self.random.randrange(len(agents))
+            agents[:] = agents[offset:] + agents[:offset]
+
+        return True
 
     def step(self, model):
-        """ Steps all agents and helpers. Agents are stepped in a different order at each time-step, hence why
-         the list is shuffled. As panacea implements a three-act time-step, steppables see their methods stepPrologue,
-         stepMain and stepEpilogue called in that order. In each act, helpers are always stepped before agents.
+        """ Steps all agents and helpers. Agents are stepped in a different order at each time-step unless the
+         schedule's order is sequential, see orderAgents. As panacea implements a three-act time-step, steppables see
+         their methods stepPrologue, stepMain and stepEpilogue called in that order. In each act, helpers are always
+         stepped before agents.
 
          Args:
              model (model): The current model, this is then passed to agents and steppables so that they can "see"
              the world they live in and interact with it.
         """
-        shuffle(self.agents)
+        if (self.orderAgents(self.agents)):
+            self.agentDispatch = None
 
-        self.stepPrologue(model)
-        self.stepMain(model)
-        self.stepEpilogue(model)
+        self.stepActive(model)
 
     def stepPrologue(self, model):
         """ Calls the stepPrologue method in all helpers and then agents, passing the state of the model to each.
@@ -68,11 +473,7 @@ class Schedule(object):
         Args:
             model (model): The current model object.
         """
-        for h in self.helpers:
-            h.stepPrologue(model)
-
-        for a in self.agents:
-            a.stepPrologue(model)
+        self.stepPhase(0, model)
 
     def stepMain(self, model):
         """ Calls the stepMain method in all helpers and then agents, passing the state of the model to each.
@@ -80,11 +481,7 @@ class Schedule(object):
         Args:
             model (model): The current model object.
         """
-        for h in self.helpers:
-            h.stepMain(model)
-
-        for a in self.agents:
-            a.stepMain(model)
+        self.stepPhase(1, model)
 
     def stepEpilogue(self, model):
         """ Calls the steEpilogue method in all helpers and then agents, passing the state of the model to each.
@@ -92,8 +489,594 @@ class Schedule(object):
         Args:
             model (model): The current model object.
         """
-        for h in self.helpers:
-            h.stepEpilogue(model)
+        self.stepPhase(2, model)
+
+    def stepPhase(self, phaseIndex, model):
+        """ Calls the step methods of a phase in all helpers and then agents, skipping no-ops.
+
+        Args:
+            phaseIndex (int): 0 for stepPrologue, 1 for stepMain and 2 for stepEpilogue.
+            model (model): The current model object.
+        """
+        helperSteps, agentSteps = self.getDispatch(phaseIndex)
+
+        for step in helperSteps:
+            step(model)
+
+        for step in agentSteps:
+            step(model)
+
+
+class ParallelSchedule(Schedule):
+    """ A schedule stepping agents in several worker processes during the phases declared parallel. Such phases must
+    be side-effect-free or buffered-write: an agent may read the model but only writes to its own attributes, which it
+    lists per phase in a parallelOutputs class attribute, Eg:
+
+        parallelOutputs = {"stepMain": ("stateNext",)}
+
+    For each parallel phase agents are split into chunks, each chunk is stepped in a forked copy of the model and the
+    listed attributes, which must be picklable, are copied back onto the agents before the next phase starts.
+    Helpers, and agents which do not declare outputs for the phase, are stepped serially in the main process, helpers
+    before and those agents after the chunks. Batch hooks (see Schedule) are called once per chunk.
+
+    Work shared by all chunks, Eg: a lookup table built from the whole grid, can be done once per phase by a
+    classmethod named after the batch hook with a "Prepare" suffix (Eg: stepMainBatchPrepare(cls, agents, model)). It
+    is called in the main process before the chunks with all parallel agents of the class, and what it returns is
+    passed to every batch call of the class as the prepared keyword argument. Workers inherit it when forked.
+
+    Each chunk seeds the random and numpy.random generators from the schedule's own generator, so runs with the same
+    seed and number of chunks give the same results whatever the number of workers. On platforms without fork,
+    chunks are run one after the other in the main process.
+    """
+
+    def __init__(self, workers=None, parallelPhases=("stepMain",), chunks=None, seed=None, order="shuffle"):
+        """ Creates the schedule.
+
+        Args:
+            workers (int): The number of worker processes, defaults to the number of CPUs. 1 runs all chunks in the
+            main process.
+            parallelPhases ((str)): The phases run in parallel, among "stepPrologue", "stepMain" and "stepEpilogue".
+            chunks (int): The number of chunks agents are split into, defaults to the number of workers.
+            seed (int): The seed of the schedule's random generators, used to order agents and seed chunks.
+            order (str): The order agents are stepped in, see Schedule.
+        """
+        super(ParallelSchedule, self).__init__(order, seed)
+
+        for phase in parallelPhases:
+            if (phase not in PHASES):
+                raise ValueError("Unknown phase: " + str(phase))
+
+        if (workers is None):
+            workers = multiprocessing.cpu_count()
+
+        self.workers = max(int(workers), 1)
+        self.chunks = max(int(chunks), 1) if chunks is not None else self.workers
+        self.parallelPhases = frozenset(parallelPhases)
+
+        # chunk seeds always come from the schedule's own generator
+        if (seed is None):
+            self.random = random.Random()
+
+    def stepPhase(self, phaseIndex, model):
+        """ Runs a phase, in parallel if it was declared so. Agents with a no-op step method are skipped.
+
+        Args:
+            phaseIndex (int): 0 for stepPrologue, 1 for stepMain and 2 for stepEpilogue.
+            model (model): The current model.
+        """
+        phase = PHASES[phaseIndex]
+
+        if (phase not in self.parallelPhases):
+            super(ParallelSchedule, self).stepPhase(phaseIndex, model)
+            return
+
+        helperSteps, agentSteps = self.getDispatch(phaseIndex)
+
+        for step in helperSteps:
+            step(model)
+
+        parallel = []
+        serial = []
+
+        for step in agentSteps:
+            # the agents stepped by a batch hook, or the agent the method is bound to
+            if (isinstance(step, functools.partial)):
+                agents = step.args[0]
+            else:
+                agents = [step.__self__]
+
+            if (phase in getattr(agents[0], "parallelOutputs", ())):
+                parallel.extend(agents)
+            else:
+                serial.append(step)
+
+        prepared = self.prepareBatches(phase, parallel, model)
+
+        chunks = self.getChunks(parallel)
+        seeds = [self.random.randrange(2 ** 31) for c in chunks]
+
+        if (self.workers == 1 or not hasattr(os, "fork")):
+            self.runChunksInProcess(phase, chunks, seeds, model, prepared)
+        else:
+            results = self.runChunksInWorkers(phase, chunks, seeds, model, prepared)
+
+            for chunk, values in zip(chunks, results):
+                for agent, agentValues in zip(chunk, values):
+                    for name, value in zip(agent.parallelOutputs[phase], agentValues):
+                        setattr(agent, name, value)
+
+        for step in serial:
+            step(model)
+
+    def prepareBatches(self, phase, agents, model):
+        """ Calls the batch preparation hooks of the classes of some agents, once per class.
+
+        Args:
+            phase (str): The phase.
+            agents ([Agent]): The agents stepped in parallel.
+            model (model): The current model.
+
+        Returns:
+            dict: class => value returned by its hook, for the classes with one.
+        """
+        batches = OrderedDict()
+
+        for agent in agents:
+            batches.setdefault(type(agent), []).append(agent)
+
+        prepared = {}
+
+        for agentClass, classAgents in batches.items():
+            hook = getattr(agentClass, phase + "BatchPrepare", None)
+
+            if (callable(hook) and getBatchPhases(agentClass)[PHASES.index(phase)]):
+                prepared[agentClass] = hook(classAgents, model)
+
+        return prepared
+
+    def getChunks(self, agents):
+        """ Splits agents into contiguous chunks of (almost) equal size.
+
+        Args:
+            agents ([Agent]): The agents.
+
+        Returns:
+            [[Agent]]: The chunks, empty ones left out.
+        """
+        count = min(self.chunks, len(agents))
+        bounds = [len(agents) * i // count for i in range(count + 1)] if count > 0 else []
+
+        return [agents[bounds[i]:bounds[i + 1]] for i in range(count)]
+
+    @staticmethod
+    def runChunk(phase, chunk, seed, model, prepared=None):
+        """ Steps the agents of a chunk after seeding the random generators, classes with a batch hook step their
+        agents of the chunk together.
+
+        Args:
+            phase (str): The phase.
+            chunk ([Agent]): The agents.
+            seed (int): The seed of the chunk.
+            model (model): The current model.
+            prepared (dict): The values passed to batch hooks, see prepareBatches.
+
+        Returns:
+            [tuple]: The outputs of every agent of the chunk, see parallelOutputs.
+        """
+        random.seed(seed)
+        numpy.random.seed(seed)
+
+        phaseIndex = PHASES.index(phase)
+        steps = [getBoundSteps(a)[phaseIndex] for a in chunk]
+        stepped = [(s, a) for s, a in zip(steps, chunk) if s is not None]
+
+        for step in Schedule.batchCalls([s for s, a in stepped], [a for s, a in stepped], phase + "Batch", prepared):
+            step(model)
+
+        return [tuple(getattr(a, name) for name in a.parallelOutputs[phase]) for a in chunk]
+
+    def runChunksInProcess(self, phase, chunks, seeds, model, prepared=None):
+        """ Steps all chunks one after the other in the main process, leaving the state of the global random
+        generators as it was, like the workers do.
+
+        Args:
+            phase (str): The phase.
+            chunks ([[Agent]]): The chunks.
+            seeds ([int]): The seed of every chunk.
+            model (model): The current model.
+            prepared (dict): The values passed to batch hooks, see prepareBatches.
+        """
+        randomState = random.getstate()
+        numpyState = numpy.random.get_state()
+
+        try:
+            for chunk, seed in zip(chunks, seeds):
+                self.runChunk(phase, chunk, seed, model, prepared)
+        finally:
+            random.setstate(randomState)
+            numpy.random.set_state(numpyState)
+
+    def runChunksInWorkers(self, phase, chunks, seeds, model, prepared=None):
+        """ Steps all chunks in forked worker processes, chunk i going to worker i modulo the number of workers.
+
+        Args:
+            phase (str): The phase.
+            chunks ([[Agent]]): The chunks.
+            seeds ([int]): The seed of every chunk.
+            model (model): The current model.
+            prepared (dict): The values passed to batch hooks, see prepareBatches.
+
+        Returns:
+            [[tuple]]: The outputs of the agents of every chunk.
+        """
+        def work(connection, indices):
+            try:
+                connection.send(("ok", [self.runChunk(phase, chunks[i], seeds[i], model, prepared) for i in indices]))
+            except Exception:
+                connection.send(("error", traceback.format_exc()))
+            finally:
+                connection.close()
+
+        workers = []
+
+        for w in range(min(self.workers, len(chunks))):
+            indices = list(range(w, len(chunks), self.workers))
+            receiver, sender = multiprocessing.Pipe(False)
+
+            process = multiprocessing.Process(target=work, args=(sender, indices))
+            process.start()
+            sender.close()
+
+            workers.append((process, receiver, indices))
+
+        results = [None] * len(chunks)
+        errors = []
+
+        for process, receiver, indices in workers:
+            # results are read before joining, a worker cannot exit while its pipe is full
+            try:
+                status, payload = receiver.recv()
+            except EOFError:
+                status, payload = "error", "The worker exited without sending results"
+
+            process.join()
+
+            if (status == "ok"):
+                for i, values in zip(indices, payload):
+                    results[i] = values
+            else:
+                errors.append(payload)
+
+        if (len(errors) > 0):
+            raise RuntimeError("A worker failed while stepping " + phase + ":\n" + errors[0])
+
+        return results
+
+
+class EventSchedule(Schedule):
+    """ A schedule in which steppables are only stepped at the ticks they registered for, for models where most agents
+    act rarely. Pending activations are kept in a heap, so a tick costs O(active steppables * log(activations)) no
+    matter how many steppables are dormant.
+
+    Every call to step runs one tick. The steppables due at that tick go through the usual three acts (helpers before
+    agents in each act, agents in the schedule's order) and are then dormant until activated again, usually by
+    themselves while being stepped:
+
+        model.schedule.activateIn(self, 10)
+
+    A steppable has at most one pending activation, registering a new one replaces it.
+    """
+
+    def __init__(self, order="shuffle", seed=None):
+        """ Constructor, initiates the schedule at tick 0 with no steppables.
+
+        Args:
+            order (str): The order the agents due in a tick are stepped in, see Schedule.
+            seed (int): The seed of the schedule's random generators, None to use the global ones.
+        """
+        super(EventSchedule, self).__init__(order, seed)
+
+        # the tick being run, or the next one to run between steps
+        self.time = 0
+
+        # (tick, sequence, steppable) entries, an entry is stale unless its sequence is the pending one
+        self.queue = []
+        self.sequence = 0
+
+        # id(steppable) => (tick, sequence) of its pending activation
+        self.pending = {}
+
+    def getTime(self):
+        """ Returns the current tick.
+
+        Returns:
+            int: The tick being run, or the next one to run when called between steps.
+        """
+        return self.time
+
+    def addAgent(self, agent, time=None):
+        """ Adds an agent to the schedule.
+
+        Args:
+            agent (agent): The agent we want to add.
+            time (int): The tick of its first activation, defaults to the earliest possible.
+        """
+        super(EventSchedule, self).addAgent(agent)
+        self.activateAt(agent, time)
+
+    def addHelper(self, helper, time=None):
+        """ Adds an helper to the schedule.
+
+        Args:
+            helper (helper): The helper we want to add.
+            time (int): The tick of its first activation, defaults to the earliest possible.
+        """
+        super(EventSchedule, self).addHelper(helper)
+        self.activateAt(helper, time)
+
+    def removeAgent(self, agent):
+        """ Removes an agent from the schedule, along with its pending activation.
+
+        Args:
+            agent (agent): The agent we want to remove.
+        """
+        super(EventSchedule, self).removeAgent(agent)
+        self.pending.pop(id(agent), None)
+
+    def removeHelper(self, helper):
+        """ Removes an helper from the schedule, along with its pending activation.
+
+        Args:
+            helper (helper): The helper we want to remove.
+        """
+        super(EventSchedule, self).removeHelper(helper)
+        self.pending.pop(id(helper), None)
+
+    def activateAt(self, steppable, time=None):
+        """ Registers the next activation of a steppable, replacing any pending one. Steppables which are not in the
+        schedule, Eg: agents removed earlier in the current tick, are ignored.
+
+        Args:
+            steppable (Steppable): An agent or helper in the schedule.
+            time (int): The tick, it cannot be earlier than the current one nor, while stepping, the current one.
+            None for the earliest possible.
+        """
+        if (not self.isScheduled(steppable)):
+            return
+
+        earliest = self.time + 1 if self.stepping else self.time
+
+        if (time is None):
+            time = earliest
+        elif (time < earliest):
+            raise ValueError("Cannot activate at tick " + str(time) + ", the earliest is " + str(earliest))
+
+        self.sequence += 1
+        self.pending[id(steppable)] = (time, self.sequence)
+
+        heapq.heappush(self.queue, (time, self.sequence, steppable))
+
+    def activateIn(self, steppable, delay):
+        """ Registers the next activation of a steppable a number of ticks after the current one.
+
+        Args:
+            steppable (Steppable): An agent or helper in the schedule.
+            delay (int): The number of ticks, at least 1 while stepping.
+        """
+        self.activateAt(steppable, self.time + delay)
+
+    def getNextActivation(self, steppable):
+        """ Returns the tick a steppable will next be stepped at.
+
+        Args:
+            steppable (Steppable): An agent or helper in the schedule.
+
+        Returns:
+            int: The tick, None if the steppable is dormant.
+        """
+        activation = self.pending.get(id(steppable))
+
+        return activation[0] if activation is not None else None
+
+    def popActive(self):
+        """ Removes the steppables due at the current tick from the queue.
+
+        Returns:
+            ([Helper], [Agent]): The active helpers, in the order they were added, and the active agents.
+        """
+        queue = self.queue
+        pending = self.pending
+        boundSteps = self.boundSteps
+
+        helpers = []
+        agents = []
+
+        while (len(queue) > 0 and queue[0][0] <= self.time):
+            time, sequence, steppable = heapq.heappop(queue)
+
+            # stale entries, replaced by a later activation or left by a steppable no longer in the schedule
+            if (pending.get(id(steppable)) != (time, sequence) or id(steppable) not in boundSteps):
+                continue
+
+            del pending[id(steppable)]
+
+            if (isinstance(steppable, Helper)):
+                helpers.append(steppable)
+            else:
+                agents.append(steppable)
+
+        if (len(helpers) > 1):
+            helperOrder = dict((id(h), i) for i, h in enumerate(self.helpers))
+            helpers.sort(key=lambda h: helperOrder[id(h)])
+
+        return helpers, agents
+
+    def step(self, model):
+        """ Runs the current tick: the steppables due go through stepPrologue, stepMain and stepEpilogue, then the
+        schedule moves on to the next tick.
+
+         Args:
+             model (model): The current model.
+        """
+        helpers, agents = self.popActive()
+
+        self.orderAgents(agents)
+
+        try:
+            self.stepActive(model, agents, helpers)
+        finally:
+            self.time += 1
+
+
+class ActiveSchedule(Schedule):
+    """ A schedule which only steps awake agents, for models where most agents are idle most of the time (Eg: the
+    static parts of a Game of Life board). Agents are awake when added and stay awake until they call sleep, usually
+    when they had nothing to do. Sleeping agents are woken by other agents through wake or wakeNeighbours, or by the
+    grids the schedule watches whenever an agent moves next to them. Helpers are always stepped.
+
+    Within an epoch, wake and sleep take effect from the next epoch and a wake wins over a sleep, whatever the order
+    they were called in. Awake agents are kept in the order they were woken in, the schedule's order is applied to
+    that, so sequential and seeded runs are reproducible.
+    """
+
+    def __init__(self, order="shuffle", seed=None):
+        """ Constructor, initiates the schedule with no agents.
+
+        Args:
+            order (str): The order the awake agents are stepped in, see Schedule.
+            seed (int): The seed of the schedule's random generators, None to use the global ones.
+        """
+        super(ActiveSchedule, self).__init__(order, seed)
+
+        # id(agent) => agent, for the agents stepped at the next epoch
+        self.awake = OrderedDict()
+
+        # the wakes and sleeps requested during the current epoch
+        self.woken = OrderedDict()
+        self.sleeping = set()
+
+    def addAgent(self, agent):
+        """ Adds an agent to the schedule, awake.
+
+        Args:
+            agent (agent): The agent we want to add.
+        """
+        super(ActiveSchedule, self).addAgent(agent)
+        self.wake(agent)
+
+    def removeAgent(self, agent):
+        """ Removes an agent from the schedule.
+
+        Args:
+            agent (agent): The agent we want to remove.
+        """
+        super(ActiveSchedule, self).removeAgent(agent)
+
+        self.awake.pop(id(agent), None)
+        self.woken.pop(id(agent), None)
+        self.sleeping.discard(id(agent))
+
+    def wake(self, agent):
+        """ Marks an agent as awake, agents which are not in the schedule are ignored.
+
+        Args:
+            agent (Agent): The agent.
+        """
+        if (not self.hasAgent(agent)):
+            return
+
+        if (self.stepping):
+            self.woken[id(agent)] = agent
+        else:
+            self.awake[id(agent)] = agent
+
+    def sleep(self, agent):
+        """ Puts an agent to sleep, it is not stepped again until woken.
+
+        Args:
+            agent (Agent): The agent.
+        """
+        if (self.stepping):
+            self.sleeping.add(id(agent))
+        else:
+            self.awake.pop(id(agent), None)
+
+    def isAwake(self, agent):
+        """ Checks if an agent will be stepped at the next epoch.
+
+        Args:
+            agent (Agent): The agent.
+
+        Returns:
+            bool: True if the agent is awake.
+        """
+        agentId = id(agent)
+
+        return agentId in self.woken or (agentId in self.awake and agentId not in self.sleeping)
+
+    def getAwakeCount(self):
+        """ Returns the number of agents stepped at the next epoch.
+
+        Returns:
+            int: The number of awake agents.
+        """
+        return len((set(self.awake) - self.sleeping) | set(self.woken))
+
+    def wakeNeighbours(self, agent, grid, radius=1, kind="moore"):
+        """ Wakes the agents around an agent on a grid, Eg: after its state changed.
+
+        Args:
+            agent (Agent): The agent.
+            grid (ObjectGrid): The grid.
+            radius (int): The largest distance of a neighbour.
+            kind (str): "moore", "vonneumann" or "euclidean", see Grid.getNeighbourhoodPositions.
+        """
+        for neighbour in grid.getAgentsInNeighbourhood(grid.getAgentPosition(agent), radius, kind):
+            self.wake(neighbour)
+
+    def watchGrid(self, grid, radius=1):
+        """ Wakes agents whenever an agent moves on, arrives on or leaves a grid: the agent itself and those around
+        its previous and new positions.
+
+        Args:
+            grid (ObjectGrid): The grid.
+            radius (int): The largest (moore) distance of a neighbour woken.
+        """
+        grid.addMoveListener(functools.partial(self.onAgentMoved, radius=radius))
+
+    def onAgentMoved(self, grid, agent, coordinatesOld, coordinatesNew, radius=1):
+        """ Wakes the agents affected by a move, see watchGrid.
+
+        Args:
+            grid (ObjectGrid): The grid.
+            agent (Agent): The agent which moved.
+            coordinatesOld ((int, int) OR (int, int, int)): Its previous position, None if it arrived on the grid.
+            coordinatesNew ((int, int) OR (int, int, int)): Its new position, None if it left the grid.
+            radius (int): The largest (moore) distance of a neighbour woken.
+        """
+        self.wake(agent)
+
+        for coordinatesTuple in (coordinatesOld, coordinatesNew):
+            if (coordinatesTuple is not None):
+                for neighbour in grid.getAgentsInNeighbourhood(grid.coordinatesClass(*coordinatesTuple), radius):
+                    self.wake(neighbour)
+
+    def step(self, model):
+        """ Steps all helpers and the awake agents, in the schedule's order, through the three acts.
+
+         Args:
+             model (model): The current model.
+        """
+        active = list(self.awake.values())
+        self.orderAgents(active)
+
+        try:
+            self.stepActive(model, active)
+        finally:
+            for agentId in self.sleeping:
+                self.awake.pop(agentId, None)
+
+            self.awake.update(self.woken)
 
-        for a in self.agents:
-            a.stepEpilogue(model)
+            self.woken = OrderedDict()
+            self.sleeping = set()
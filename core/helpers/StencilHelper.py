@@ -0,0 +1,258 @@
+""" A helper applying a stencil (Eg: diffusion), decay and source/sink terms to a numerical grid at every time-step.
+"""
+
+import numpy
+
+from panacea.core.Steppables import Helper
+
+
+class StencilHelper(Helper):
+    """ Applies a kernel to all values of a numerical grid in place, followed by decay and source/sink terms, once or
+    several times per epoch. For each sub-step:
+
+        new value = (sum over the kernel of weight * neighbour value) * (1 - decay) + source
+
+    where the kernel is centred on the position being updated and the weight at a given offset applies to the
+    neighbour at that offset. Neighbours outside the grid are handled according to the boundary condition, which
+    defaults to the boundary mode of the grid:
+
+        "clip": treated as 0, mass flowing out of the grid is lost.
+        "wrap": the grid is periodic.
+        "reflect": the edge of the grid acts as a mirror, no mass flows out of the grid.
+
+    All working arrays are allocated the first time the helper runs, sub-steps do not allocate. The grid updated must
+    be dense, a source grid may be sparse and is then copied to a dense array once per epoch.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """ Creates the helper.
+
+         Args:
+             gridName (str): The name of the numerical grid we are updating.
+             kernel (numpy.ndarray): The stencil, it must have as many dimensions as the grid and an odd size along
+             each of them.
+             decay (double): The fraction of the value lost at every sub-step.
+             boundary (str): "clip", "wrap" or "reflect", None (default) to follow the boundary mode of the grid.
+             substeps (int): The number of times the stencil is applied per epoch.
+             source (double OR numpy.ndarray OR str): Added to every position after each sub-step, negative values
+             act as sinks. A string is taken as the name of a numerical grid holding the values to add.
+             phase (str): The schedule phase in which the helper runs, "stepPrologue", "stepMain" or
+             "stepEpilogue".
+
+                OR
+
+             [(str) gridName, (double) diffusionRate, (double) decay, (str) boundary, (int) substeps] : A list of
+             parameters as loaded from XML, the kernel is then a diffusion kernel (see diffusionKernel).
+        """
+        if (len(args) == 1 and isinstance(args[0], list)):
+            args = args[0]
+
+            self.gridName = args[0]
+            self.diffusionRate = float(args[1])
+            self.kernel = None
+            self.decay = float(args[2]) if len(args) > 2 else 0.
+            self.boundary = args[3] if len(args) > 3 else None
+            self.substeps = int(args[4]) if len(args) > 4 else 1
+            self.source = None
+            self.phase = "stepEpilogue"
+
+        else:
+            self.gridName = args[0]
+            self.diffusionRate = None
+            self.kernel = numpy.asarray(args[1], dtype=numpy.float64)
+            self.decay = float(kwargs.get("decay", 0.))
+            self.boundary = kwargs.get("boundary", None)
+            self.substeps = int(kwargs.get("substeps", 1))
+            self.source = kwargs.get("source", None)
+            self.phase = kwargs.get("phase", "stepEpilogue")
+
+        if (self.boundary not in (None, "clip", "wrap", "reflect")):
+            raise ValueError("Unknown boundary condition: " + str(self.boundary))
+
+        # working arrays, allocated on first use
+        self.padded = None
+        self.accumulator = None
+        self.scratch = None
+
+        # the boundary condition the halo was last filled for
+        self.haloBoundary = None
+
+    @staticmethod
+    def diffusionKernel(dimensions, rate):
+        """ Returns the explicit finite-difference diffusion kernel: each position gives a fraction "rate" of its
+        value to each of its von Neumann neighbours. The scheme is stable for rate <= 1 / (2 * dimensions).
+
+        Args:
+            dimensions (int): 2 or 3.
+            rate (double): The diffusion rate.
+
+        Returns:
+            numpy.ndarray: A 3x3 or 3x3x3 kernel.
+        """
+        kernel = numpy.zeros((3,) * dimensions)
+
+        for axis in range(dimensions):
+            for side in (0, 2):
+                index = [1] * dimensions
+                index[axis] = side
+                kernel[tuple(index)] = rate
+
+        kernel[(1,) * dimensions] = 1. - 2. * dimensions * rate
+
+        return kernel
+
+    def stepPrologue(self, model):
+        if (self.phase == "stepPrologue"):
+            self.applyToGrid(model.getGridFromName(self.gridName), model)
+
+    def stepMain(self, model):
+        if (self.phase == "stepMain"):
+            self.applyToGrid(model.getGridFromName(self.gridName), model)
+
+    def stepEpilogue(self, model):
+        if (self.phase == "stepEpilogue"):
+            self.applyToGrid(model.getGridFromName(self.gridName), model)
+
+    def applyToGrid(self, grid, model=None):
+        """ Runs all sub-steps on a grid.
+
+        Args:
+            grid (NumericalGrid): The grid we are updating.
+            model (Model): The current model, only needed when the source is the name of a grid.
+
+        Raises:
+            ValueError: If the grid is sparse.
+        """
+        values = grid.grid
+
+        if (values is None):
+            raise ValueError("The stencil can only be applied to a dense numerical grid, " + str(grid.getGridName()) +
+                             " has no dense storage")
+
+        if (self.kernel is None):
+            self.kernel = self.diffusionKernel(values.ndim, self.diffusionRate)
+
+        self.allocate(values)
+
+        boundary = self.boundary if self.boundary is not None else grid.getBoundary()
+
+        if (boundary != self.haloBoundary):
+            # a clipped halo must be zero, it may hold values from another boundary condition
+            self.padded.fill(0)
+            self.haloBoundary = boundary
+
+        source = self.source
+
+        if (isinstance(source, str)):
+            source = model.getGridFromName(source).getGrid()
+
+        for i in range(self.substeps):
+            self.applyOnce(values, source, boundary)
+
+    def allocate(self, values):
+        """ Allocates the working arrays for a grid of the given shape, unless they already fit.
+
+        Args:
+            values (numpy.ndarray): The values of the grid.
+        """
+        if (self.kernel.ndim != values.ndim):
+            raise ValueError("The kernel must have as many dimensions as the grid")
+
+        if (any(n % 2 == 0 for n in self.kernel.shape)):
+            raise ValueError("The kernel must have an odd size along every dimension")
+
+        self.halo = tuple(n // 2 for n in self.kernel.shape)
+
+        # integer grids are accumulated in double precision and rounded back when copied in
+        if (numpy.issubdtype(values.dtype, numpy.floating)):
+            dtype = values.dtype
+        else:
+            dtype = numpy.float64
+
+        paddedShape = tuple(n + 2 * h for n, h in zip(values.shape, self.halo))
+
+        if (self.padded is None or self.padded.shape != paddedShape or self.padded.dtype != dtype):
+            self.padded = numpy.zeros(paddedShape, dtype=dtype)
+            self.accumulator = numpy.zeros(values.shape, dtype=dtype)
+            self.scratch = numpy.zeros(values.shape, dtype=dtype)
+
+            self.interior = tuple(slice(h, h + n) for n, h in zip(values.shape, self.halo))
+
+            # the slice of the padded array seen by every non-zero kernel weight
+            self.weights = []
+
+            for offset in zip(*numpy.nonzero(self.kernel)):
+                window = tuple(slice(o, o + n) for o, n in zip(offset, values.shape))
+                self.weights.append((window, self.kernel[offset]))
+
+    def fillHalo(self, boundary):
+        """ Fills the cells surrounding the copy of the grid according to the boundary condition. Axes are filled
+        one after the other over the full extent of the others, so corners end up right too.
+
+        Args:
+            boundary (str): "clip", "wrap" or "reflect".
+        """
+        if (boundary == "clip"):
+            # the halo is zeroed on allocation and never written
+            return
+
+        padded = self.padded
+
+        for axis, h in enumerate(self.halo):
+            if (h == 0):
+                continue
+
+            n = padded.shape[axis] - 2 * h
+
+            for i in range(h):
+                lower = [slice(None)] * padded.ndim
+                upper = [slice(None)] * padded.ndim
+
+                lowerFrom = [slice(None)] * padded.ndim
+                upperFrom = [slice(None)] * padded.ndim
+
+                lower[axis] = h - 1 - i
+                upper[axis] = h + n + i
+
+                if (boundary == "wrap"):
+                    lowerFrom[axis] = h + n - 1 - i
+                    upperFrom[axis] = h + i
+                else:
+                    lowerFrom[axis] = h + min(i, n - 1)
+                    upperFrom[axis] = h + n - 1 - min(i, n - 1)
+
+                padded[tuple(lower)] = padded[tuple(lowerFrom)]
+                padded[tuple(upper)] = padded[tuple(upperFrom)]
+
+    def applyOnce(self, values, source, boundary):
+        """ Runs a single sub-step.
+
+        Args:
+            values (numpy.ndarray): The values of the grid, updated in place.
+            source (double OR numpy.ndarray): The source/sink term, None for none.
+            boundary (str): "clip", "wrap" or "reflect".
+        """
+        padded = self.padded
+        accumulator = self.accumulator
+        scratch = self.scratch
+
+        padded[self.interior] = values
+        self.fillHalo(boundary)
+
+        accumulator.fill(0)
+
+        for window, weight in self.weights:
+            numpy.multiply(padded[window], weight, out=scratch)
+            numpy.add(accumulator, scratch, out=accumulator)
+
+        if (self.decay != 0):
+            numpy.multiply(accumulator, 1. - self.decay, out=accumulator)
+
+        if (source is not None):
+            numpy.add(accumulator, source, out=accumulator)
+
+        if (accumulator.dtype == values.dtype):
+            values[...] = accumulator
+        else:
+            numpy.rint(accumulator, out=accumulator)
+            numpy.copyto(values, accumulator, casting="unsafe")
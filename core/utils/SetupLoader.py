@@ -71,10 +71,16 @@ class XMLLoader(Loader):
             for p in instanceParameters:
                 parameters.append(p.attrib["value"])
 
+            # optional keyword arguments of the grid (Eg: storage options), passed by name
+            options = {}
+
+            for o in m.findall("options/*"):
+                options[str(o.attrib["name"])] = o.attrib["value"]
+
             # And finally actually instantiating the class
             module = importlib.import_module(g["module"])
             my_class = getattr(module, g["class"])
-            grid = my_class(parameters)
+            grid = my_class(parameters, **options)
 
             model.addGrid(grid)
 
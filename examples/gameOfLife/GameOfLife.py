@@ -1,9 +1,10 @@
 from panacea.core.Coordinates import Coordinates2D
-from panacea.core.Grid import ObjectGrid2D
-from panacea.core.Schedule import Schedule
+from panacea.core.Grid import ObjectGrid2D, getNeighbourhoodOffsets, getShiftSlices
+from panacea.core.Schedule import Schedule, ActiveSchedule
 from panacea.core.Steppables import *
 from panacea.core.Model import *
 import Tkinter
+import numpy
 from time import sleep
 
 import random
@@ -82,6 +83,9 @@ class GOLCell(Agent):
     state = None
     stateNext = None
 
+    # stepMain only writes stateNext, so it can be run by a ParallelSchedule
+    parallelOutputs = {"stepMain": ("stateNext",)}
+
     def __init__(self, *args):
 
         if (len(args) == 1):
@@ -96,9 +100,18 @@ class GOLCell(Agent):
         pass
 
     def stepEpilogue(self, model):
+        changed = self.state != self.stateNext
+
         # Making good use of our three-act timestep
         self.state = self.stateNext
 
+        # with an active set, only cells next to a change can change at the next generation
+        if (isinstance(model.schedule, ActiveSchedule)):
+            if (changed):
+                model.schedule.wakeNeighbours(self, model.getGridFromName("golgrid"))
+            else:
+                model.schedule.sleep(self)
+
     def stepMain(self, model):
         # get the grid
         grid = model.getGridFromName("golgrid")
@@ -135,6 +148,70 @@ class GOLCell(Agent):
 
         a = 1
 
+    @classmethod
+    def stepMainBatch(cls, agents, model, prepared=None):
+        """ The rule of stepMain applied to many cells at once, the schedule calls this instead of stepMain. Live
+        neighbours are counted by adding up shifted copies of the board.
+
+        Args:
+            agents ([GOLCell]): The cells to step.
+            model (Model): The current model.
+            prepared ((numpy.ndarray, numpy.ndarray)): The board and live neighbour counts, see
+            stepMainBatchPrepare. None to count them here.
+        """
+        grid = model.getGridFromName("golgrid")
+
+        if (prepared is None):
+            prepared = cls.stepMainBatchPrepare(agents, model)
+
+        if (prepared is None):
+            for agent in agents:
+                agent.stepMain(model)
+
+            return
+
+        board, alive = prepared
+
+        positions = tuple(numpy.array([grid.getAgentPosition(a).getCoordinates() for a in agents]).T)
+        states = board[positions]
+        counter = alive[positions]
+
+        statesNext = ((counter == 3) | ((states == 1) & (counter == 2))).astype(int)
+
+        for agent, stateNext in zip(agents, statesNext.tolist()):
+            agent.stateNext = stateNext
+
+    @classmethod
+    def stepMainBatchPrepare(cls, agents, model):
+        """ Counts the live neighbours of every cell on the board. A ParallelSchedule calls this once per epoch with
+        all the cells it steps and shares the result between chunks, which then only read their own cells.
+
+        Args:
+            agents ([GOLCell]): The cells to step.
+            model (Model): The current model.
+
+        Returns:
+            (numpy.ndarray, numpy.ndarray): The board and the number of live neighbours of every position, None when
+            stepping the cells one by one is cheaper.
+        """
+        grid = model.getGridFromName("golgrid")
+
+        # building the board only pays off when a good share of it is stepped (Eg: not with a small active set)
+        if (grid.getBoundary() != "clip" or len(agents) * 16 < len(grid.agentRegistry)):
+            return None
+
+        # the board holds every cell on the grid, the agents given may only be some of them
+        board = numpy.zeros(grid.getSize(), dtype=int)
+        board[tuple(grid.getPositionArray().T)] = [a.state for a in grid.getPositionArrayAgents()]
+
+        alive = numpy.zeros_like(board)
+
+        for offset in getNeighbourhoodOffsets(2, "moore"):
+            destination, source = getShiftSlices(offset, board.shape)
+            alive[destination] += board[source]
+
+        return board, alive
+
 
 
 
@@ -168,7 +245,8 @@ class GOLModel(Model):
 
         size = 20
         grid = ObjectGrid2D(size, size, "golgrid")
-        s = Schedule()
+        # cells read their neighbours' state and only update their own in stepEpilogue, so the order is irrelevant
+        s = Schedule(order="sequential")
 
         s.addHelper(GameOfLifeRenderer(grid))
 
@@ -1,5 +1,9 @@
+import copy
+import pickle
 import unittest
 
+import numpy as np
+
 from panacea.core.Coordinates import *
 from panacea.core.Grid import ObjectGrid2D, ObjectGrid3D
 
@@ -241,6 +245,32 @@ class TestCoordinates(unittest.TestCase):
         self.assertEqual(Coordinates3D(2, 2, 2), 2 * a)
         self.assertEqual(Coordinates3D(2, 2, 2), a * 2)
 
+    def test_hash_coord(self):
+        a = Coordinates2D(1, 2)
+        b = Coordinates2D(1, 2)
+
+        self.assertEqual(hash(a), hash(b))
+        self.assertEqual(1, len(set([a, b])))
+
+        # coordinates match the tuples of their values
+        index = {a: "a", Coordinates3D(1, 2, 3): "c"}
+        self.assertEqual("a", index[(1, 2)])
+        self.assertEqual("c", index[Coordinates3D(1, 2, 3).getCoordinates()])
+
+        self.assertNotEqual(Coordinates2D(1, 2), Coordinates3D(1, 2, 0))
+
+    def test_immutable_coord(self):
+        a = Coordinates2D(1, 2)
+        b = Coordinates3D(1, 2, 3)
+
+        self.assertRaises(AttributeError, setattr, a, "x", 5)
+        self.assertRaises(AttributeError, setattr, b, "z", 5)
+        self.assertRaises(AttributeError, setattr, a, "w", 5)
+
+        self.assertEqual(a, pickle.loads(pickle.dumps(a)))
+        self.assertEqual(b, pickle.loads(pickle.dumps(b, 2)))
+        self.assertEqual(b, copy.deepcopy(b))
+
     def test_coordinate_in_grid_2d(self):
         grid = ObjectGrid2D(15, 15, "")
 
@@ -298,37 +328,69 @@ class TestCoordinates(unittest.TestCase):
 
         neigh = c.getMooreNeigh(grid)
 
-        expNeigh = [
-            Coordinates3D(x + 1, y + 1, z + 1),
-            Coordinates3D(x + 1, y + 1, z - 1),
-            Coordinates3D(x + 1, y + 1, z),
-            Coordinates3D(x + 1, y - 1, z + 1),
-            Coordinates3D(x + 1, y - 1, z - 1),
-            Coordinates3D(x + 1, y - 1, z),
-            Coordinates3D(x + 1, y, z + 1),
-            Coordinates3D(x + 1, y, z - 1),
-            Coordinates3D(x + 1, y, z),
-            Coordinates3D(x - 1, y - 1, z - 1),
-            Coordinates3D(x - 1, y + 1, z - 1),
-            Coordinates3D(x - 1, y + 1, z),
-            Coordinates3D(x - 1, y - 1, z),
-            Coordinates3D(x - 1, y - 1, z - 1),
-            Coordinates3D(x - 1, y - 1, z),
-            Coordinates3D(x - 1, y, z + 1),
-            Coordinates3D(x - 1, y, z - 1),
-            Coordinates3D(x - 1, y, z),
-            Coordinates3D(x, y + 1, z + 1),
-            Coordinates3D(x, y + 1, z - 1),
-            Coordinates3D(x, y + 1, z),
-            Coordinates3D(x, y - 1, z + 1),
-            Coordinates3D(x, y - 1, z - 1),
-            Coordinates3D(x, y - 1, z),
-            Coordinates3D(z, y, z + 1),
-            Coordinates3D(x, y, z - 1),
-            Coordinates3D(x, y, z)
-        ]
+        expNeigh = [Coordinates3D(x + i, y + j, z + k)
+                     for i in (-1, 0, 1) for j in (-1, 0, 1) for k in (-1, 0, 1) if (i, j, k) != (0, 0, 0)]
+
+        self.assertEqual(26, len(neigh))
+        self.assertEqual(sorted(neigh), sorted(expNeigh))
+
+        # clipped at a corner, the same neighbours as the other boundary modes inside the grid
+        corner = Coordinates3D(0, 0, 0).getMooreNeigh(grid)
+
+        self.assertEqual(7, len(corner))
+        self.assertEqual(sorted(neigh), sorted(c.getMooreNeigh(ObjectGrid3D(15, 15, 15, "", boundary="wrap"))))
+
+    def test_coordinate_array_2d(self):
+        coordinates = [Coordinates2D(0, 0), Coordinates2D(3, 4), Coordinates2D(-1, 2)]
+        array = CoordinateArray2D.fromCoordinates(coordinates)
+
+        self.assertEqual(3, len(array))
+        self.assertEqual((3, 2), array.getArray().shape)
+        self.assertEqual(coordinates, array.toCoordinates())
+        self.assertEqual(Coordinates2D(3, 4), array[1])
+
+        self.assertEqual([Coordinates2D(1, 1), Coordinates2D(4, 5), Coordinates2D(0, 3)],
+                         (array + Coordinates2D(1, 1)).toCoordinates())
+        self.assertEqual([Coordinates2D(0, 0), Coordinates2D(0, 0), Coordinates2D(0, 0)],
+                         (array - array).toCoordinates())
+        self.assertEqual([Coordinates2D(0, 0), Coordinates2D(6, 8), Coordinates2D(-2, 4)],
+                         (2 * array).toCoordinates())
+        self.assertEqual([Coordinates2D(0, 0), Coordinates2D(3, 4), Coordinates2D(-3, 6)],
+                         (array * [1, 1, 3]).toCoordinates())
+
+        # the operands are left untouched
+        self.assertEqual(coordinates, array.toCoordinates())
+
+        origin = Coordinates2D(0, 0)
+
+        self.assertEqual([c.getEuclideanDistanceFromCoordinate(origin) for c in coordinates],
+                         array.getEuclideanDistances(origin).tolist())
+        self.assertEqual([c.getManhattanDistanceFroomCoordinate(origin) for c in coordinates],
+                         array.getManhattanDistances(origin).tolist())
+
+        pairs = array.getManhattanDistances(array)
+        self.assertEqual((3, 3), pairs.shape)
+
+        for i, a in enumerate(coordinates):
+            for j, b in enumerate(coordinates):
+                self.assertEqual(a.getManhattanDistanceFroomCoordinate(b), pairs[i, j])
+                self.assertAlmostEqual(a.getEuclideanDistanceFromCoordinate(b),
+                                       array.getEuclideanDistances(array)[i, j])
+
+        grid = ObjectGrid2D(4, 4, "")
+        mask = array.inGrid(grid)
+
+        self.assertEqual([True, False, False], mask.tolist())
+        self.assertEqual([Coordinates2D(0, 0)], array[mask].toCoordinates())
+
+    def test_coordinate_array_3d(self):
+        array = CoordinateArray3D(np.array([[0.5, 1, 2], [3, 4, 5]]))
 
-        self.assertEqual(neigh, expNeigh)
+        self.assertEqual(Coordinates3D(0.5, 1, 2), array[0])
+        self.assertEqual(CoordinateArray3D([[1.5, 2, 3], [4, 5, 6]]), array + Coordinates3D(1, 1, 1))
+        self.assertEqual((2, 1), array.getEuclideanDistances(CoordinateArray3D([(0, 0, 0)])).shape)
+        self.assertEqual([True, True], array.inGrid(ObjectGrid3D(6, 6, 6, "")).tolist())
+        self.assertEqual(0, len(CoordinateArray3D([])))
 
 
 if __name__ == '__main__':
@@ -1,3 +1,8 @@
+import copy
+import os
+import shutil
+import sys
+import tempfile
 import unittest
 
 import numpy as np
@@ -92,6 +97,560 @@ class TestGrid(unittest.TestCase):
 
 
 
+    def test_reduce_neighbourhood_grid_2d(self):
+        grid = NumericalGrid2D(4, 5, "")
+        grid.grid[:] = np.arange(20).reshape(4, 5)
+
+        sums = grid.reduceNeighbourhood("sum")
+        means = grid.reduceNeighbourhood("mean")
+        minimums = grid.reduceNeighbourhood("min")
+        maximums = grid.reduceNeighbourhood("max", includeCentre=True)
+
+        for x in range(4):
+            for y in range(5):
+                values = [v for c, v in grid.getMooreNeigh(Coordinates2D(x, y))]
+
+                self.assertEqual(sum(values), sums[x, y])
+                self.assertAlmostEqual(sum(values) / len(values), means[x, y])
+                self.assertEqual(min(values), minimums[x, y])
+                self.assertEqual(max(values + [grid.grid[x, y]]), maximums[x, y])
+
+        vonNeumann = grid.reduceNeighbourhood("sum", "vonneumann")
+
+        self.assertEqual(1 + 5, vonNeumann[0, 0])
+        self.assertEqual(2 + 6 + 8 + 12, vonNeumann[1, 2])
+
+    def test_reduce_neighbourhood_small_dtypes(self):
+        grid = NumericalGrid2D(3, 3, "g", dtype="bool")
+        grid.setGridValue(Coordinates2D(0, 0), True)
+        grid.setGridValue(Coordinates2D(0, 1), True)
+
+        # booleans are counted
+        sums = grid.reduceNeighbourhood("sum")
+        self.assertEqual(np.dtype(np.int_), sums.dtype)
+        self.assertEqual(2, sums[1, 1])
+        self.assertEqual(1, sums[0, 0])
+
+        self.assertEqual(np.bool_, grid.reduceNeighbourhood("min").dtype)
+        self.assertFalse(grid.reduceNeighbourhood("min")[1, 1])
+        self.assertTrue(grid.reduceNeighbourhood("max")[1, 1])
+        self.assertFalse(grid.reduceNeighbourhood("max")[2, 2])
+        self.assertAlmostEqual(2. / 8, grid.reduceNeighbourhood("mean")[1, 1])
+
+        # small integers do not overflow
+        for dtype in ("uint8", "int8"):
+            grid = NumericalGrid2D(3, 3, "g", dtype=dtype)
+            grid.setAllGridValues(100)
+
+            self.assertEqual(800, grid.reduceNeighbourhood("sum")[1, 1])
+            self.assertEqual(100, grid.reduceNeighbourhood("min")[1, 1])
+            self.assertEqual(np.dtype(dtype), grid.reduceNeighbourhood("max").dtype)
+
+        grid = NumericalGrid2D(3, 3, "g", dtype="uint8", boundary="wrap")
+        grid.setAllGridValues(200)
+
+        self.assertEqual(1600, grid.reduceNeighbourhood("sum")[1, 1])
+
+    def test_double_buffered_grid_2d(self):
+        grid = NumericalGrid2D(3, 3, "", doubleBuffered=True)
+
+        c = Coordinates2D(1, 2)
+
+        front = grid.getGrid()
+        back = grid.getNextGrid()
+
+        grid.setAllNextGridValues(2.)
+        grid.setNextGridValue(c, 5.)
+
+        self.assertEqual(0., grid.getGridValue(c))
+
+        grid.swapBuffers()
+
+        self.assertEqual(5., grid.getGridValue(c))
+        self.assertEqual(2., grid.getGridValue(Coordinates2D(0, 0)))
+        self.assertTrue(grid.getGrid() is back)
+        self.assertTrue(grid.getNextGrid() is front)
+
+        # without carrying over, the back buffer still holds the state before the swap
+        grid.swapBuffers()
+        self.assertEqual(0., grid.getGridValue(c))
+
+        grid.setNextGridValue(c, 6.)
+        grid.swapBuffers(carryOver=True)
+        grid.swapBuffers()
+
+        self.assertEqual(6., grid.getGridValue(c))
+        self.assertEqual(2., grid.getGridValue(Coordinates2D(0, 0)))
+
+        grid.setAllGridValues(1.)
+
+        self.assertTrue(grid.getGrid() is front)
+        self.assertEqual(9., grid.getGrid().sum())
+
+        self.assertRaises(ValueError, NumericalGrid2D(3, 3, "").getNextGrid)
+
+    def test_double_buffered_grid_3d(self):
+        grid = NumericalGrid3D(["2", "2", "2", "g"], doubleBuffered=True)
+
+        grid.setAllGridValues(3.)
+        grid.setNextGridValue(Coordinates3D(1, 1, 1), 4.)
+        grid.swapBuffers()
+
+        self.assertEqual(4., grid.getGridValue(Coordinates3D(1, 1, 1)))
+        self.assertEqual(0., grid.getGridValue(Coordinates3D(0, 1, 1)))
+
+    def test_dtype_grid_2d(self):
+        grid = NumericalGrid2D(3, 3, "g", dtype="uint8")
+
+        grid.setAllGridValues(2)
+        grid.setGridValue(Coordinates2D(1, 1), 5)
+
+        self.assertEqual(np.uint8, grid.getGrid().dtype)
+        self.assertEqual(np.dtype(np.uint), grid.reduceNeighbourhood("sum").dtype)
+        self.assertEqual(np.uint8, grid.reduceNeighbourhood("max").dtype)
+        self.assertEqual(16, grid.reduceNeighbourhood("sum")[1, 1])
+
+        # means of integer grids are not truncated
+        self.assertEqual(np.float64, grid.reduceNeighbourhood("mean").dtype)
+        self.assertAlmostEqual(3., grid.reduceNeighbourhood("mean")[0, 0])
+
+        for c, v in grid.getMooreNeigh(Coordinates2D(0, 0)):
+            self.assertEqual(np.uint8, type(v))
+
+        grid = NumericalGrid2D(["3", "3", "g", "float32"], doubleBuffered=True)
+
+        self.assertEqual(np.float32, grid.getDtype())
+        self.assertEqual(np.float32, grid.getNextGrid().dtype)
+        self.assertEqual(np.float32, grid.reduceNeighbourhood("mean").dtype)
+
+    def test_dtype_grid_3d(self):
+        grid = NumericalGrid3D(2, 2, 2, "g", dtype=np.int32)
+
+        grid.setAllGridValues(1)
+
+        self.assertEqual(np.int32, grid.getGrid().dtype)
+        self.assertEqual(7, grid.reduceNeighbourhood("sum")[0, 0, 0])
+
+        grid = NumericalGrid3D(["2", "2", "2", "g", "float32"])
+        self.assertEqual(np.float32, grid.getDtype())
+
+    def test_sparse_grid_2d(self):
+        grid = SparseNumericalGrid2D(["50", "40", "g"])
+
+        self.assertEqual((50, 40), grid.getSize())
+        self.assertEqual(0., grid.getGridValue(Coordinates2D(3, 4)))
+
+        grid.setGridValue(Coordinates2D(3, 4), 2.5)
+        grid.setGridValue(Coordinates2D(10, 0), 1.)
+        grid.setGridValue(Coordinates2D(11, 0), 1.)
+        grid.setGridValue(Coordinates2D(11, 0), 0.)
+
+        self.assertEqual(2, grid.getNonZeroCount())
+        self.assertEqual(2.5, grid.getGridValue(Coordinates2D(3, 4)))
+
+        nonZero = sorted((c.getCoordinates(), v) for c, v in grid.iterNonZero())
+        self.assertEqual([((3, 4), 2.5), ((10, 0), 1.)], nonZero)
+
+        dense = grid.toDense()
+        expected = np.zeros((50, 40))
+        expected[3, 4] = 2.5
+        expected[10, 0] = 1.
+
+        self.assertEqual(True, np.array_equal(expected, dense))
+
+        neigh = dict((c.getCoordinates(), v) for c, v in grid.getMooreNeigh(Coordinates2D(3, 3)))
+        self.assertEqual(8, len(neigh))
+        self.assertEqual(2.5, neigh[(3, 4)])
+        self.assertEqual(0., neigh[(2, 2)])
+
+        self.assertEqual(2.5, grid.reduceNeighbourhood("sum")[2, 3])
+
+        self.assertRaises(IndexError, grid.setGridValue, Coordinates2D(50, 0), 1.)
+
+        grid.setAllGridValues(1.)
+        self.assertEqual(0, grid.getNonZeroCount())
+        self.assertEqual(1., grid.getGridValue(Coordinates2D(3, 4)))
+        self.assertEqual(1., grid.toDense()[49, 39])
+
+    def test_sparse_grid_3d(self):
+        grid = SparseNumericalGrid3D(4, 5, 6, "g", dtype="int32")
+
+        grid.setGridValue(Coordinates3D(1, 2, 3), 7.9)
+
+        self.assertEqual(7, grid.getGridValue(Coordinates3D(1, 2, 3)))
+
+        dense = grid.toDense()
+        self.assertEqual((4, 5, 6), dense.shape)
+        self.assertEqual(np.int32, dense.dtype)
+        self.assertEqual(7, dense.sum())
+
+        c, v = list(grid.iterNonZero())[0]
+        self.assertEqual(Coordinates3D(1, 2, 3), c)
+
+        # like dense grids, positions outside the grid are rejected
+        self.assertRaises(IndexError, grid.setGridValue, Coordinates3D(4, 0, 0), 1)
+        self.assertRaises(IndexError, grid.setGridValue, Coordinates3D(0, -1, 0), 1)
+        self.assertEqual(1, grid.getNonZeroCount())
+
+    def test_tiled_grid_2d(self):
+        # far too large to allocate a list per cell
+        grid = ObjectGrid2D(100000, 100000, "g", cellStorage="tiled", tileSize="8")
+
+        self.assertEqual(None, grid.getGrid())
+
+        a = IdleAgent(1, "")
+        b = IdleAgent(2, "")
+
+        grid.moveAgent(Coordinates2D(5, 5), a)
+        grid.moveAgent(Coordinates2D(99999, 99999), b)
+
+        self.assertEqual(2, grid.cellTiles.getTileCount())
+        self.assertEqual([a], grid.getAtPos(Coordinates2D(5, 5)))
+        self.assertEqual([b], grid.getAtPos(Coordinates2D(99998, 99999)))
+        self.assertEqual([], grid.getAtPos(Coordinates2D(6, 5)))
+
+        grid.moveAgent(Coordinates2D(6, 5), a)
+        self.assertEqual([a], grid.getAtPos(Coordinates2D(6, 5)))
+        self.assertEqual(2, grid.cellTiles.getTileCount())
+
+        grid.moveAgent(Coordinates2D(50, 50), a)
+        self.assertEqual(2, grid.cellTiles.getTileCount())
+
+        grid.removeAgent(b)
+        self.assertEqual(1, grid.cellTiles.getTileCount())
+        self.assertEqual([], grid.getAtPos(Coordinates2D(99999, 99999)))
+
+        grid.moveAgent(Coordinates2D(50, 50), IdleAgent(1, ""))
+        grid.moveAgent(Coordinates2D(50, 51), IdleAgent(1, ""))
+        self.assertEqual(Coordinates2D(50, 50), grid.getMostPopulatedMooreNeigh(Coordinates2D(51, 51)))
+        self.assertEqual(2, len(grid.getAtPos(Coordinates2D(50, 50))))
+
+    def test_tiled_grid_matches_dense_3d(self):
+        dense = ObjectGrid3D(10, 10, 10, "g")
+        tiled = ObjectGrid3D(10, 10, 10, "g", cellStorage="tiled", tileSize=4)
+
+        agents = [IdleAgent(1 + i % 2, "") for i in range(30)]
+        xs = np.arange(30) % 10
+        ys = (np.arange(30) * 3) % 10
+        zs = (np.arange(30) * 7) % 10
+
+        dense.moveAgents(agents, xs, ys, zs)
+        tiled.moveAgents(agents, xs, ys, zs)
+
+        dense.moveAgents(agents[:10], zs[:10], xs[:10], ys[:10])
+        tiled.moveAgents(agents[:10], zs[:10], xs[:10], ys[:10])
+
+        for agent in agents[20:]:
+            dense.removeAgent(agent)
+            tiled.removeAgent(agent)
+
+        self.assertEqual(True, np.array_equal(dense.getAgentCounts(), tiled.getAgentCounts()))
+
+        for c in [Coordinates3D(1, 3, 7), Coordinates3D(0, 0, 0), Coordinates3D(9, 7, 3), Coordinates3D(4, 4, 4)]:
+            self.assertEqual(dense.getAtPos(c), tiled.getAtPos(c))
+
+        self.assertRaises(ValueError, ObjectGrid3D, 2, 2, 2, "g", cellStorage="sparse")
+
+    def test_boundary_move_grid_2d(self):
+        wrapped = ObjectGrid2D(10, 10, "g", boundary="wrap")
+        reflected = ObjectGrid2D(10, 10, "g", boundary="reflect")
+
+        a = IdleAgent(1, "")
+        b = IdleAgent(1, "")
+
+        wrapped.moveAgent(Coordinates2D(-1, 12), a)
+        reflected.moveAgent(Coordinates2D(-2, 11), b)
+
+        self.assertEqual(Coordinates2D(9, 2), wrapped.getAgentPosition(a))
+        self.assertEqual(Coordinates2D(1, 8), reflected.getAgentPosition(b))
+        self.assertEqual(1, wrapped.getAgentCounts()[9, 2])
+
+        xs, ys = wrapped.moveAgents([a, b], np.array([10, -3]), np.array([5, 25]))
+
+        self.assertEqual([0, 7], xs.tolist())
+        self.assertEqual([5, 5], ys.tolist())
+        self.assertEqual([b], wrapped.getAtPos(Coordinates2D(7, 5)))
+
+        self.assertRaises(ValueError, ObjectGrid2D, 10, 10, "g", boundary="torus")
+
+    def test_boundary_neighbours_grid_2d(self):
+        grid = ObjectGrid2D(10, 10, "g", boundary="wrap")
+
+        neigh = [c.getCoordinates() for c, agents in grid.getMooreNeigh(Coordinates2D(0, 0))]
+
+        self.assertEqual(8, len(neigh))
+        self.assertEqual(True, (9, 9) in neigh)
+        self.assertEqual(True, (1, 9) in neigh)
+
+        # on a 2x2 torus, left and right neighbours are the same position
+        self.assertEqual(3, len(Coordinates2D(0, 0).getMooreNeigh(ObjectGrid2D(2, 2, "g", boundary="wrap"))))
+
+        # mirrored neighbours are the centre or already in-grid neighbours
+        reflected = ObjectGrid2D(10, 10, "g", boundary="reflect")
+        neigh = [c.getCoordinates() for c in Coordinates2D(0, 0).getMooreNeigh(reflected)]
+        self.assertEqual([(0, 1), (1, 0), (1, 1)], sorted(neigh))
+
+        # every neighbour of (0, 0) but (9, 9) is taken
+        for c in grid.getNeighbourTuples((0, 0)):
+            if (c != (9, 9)):
+                grid.moveAgent(Coordinates2D(*c), IdleAgent(1, ""))
+
+        self.assertEqual(Coordinates2D(9, 9), grid.getLeastPopulatedMooreNeigh(Coordinates2D(0, 0)))
+
+        # agents spanning several cells reach across the edges
+        big = IdleAgent(2, "")
+        grid.moveAgent(Coordinates2D(9, 9), big)
+
+        self.assertEqual(True, big in grid.getAtPos(Coordinates2D(0, 0)))
+        self.assertEqual(True, big in grid.getAtPos(Coordinates2D(8, 0)))
+        self.assertEqual(1, grid.getAgentCounts()[0, 0])
+        self.assertEqual(2, grid.getAgentCounts()[0, 9])
+
+        grid.removeAgent(big)
+        self.assertEqual(0, grid.getAgentCounts()[0, 0])
+
+    def test_boundary_grid_3d(self):
+        grid = ObjectGrid3D(4, 4, 4, "g", boundary="wrap")
+
+        neigh = grid.getMooreNeigh(Coordinates3D(0, 0, 0))
+
+        self.assertEqual(26, len(neigh))
+        self.assertEqual(True, Coordinates3D(3, 3, 3) in [c for c, agents in neigh])
+
+        values = NumericalGrid3D(3, 3, 3, "v", boundary="wrap")
+        values.setGridValue(Coordinates3D(2, 2, 2), 1.)
+
+        neigh = values.getMooreNeigh(Coordinates3D(0, 0, 0))
+
+        self.assertEqual(26, len(neigh))
+        self.assertEqual(1., sum(v for c, v in neigh))
+
+    def test_boundary_reduce_neighbourhood(self):
+        values = np.random.random((4, 5))
+
+        for boundary, padding in (("wrap", "wrap"), ("reflect", "symmetric")):
+            grid = NumericalGrid2D(4, 5, "g", boundary=boundary)
+            grid.getGrid()[:] = values
+
+            padded = np.pad(values, 1, mode=padding)
+
+            windows = [padded[1 + i:5 + i, 1 + j:6 + j] for i in (-1, 0, 1) for j in (-1, 0, 1) if i or j]
+
+            self.assertEqual(True, np.allclose(sum(windows), grid.reduceNeighbourhood("sum")))
+            self.assertEqual(True, np.allclose(sum(windows) / 8., grid.reduceNeighbourhood("mean")))
+            self.assertEqual(True, np.allclose(np.max(windows, axis=0), grid.reduceNeighbourhood("max")))
+
+            sparse = SparseNumericalGrid2D(4, 5, "s", boundary=boundary)
+            sparse.setGridValue(Coordinates2D(0, 0), 1.)
+            self.assertEqual(True, sparse.reduceNeighbourhood("sum")[3, 4] == (1. if boundary == "wrap" else 0.))
+
+    def test_neighbourhood_offsets(self):
+        self.assertEqual(48, len(getNeighbourhoodOffsetArray(2, "moore", 3)))
+        self.assertEqual(24, len(getNeighbourhoodOffsetArray(2, "vonneumann", 3)))
+        self.assertEqual(28, len(getNeighbourhoodOffsetArray(2, "euclidean", 3)))
+        self.assertEqual(26, len(getNeighbourhoodOffsetArray(3, "moore", 1)))
+        self.assertEqual(6, len(getNeighbourhoodOffsetArray(3, "vonneumann", 1)))
+
+        # computed once
+        self.assertEqual(True, getNeighbourhoodOffsetArray(2, "moore", 3) is getNeighbourhoodOffsetArray(2, "moore", 3))
+
+        self.assertRaises(ValueError, getNeighbourhoodOffsetArray, 2, "hexagonal", 1)
+
+    def test_neighbourhood_grid_2d(self):
+        grid = ObjectGrid2D(10, 10, "g")
+
+        self.assertEqual(24, len(grid.getNeighbourhood(Coordinates2D(5, 5), 2)))
+        self.assertEqual(8, len(grid.getNeighbourhood(Coordinates2D(0, 0), 2)))
+        self.assertEqual(5, len(grid.getNeighbourhood(Coordinates2D(0, 0), 2, "vonneumann")))
+
+        a = IdleAgent(1, "")
+        b = IdleAgent(2, "")
+        c = IdleAgent(1, "")
+
+        grid.moveAgent(Coordinates2D(7, 5), a)
+        grid.moveAgent(Coordinates2D(2, 5), b)
+        grid.moveAgent(Coordinates2D(9, 9), c)
+
+        neigh = dict((n.getCoordinates(), agents) for n, agents in grid.getNeighbourhood(Coordinates2D(5, 5), 2))
+        self.assertEqual([a], neigh[(7, 5)])
+        self.assertEqual([b], neigh[(3, 5)])
+
+        # b reaches into (3, 4), (3, 5) and (3, 6) but is returned once
+        self.assertEqual([a, b], grid.getAgentsInNeighbourhood(Coordinates2D(5, 5), 2))
+        self.assertEqual([a], grid.getAgentsInNeighbourhood(Coordinates2D(6, 6), 2, "euclidean"))
+        self.assertEqual([], grid.getAgentsInNeighbourhood(Coordinates2D(5, 5), 1))
+
+        wrapped = ObjectGrid2D(4, 4, "g", boundary="wrap")
+        neigh = Coordinates2D(0, 0).getNeighbourhood(wrapped, 2)
+
+        # every other position of the torus, once
+        self.assertEqual(15, len(neigh))
+        self.assertEqual(False, Coordinates2D(0, 0) in neigh)
+
+    def test_neighbourhood_numerical_grid(self):
+        grid = NumericalGrid2D(5, 5, "g", dtype="int32")
+        grid.setGridValue(Coordinates2D(4, 4), 3)
+
+        neigh = dict((c.getCoordinates(), v) for c, v in grid.getNeighbourhood(Coordinates2D(2, 2), 2))
+
+        self.assertEqual(24, len(neigh))
+        self.assertEqual(3, neigh[(4, 4)])
+        self.assertEqual(np.int32, type(neigh[(4, 4)]))
+
+        sparse = SparseNumericalGrid3D(5, 5, 5, "s")
+        sparse.setGridValue(Coordinates3D(0, 0, 2), 1.)
+
+        neigh = sparse.getNeighbourhood(Coordinates3D(0, 0, 0), 2, "vonneumann")
+
+        self.assertEqual(9, len(neigh))
+        self.assertEqual(1., sum(v for c, v in neigh))
+
+    def test_position_view_semantics(self):
+        grid = ObjectGrid2D(5, 5, "g", positionStorage="array")
+
+        a = IdleAgent(1, "")
+        grid.moveAgent(Coordinates2D(1, 2), a)
+
+        view = a.gridPositions["g"]
+
+        self.assertEqual(Coordinates2D(1, 2), view)
+        self.assertEqual(view, (1, 2))
+        self.assertEqual([1, 2], list(view))
+        self.assertEqual(2, view[1])
+
+        grid.moveAgent(Coordinates2D(3, 4), a)
+
+        self.assertEqual((3, 4), view)
+        self.assertNotEqual(Coordinates2D(1, 2), view)
+
+        # views change, a copy holds the current value and can be used as a key
+        self.assertRaises(TypeError, hash, view)
+        self.assertEqual(Coordinates2D, type(copy.copy(view)))
+        self.assertEqual({(3, 4): a}, {grid.getAgentPosition(a): a})
+
+        # views have no attribute dictionary and take no more memory than the coordinates they stand for
+        self.assertFalse(hasattr(view, "__dict__"))
+        self.assertEqual(sys.getsizeof(Coordinates2D(3, 4)), sys.getsizeof(view))
+        self.assertIn(3, view)
+
+    def test_distance_queries_grid_2d(self):
+        def bruteForce(grid, centre, metric, wrap):
+            distances = []
+
+            for coordinates, agent in grid.gridAgents:
+                d = np.abs(np.array(coordinates.getCoordinates()) - centre.getCoordinates())
+
+                if (wrap):
+                    d = np.minimum(d, np.array(grid.getSize()) - d)
+
+                if (metric == "euclidean"):
+                    distances.append((np.sqrt((d ** 2).sum()), agent))
+                elif (metric == "manhattan"):
+                    distances.append((d.sum(), agent))
+                else:
+                    distances.append((d.max(), agent))
+
+            return distances
+
+        np.random.seed(3)
+
+        for boundary, positionStorage in [("clip", "objects"), ("wrap", "array"), ("reflect", "objects")]:
+            grid = ObjectGrid2D(40, 30, "g", bucketSize=4, boundary=boundary, positionStorage=positionStorage)
+            agents = [IdleAgent(1, str(i)) for i in range(150)]
+
+            for agent in agents[:100]:
+                grid.moveAgent(Coordinates2D(*np.random.randint(0, 30, 2).tolist()), agent)
+
+            # the index is built by the first query and followed by the later moves
+            grid.getAgentsWithinDistance(Coordinates2D(0, 0), 1)
+
+            for agent in agents[50:]:
+                grid.moveAgent(Coordinates2D(*np.random.randint(0, 30, 2).tolist()), agent)
+
+            for agent in agents[:20]:
+                grid.removeAgent(agent)
+
+            for i in range(20):
+                centre = Coordinates2D(*np.random.randint(0, 30, 2).tolist())
+
+                for metric in ("euclidean", "manhattan", "chebyshev"):
+                    distance = np.random.randint(0, 12)
+                    expected = [a for d, a in bruteForce(grid, centre, metric, boundary == "wrap") if d <= distance]
+
+                    self.assertEqual(expected, grid.getAgentsWithinDistance(centre, distance, metric))
+
+                    k = np.random.randint(1, 10)
+                    found = grid.getNearestAgents(centre, k, metric)
+                    expected = sorted(d for d, a in bruteForce(grid, centre, metric, boundary == "wrap"))[:k]
+
+                    self.assertEqual(k, len(found))
+                    self.assertEqual(expected, sorted(d for d, a in bruteForce(grid, centre, metric,
+                                                                               boundary == "wrap")
+                                                      if a in found))
+
+        grid = ObjectGrid2D(10, 10, "g")
+        a = IdleAgent(1, "a")
+        b = IdleAgent(1, "b")
+        grid.moveAgent(Coordinates2D(2, 2), a)
+        grid.moveAgent(Coordinates2D(9, 9), b)
+
+        self.assertEqual([b], grid.getNearestAgents(Coordinates2D(2, 2), 3, exclude=a))
+        self.assertEqual([a, b], grid.getNearestAgents(Coordinates2D(2, 2), 3))
+        self.assertEqual([], grid.getAgentsWithinDistance(Coordinates2D(2, 2), 5, exclude=a))
+        self.assertRaises(ValueError, grid.getNearestAgents, Coordinates2D(2, 2), 1, "hamming")
+
+    def test_distance_queries_grid_3d(self):
+        grid = ObjectGrid3D(20, 20, 20, "g", bucketSize=5)
+        agents = [IdleAgent(1, str(i)) for i in range(4)]
+
+        for agent, position in zip(agents, [(1, 1, 1), (3, 1, 1), (1, 1, 4), (18, 18, 18)]):
+            grid.moveAgent(Coordinates3D(*position), agent)
+
+        self.assertEqual(agents[:3], grid.getAgentsWithinDistance(Coordinates3D(1, 1, 1), 3))
+        self.assertEqual(agents[:2], grid.getAgentsWithinDistance(Coordinates3D(1, 1, 1), 2.5, "manhattan"))
+        self.assertEqual([agents[0], agents[1], agents[2], agents[3]],
+                         grid.getNearestAgents(Coordinates3D(0, 0, 0), 10))
+        self.assertEqual([agents[3]], grid.getNearestAgents(Coordinates3D(15, 15, 15), 1))
+
+    def test_memmap_grid_2d(self):
+        directory = tempfile.mkdtemp()
+
+        try:
+            path = os.path.join(directory, "grid.dat")
+
+            grid = NumericalGrid2D(4, 3, "g", memmapPath=path, doubleBuffered=True)
+
+            self.assertEqual(True, isinstance(grid.getGrid(), np.memmap))
+            self.assertEqual(path, grid.getMemmapPath())
+
+            grid.setGridValue(Coordinates2D(1, 2), 5.)
+            grid.setNextGridValue(Coordinates2D(3, 0), 7.)
+            grid.swapBuffers()
+
+            # the current state now lives in the file of the former back buffer
+            self.assertEqual(path + ".next", grid.getMemmapPath())
+
+            grid.close()
+            self.assertEqual(None, grid.grid)
+
+            grid.reopen()
+
+            self.assertEqual(7., grid.getGridValue(Coordinates2D(3, 0)))
+            self.assertEqual(5., grid.getNextGrid()[1, 2])
+            self.assertEqual(False, grid.getGrid().flags.writeable)
+
+            grid.close()
+
+            # attaching to the file from scratch, Eg: for post-processing
+            reader = NumericalGrid2D(4, 3, "g", memmapPath=path + ".next", memmapMode="r")
+            self.assertEqual(7., reader.getGridValue(Coordinates2D(3, 0)))
+            reader.close()
+
+            self.assertRaises(ValueError, NumericalGrid2D(4, 3, "g").reopen)
+
+        finally:
+            shutil.rmtree(directory)
+
     def test_numerical_grid_3d_setup(self):
         grid = NumericalGrid3D(1, 2, 3,"")
 
@@ -403,6 +962,250 @@ class TestGrid(unittest.TestCase):
         self.assertEqual([agent], grid.getAtPos(Coordinates2D(8,10)))
         self.assertEqual([], grid.getAtPos(Coordinates2D(7,10)))
 
+    def test_agent_registry_grid_2d(self):
+        grid = ObjectGrid2D(5, 5, "")
+
+        a = IdleAgent(1, "")
+        aB = IdleAgent(1, "")
+
+        c = Coordinates2D(1, 1)
+        cB = Coordinates2D(3, 3)
+
+        grid.moveAgent(c, a)
+        grid.moveAgent(cB, aB)
+        grid.moveAgent(cB, a)
+
+        self.assertEqual((cB, a), grid.agentRegistry[a.getId()])
+        self.assertEqual([(cB, a), (cB, aB)], grid.gridAgents)
+
+        grid.removeAgent(a)
+
+        self.assertEqual(False, a.getId() in grid.agentRegistry)
+        self.assertEqual([(cB, aB)], grid.gridAgents)
+        self.assertEqual([aB], grid.getAtPos(cB))
+
+    def test_move_agents_grid_2d(self):
+        grid = ObjectGrid2D(5, 5, "g")
+
+        a = IdleAgent(1, "")
+        aB = IdleAgent(1, "")
+        aC = IdleAgent(2, "")
+
+        grid.moveAgent(Coordinates2D(1, 1), a)
+
+        xs, ys = grid.moveAgents([a, aB, aC], np.array([3.7, -2., 2.]), np.array([9, 0, 2]))
+
+        self.assertEqual([3, 0, 2], xs.tolist())
+        self.assertEqual([4, 0, 2], ys.tolist())
+
+        self.assertEqual(Coordinates2D(3, 4), a.gridPositions["g"])
+        self.assertEqual([a], grid.getAtPos(Coordinates2D(3, 4)))
+        self.assertEqual([aC], grid.getAtPos(Coordinates2D(1, 1)))
+        self.assertEqual([aB], grid.getAtPos(Coordinates2D(0, 0)))
+        self.assertEqual([aC], grid.getAtPos(Coordinates2D(1, 3)))
+
+        self.assertEqual(1, grid.getAgentCounts()[1, 1])
+        self.assertEqual(11, grid.getAgentCounts().sum())
+
+    def test_move_agents_matches_move_agent(self):
+        for positionStorage in ("objects", "array"):
+            grid = ObjectGrid2D(8, 8, "g", positionStorage=positionStorage)
+            gridB = ObjectGrid2D(8, 8, "gB", positionStorage=positionStorage)
+
+            agents = [IdleAgent(1 + i % 3, str(i)) for i in range(12)]
+            moved = []
+            grid.addMoveListener(lambda g, agent, old, new: moved.append(agent))
+
+            rs = np.random.RandomState(3)
+
+            for epoch in range(4):
+                # a third of the agents stay where they are, the last ones only join from the second epoch
+                count = 8 if epoch == 0 else 12
+                xs = rs.randint(0, 8, count)
+                ys = rs.randint(0, 8, count)
+
+                if (epoch > 0):
+                    for i in range(0, 8, 3):
+                        xs[i], ys[i] = grid.getAgentPosition(agents[i])
+
+                del moved[:]
+                grid.moveAgents(agents[:count], xs, ys)
+
+                for a, x, y in zip(agents[:count], xs, ys):
+                    gridB.moveAgent(Coordinates2D(x, y), a)
+
+                self.assertEqual(gridB.getAgentCounts().tolist(), grid.getAgentCounts().tolist())
+
+                for x in range(8):
+                    for y in range(8):
+                        self.assertEqual(gridB.getAtPos(Coordinates2D(x, y)), grid.getAtPos(Coordinates2D(x, y)))
+
+                for a in agents[:count]:
+                    self.assertEqual(gridB.getAgentPosition(a), grid.getAgentPosition(a))
+
+                # listeners only hear of the agents which moved or joined
+                if (epoch > 0):
+                    self.assertTrue(all(agents[i] not in moved for i in range(0, 8, 3)))
+
+                if (epoch == 1):
+                    self.assertTrue(all(a in moved for a in agents[8:]))
+
+            # moving every agent in slot order
+            xs, ys = grid.getPositionArray().T + 1
+            grid.moveAgents(grid.getPositionArrayAgents(), xs, ys)
+
+            for a, x, y in zip(grid.getPositionArrayAgents(), xs, ys):
+                self.assertEqual(Coordinates2D(min(x, 7), min(y, 7)), grid.getAgentPosition(a))
+
+    def test_move_agents_grid_3d(self):
+        grid = ObjectGrid3D(3, 3, 3, "g")
+
+        a = IdleAgent(1, "")
+
+        grid.moveAgents([a], [1], [5], [-1])
+
+        self.assertEqual(Coordinates3D(1, 2, 0), grid.getAgentPosition(a))
+        self.assertEqual([a], grid.grid[1][2][0])
+        self.assertEqual(1, grid.getAgentCounts().sum())
+
+    def test_position_array_grid_2d(self):
+        grid = ObjectGrid2D(5, 5, "g", positionStorage="array")
+
+        a = IdleAgent(1, "")
+        aB = IdleAgent(1, "")
+        aC = IdleAgent(1, "")
+
+        grid.moveAgent(Coordinates2D(1, 1), a)
+        grid.moveAgent(Coordinates2D(2, 3), aB)
+        grid.moveAgent(Coordinates2D(4, 0), aC)
+
+        view = a.gridPositions["g"]
+        grid.moveAgent(Coordinates2D(3, 3), a)
+
+        self.assertEqual(Coordinates2D(3, 3), view)
+        self.assertEqual(Coordinates2D(3, 3), grid.getAgentPosition(a))
+        self.assertEqual([a], grid.getAtPos(Coordinates2D(3, 3)))
+        self.assertEqual([[3, 3], [2, 3], [4, 0]], grid.getPositionArray().tolist())
+
+        grid.removeAgent(a)
+
+        self.assertEqual([aC, aB], grid.getPositionArrayAgents())
+        self.assertEqual([[4, 0], [2, 3]], grid.getPositionArray().tolist())
+        self.assertEqual(Coordinates2D(4, 0), aC.gridPositions["g"])
+        self.assertEqual(Coordinates2D(3, 3), a.gridPositions["g"])
+
+        grid.moveAgents([aB, aC], np.array([0, 1]), np.array([0, 1]))
+
+        self.assertEqual([[1, 1], [0, 0]], grid.getPositionArray().tolist())
+        self.assertEqual([aC], grid.getAtPos(Coordinates2D(1, 1)))
+
+    def test_position_array_grid_3d(self):
+        grid = ObjectGrid3D(3, 3, 3, "g", positionStorage="array")
+        gridB = ObjectGrid3D(3, 3, 3, "gB")
+
+        a = IdleAgent(1, "")
+
+        grid.moveAgent(Coordinates3D(1, 2, 0), a)
+        gridB.moveAgent(Coordinates3D(1, 2, 0), a)
+
+        self.assertEqual(Coordinates3D(1, 2, 0), grid.getAgentPosition(a))
+        self.assertEqual([a], grid.getAtPos(Coordinates3D(1, 2, 0)))
+        self.assertEqual(grid.getPositionArray().tolist(), gridB.getPositionArray().tolist())
+
+    def test_position_array_between_grids(self):
+        grid = ObjectGrid2D(5, 5, "g", positionStorage="array")
+        gridB = ObjectGrid2D(5, 5, "gB")
+
+        a = IdleAgent(1, "")
+
+        grid.moveAgent(Coordinates2D(1, 2), a)
+        gridB.moveAgent(a.gridPositions["g"], a)
+
+        # the second grid keeps its own copy, it does not follow the agent on the first one
+        grid.moveAgent(Coordinates2D(3, 3), a)
+
+        self.assertEqual(Coordinates2D(1, 2), gridB.getAgentPosition(a))
+        self.assertEqual([a], gridB.getAtPos(Coordinates2D(1, 2)))
+
+        gridB.moveAgent(Coordinates2D(0, 0), a)
+        self.assertEqual([a], gridB.getAtPos(Coordinates2D(0, 0)))
+
+        grid.moveAgent(gridB.getAgentPosition(a), a)
+        gridB.removeAgent(a)
+
+        self.assertEqual(Coordinates2D(0, 0), grid.getAgentPosition(a))
+        self.assertEqual([], gridB.getAtPos(Coordinates2D(0, 0)))
+
+    def test_grid_larger_radius_move_remove(self):
+        grid = ObjectGrid2D(10, 10, "")
+
+        a = IdleAgent(3, "")
+        aB = IdleAgent(1, "")
+
+        grid.moveAgent(Coordinates2D(1, 1), aB)
+        grid.moveAgent(Coordinates2D(2, 2), a)
+
+        self.assertEqual([aB, a], grid.getAtPos(Coordinates2D(1, 1)))
+        self.assertEqual([a], grid.getAtPos(Coordinates2D(0, 0)))
+        self.assertEqual([a], grid.getAtPos(Coordinates2D(4, 4)))
+        self.assertEqual([], grid.getAtPos(Coordinates2D(5, 4)))
+
+        grid.moveAgent(Coordinates2D(7, 7), a)
+
+        self.assertEqual([aB], grid.getAtPos(Coordinates2D(1, 1)))
+        self.assertEqual([], grid.getAtPos(Coordinates2D(4, 4)))
+        self.assertEqual([a], grid.getAtPos(Coordinates2D(9, 9)))
+        self.assertEqual([a], grid.getAtPos(Coordinates2D(5, 6)))
+
+        grid.removeAgent(a)
+
+        self.assertEqual([], grid.getAtPos(Coordinates2D(7, 7)))
+        self.assertEqual([], grid.getAtPos(Coordinates2D(9, 9)))
+        self.assertEqual({}, grid.spanIndex)
+
+    def test_footprint_free_grid_2d(self):
+        for cellStorage in ("dense", "tiled"):
+            grid = ObjectGrid2D(10, 10, "", cellStorage=cellStorage)
+
+            big = IdleAgent(3, "")
+            grid.moveAgent(Coordinates2D(5, 5), big)
+
+            # the footprint of big covers 3..7 along both axes
+            self.assertFalse(grid.isFootprintFree(Coordinates2D(7, 7), 1))
+            self.assertTrue(grid.isFootprintFree(Coordinates2D(8, 8), 1))
+            self.assertFalse(grid.isFootprintFree(Coordinates2D(9, 9), 3))
+            self.assertTrue(grid.isFootprintFree(Coordinates2D(1, 1), 2))
+
+            # an agent does not block its own move
+            self.assertFalse(grid.isFootprintFree(Coordinates2D(6, 5), 3))
+            self.assertTrue(grid.isFootprintFree(Coordinates2D(6, 5), 3, big))
+
+            small = IdleAgent(1, "")
+            grid.moveAgent(Coordinates2D(8, 5), small)
+
+            self.assertFalse(grid.isFootprintFree(Coordinates2D(6, 5), 3, big))
+            self.assertTrue(grid.isFootprintFree(Coordinates2D(4, 5), 3, big))
+
+            grid.removeAgent(big)
+
+            self.assertTrue(grid.isFootprintFree(Coordinates2D(5, 5), 3))
+
+    def test_object_grid_3d_larger_radius(self):
+        grid = ObjectGrid3D(5, 5, 5, "")
+
+        a = IdleAgent(2, "")
+
+        grid.moveAgent(Coordinates3D(2, 2, 2), a)
+
+        self.assertEqual([a], grid.getAtPos(Coordinates3D(1, 3, 2)))
+        self.assertEqual([], grid.getAtPos(Coordinates3D(0, 2, 2)))
+
+        grid.moveAgent(Coordinates3D(0, 0, 0), a)
+
+        self.assertEqual([a], grid.getAtPos(Coordinates3D(1, 1, 1)))
+        self.assertEqual([], grid.getAtPos(Coordinates3D(1, 3, 2)))
+        self.assertEqual([a], grid.grid[0][0][0])
+
     def test_object_grid_3d(self):
 
         grid = ObjectGrid3D(5,6,7,"test")
@@ -509,9 +1312,9 @@ class TestGrid(unittest.TestCase):
 
         neigh = c.getMooreNeigh(grid)
 
-        for c in neigh:
+        for n in neigh:
             a = IdleAgent(1,"")
-            grid.moveAgent(c, a)
+            grid.moveAgent(n, a)
 
         cB = Coordinates3D(2,3,3)
 
@@ -521,5 +1324,42 @@ class TestGrid(unittest.TestCase):
 
         self.assertEqual(cB, grid.getLeastPopulatedMooreNeigh(c))
 
+    def test_agent_counts_grid_2d(self):
+        grid = ObjectGrid2D(5, 5, "")
+
+        a = IdleAgent(1, "")
+        aB = IdleAgent(2, "")
+
+        grid.moveAgent(Coordinates2D(1, 1), a)
+        grid.moveAgent(Coordinates2D(2, 2), aB)
+
+        counts = grid.getAgentCounts()
+
+        self.assertEqual(0, counts[0, 0])
+        self.assertEqual(2, counts[1, 1])
+        self.assertEqual(1, counts[3, 3])
+        self.assertEqual(0, counts[4, 4])
+        self.assertEqual(10, counts.sum())
+
+        grid.moveAgent(Coordinates2D(4, 4), a)
+        grid.removeAgent(aB)
+
+        self.assertEqual(1, counts.sum())
+        self.assertEqual(1, counts[4, 4])
+
+    def test_populated_moore_neigh_ties_grid_2d(self):
+        grid = ObjectGrid2D(5, 5, "")
+
+        a = IdleAgent(1, "")
+        grid.moveAgent(Coordinates2D(0, 1), a)
+
+        seen = set()
+
+        for i in range(200):
+            seen.add(grid.getLeastPopulatedMooreNeigh(Coordinates2D(0, 0)).getCoordinates())
+
+        self.assertEqual(set([(1, 0), (1, 1)]), seen)
+        self.assertEqual(Coordinates2D(0, 1), grid.getMostPopulatedMooreNeigh(Coordinates2D(0, 0)))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,582 @@
+import random
+import unittest
+
+from panacea.core.Coordinates import Coordinates2D
+from panacea.core.Grid import ObjectGrid2D
+from panacea.core.Model import Model
+from panacea.core.Schedule import Schedule, ParallelSchedule, EventSchedule, ActiveSchedule, getSteppedPhases, isNoOp
+from panacea.core.Steppables import Agent, Helper
+
+
+class GridModel(Model):
+    def teardown(self):
+        pass
+
+
+class LifeCell(Agent):
+    parallelOutputs = {"stepMain": ("stateNext",)}
+
+    def __init__(self, state):
+        super(LifeCell, self).__init__(1)
+        self.state = state
+        self.stateNext = state
+
+    def stepPrologue(self, model):
+        pass
+
+    def stepMain(self, model):
+        grid = model.getGridFromName("life")
+        alive = sum(n[1][0].state for n in grid.getMooreNeigh(grid.getAgentPosition(self)))
+
+        self.stateNext = 1 if alive == 3 or (self.state == 1 and alive == 2) else 0
+
+    def stepEpilogue(self, model):
+        self.state = self.stateNext
+
+
+class NoisyAgent(Agent):
+    parallelOutputs = {"stepMain": ("draws",)}
+
+    def __init__(self):
+        super(NoisyAgent, self).__init__(1)
+        self.draws = []
+
+    def stepPrologue(self, model):
+        pass
+
+    def stepMain(self, model):
+        self.draws = self.draws + [random.random()]
+
+    def stepEpilogue(self, model):
+        pass
+
+
+class CountingAgent(Agent):
+    calls = []
+
+    def __init__(self):
+        super(CountingAgent, self).__init__(1)
+
+    def stepPrologue(self, model):
+        """ Does nothing.
+        """
+        pass
+
+    def stepMain(self, model):
+        CountingAgent.calls.append(("main", self))
+
+    def stepEpilogue(self, model):
+        pass
+
+
+class LateAgent(CountingAgent):
+    def stepEpilogue(self, model):
+        CountingAgent.calls.append(("epilogue", self))
+
+
+class BatchAgent(Agent):
+    batches = []
+
+    def __init__(self):
+        super(BatchAgent, self).__init__(1)
+
+    def stepPrologue(self, model):
+        pass
+
+    def stepMain(self, model):
+        raise AssertionError("stepMain should not be called")
+
+    def stepEpilogue(self, model):
+        pass
+
+    @classmethod
+    def stepMainBatch(cls, agents, model):
+        BatchAgent.batches.append(list(agents))
+
+
+class PeriodicAgent(Agent):
+    def __init__(self, period, log):
+        super(PeriodicAgent, self).__init__(1)
+        self.period = period
+        self.log = log
+
+    def stepPrologue(self, model):
+        self.log.append(("prologue", model.schedule.getTime(), self))
+
+    def stepMain(self, model):
+        self.log.append(("main", model.schedule.getTime(), self))
+
+        if (self.period is not None):
+            model.schedule.activateIn(self, self.period)
+
+    def stepEpilogue(self, model):
+        self.log.append(("epilogue", model.schedule.getTime(), self))
+
+
+class BreedingAgent(Agent):
+    def __init__(self, log, child=None, victim=None):
+        super(BreedingAgent, self).__init__(1)
+        self.log = log
+        self.child = child
+        self.victim = victim
+
+    def stepPrologue(self, model):
+        self.log.append(("prologue", self))
+
+    def stepMain(self, model):
+        self.log.append(("main", self))
+
+        if (self.child is not None):
+            model.schedule.addAgent(self.child)
+            self.child = None
+
+        if (self.victim is not None):
+            model.schedule.removeAgent(self.victim)
+            self.victim = None
+
+    def stepEpilogue(self, model):
+        self.log.append(("epilogue", self))
+
+
+class PeriodicHelper(Helper):
+    def __init__(self, log):
+        self.log = log
+
+    def stepPrologue(self, model):
+        self.log.append(("helper", model.schedule.getTime(), self))
+        model.schedule.activateIn(self, 2)
+
+    def stepMain(self, model):
+        pass
+
+    def stepEpilogue(self, model):
+        pass
+
+
+def buildLife(schedule, size=12, seed=7):
+    random.seed(seed)
+
+    model = GridModel()
+    grid = ObjectGrid2D(size, size, "life")
+    model.addGrid(grid)
+
+    cells = []
+
+    for x in range(size):
+        for y in range(size):
+            cell = LifeCell(1 if random.random() < 0.4 else 0)
+            grid.moveAgent(Coordinates2D(x, y), cell)
+            schedule.addAgent(cell)
+            cells.append(cell)
+
+    model.addSchedule(schedule)
+
+    return model, cells
+
+
+def runGameOfLife(cellClass, schedule, size=10, epochs=5, alive=None):
+    random.seed(5)
+
+    model = GridModel()
+    grid = ObjectGrid2D(size, size, "golgrid")
+    model.addGrid(grid)
+    model.addSchedule(schedule)
+
+    cells = []
+
+    for x in range(size):
+        for y in range(size):
+            if (alive is None):
+                state = 1 if random.random() < 0.4 else 0
+            else:
+                state = 1 if (x, y) in alive else 0
+
+            cell = cellClass([1, state])
+            grid.moveAgent(Coordinates2D(x, y), cell)
+            schedule.addAgent(cell)
+            cells.append(cell)
+
+    for i in range(epochs):
+        schedule.step(model)
+
+    return [c.state for c in cells]
+
+
+class TestSchedule(unittest.TestCase):
+    def test_no_op_phases_skipped(self):
+        def empty(self, model):
+            pass
+
+        def constant(self, model):
+            return 1
+
+        self.assertTrue(isNoOp(empty))
+        self.assertTrue(isNoOp(CountingAgent.stepPrologue))
+        self.assertFalse(isNoOp(constant))
+        self.assertFalse(isNoOp(CountingAgent.stepMain))
+        self.assertFalse(isNoOp(len))
+
+        self.assertEqual((False, True, False), getSteppedPhases(CountingAgent))
+        self.assertEqual((False, True, True), getSteppedPhases(LateAgent))
+        self.assertEqual((False, True, True), getSteppedPhases(LifeCell))
+
+        schedule = Schedule()
+        a = CountingAgent()
+        b = LateAgent()
+        schedule.addAgent(a)
+        schedule.addAgent(b)
+
+        del CountingAgent.calls[:]
+        schedule.step(GridModel())
+
+        self.assertEqual(3, len(CountingAgent.calls))
+        self.assertEqual(("epilogue", b), CountingAgent.calls[2])
+        self.assertEqual(set([a, b]), set(agent for phase, agent in CountingAgent.calls[:2]))
+
+        # the order of stepMain follows the shuffled agents
+        self.assertEqual(schedule.agents, [agent for phase, agent in CountingAgent.calls[:2]])
+
+        schedule.removeAgent(b)
+        del CountingAgent.calls[:]
+        schedule.step(GridModel())
+
+        self.assertEqual([("main", a)], CountingAgent.calls)
+
+    def test_batch_hook(self):
+        schedule = Schedule()
+        batched = [BatchAgent() for i in range(5)]
+        single = CountingAgent()
+
+        for agent in batched[:2] + [single] + batched[2:]:
+            schedule.addAgent(agent)
+
+        del BatchAgent.batches[:]
+        del CountingAgent.calls[:]
+
+        schedule.step(GridModel())
+
+        self.assertEqual(1, len(BatchAgent.batches))
+        self.assertEqual([a for a in schedule.agents if a is not single], BatchAgent.batches[0])
+        self.assertEqual([("main", single)], CountingAgent.calls)
+
+    def test_batch_game_of_life(self):
+        from panacea.examples.gameOfLife.GameOfLife import GOLCell
+
+        class SerialGOLCell(GOLCell):
+            stepMainBatch = None
+
+        serial = runGameOfLife(SerialGOLCell, Schedule())
+
+        self.assertEqual(serial, runGameOfLife(GOLCell, Schedule()))
+
+        # each chunk steps its cells in batch, reading the others from the grid
+        self.assertEqual(serial, runGameOfLife(GOLCell, ParallelSchedule(workers=2, chunks=3)))
+
+        # the neighbour counts are computed once per epoch in the main process and shared by the chunks
+        class PreparedGOLCell(GOLCell):
+            prepared = []
+
+            @classmethod
+            def stepMainBatchPrepare(cls, agents, model):
+                cls.prepared.append(len(agents))
+                return super(PreparedGOLCell, cls).stepMainBatchPrepare(agents, model)
+
+        self.assertEqual(serial, runGameOfLife(PreparedGOLCell, ParallelSchedule(workers=1, chunks=3)))
+        self.assertEqual([100] * 5, PreparedGOLCell.prepared)
+
+        del PreparedGOLCell.prepared[:]
+        self.assertEqual(serial, runGameOfLife(PreparedGOLCell, ParallelSchedule(workers=2, chunks=3)))
+        self.assertEqual([100] * 5, PreparedGOLCell.prepared)
+
+    def test_active_schedule_game_of_life(self):
+        from panacea.examples.gameOfLife.GameOfLife import GOLCell
+
+        self.assertEqual(runGameOfLife(GOLCell, Schedule(), epochs=12),
+                         runGameOfLife(GOLCell, ActiveSchedule(), epochs=12))
+
+        # a blinker on an otherwise dead board, only the cells around it stay awake
+        schedule = ActiveSchedule()
+        runGameOfLife(GOLCell, schedule, size=20, epochs=3, alive=[(5, 4), (5, 5), (5, 6)])
+
+        self.assertEqual(3, len([a for a in schedule.agents if a.state == 1]))
+        self.assertTrue(0 < schedule.getAwakeCount() <= 25)
+
+    def test_active_schedule_wake_sleep(self):
+        schedule = ActiveSchedule()
+        model = GridModel()
+        model.addSchedule(schedule)
+
+        grid = ObjectGrid2D(10, 10, "g")
+        schedule.watchGrid(grid)
+
+        a = CountingAgent()
+        b = CountingAgent()
+
+        for agent, x in ((a, 1), (b, 6)):
+            grid.moveAgent(Coordinates2D(x, 1), agent)
+            schedule.addAgent(agent)
+
+        self.assertEqual(2, schedule.getAwakeCount())
+
+        schedule.sleep(a)
+        schedule.sleep(b)
+
+        del CountingAgent.calls[:]
+        schedule.step(model)
+
+        self.assertEqual([], CountingAgent.calls)
+
+        # moving next to a sleeping agent wakes it, along with the agent moving
+        grid.moveAgent(Coordinates2D(2, 2), b)
+
+        self.assertTrue(schedule.isAwake(a))
+        self.assertTrue(schedule.isAwake(b))
+
+        schedule.step(model)
+
+        self.assertEqual(2, len(CountingAgent.calls))
+        self.assertEqual(2, schedule.getAwakeCount())
+
+        # during a step a wake wins over a sleep, in any order
+        schedule.stepping = True
+        schedule.wake(a)
+        schedule.sleep(a)
+        schedule.sleep(b)
+        schedule.stepping = False
+
+        self.assertTrue(schedule.isAwake(a))
+        self.assertFalse(schedule.isAwake(b))
+
+        schedule.removeAgent(a)
+
+        self.assertFalse(schedule.isAwake(a))
+
+    def test_activation_orders(self):
+        from panacea.examples.gameOfLife.GameOfLife import GOLCell
+
+        def run(order, seed):
+            CountingAgent.calls = []
+            schedule = Schedule(order, seed)
+            agents = [CountingAgent() for i in range(20)]
+
+            for a in agents:
+                schedule.addAgent(a)
+
+            model = GridModel()
+
+            for i in range(3):
+                schedule.step(model)
+
+            return agents, [[agents.index(c[1]) for c in CountingAgent.calls[i * 20:(i + 1) * 20]] for i in range(3)]
+
+        agents, orders = run("sequential", None)
+        self.assertEqual([list(range(20))] * 3, orders)
+
+        agents, orders = run("cyclic", 5)
+        for order in orders:
+            self.assertEqual(list(range(20)), sorted(order))
+            offset = order.index(0)
+            self.assertEqual(list(range(20)), order[offset:] + order[:offset])
+
+        for order in ("shuffle", "permutation"):
+            agents, orders = run(order, 5)
+
+            self.assertEqual([list(range(20))] * 3, [sorted(o) for o in orders])
+            self.assertNotEqual(orders[0], orders[1])
+            self.assertEqual(orders, run(order, 5)[1])
+
+        self.assertRaises(ValueError, Schedule, "random")
+
+        # the game of life only reads the previous state, any order gives the same board
+        self.assertEqual(runGameOfLife(GOLCell, Schedule()), runGameOfLife(GOLCell, Schedule("sequential")))
+        self.assertEqual(runGameOfLife(GOLCell, ActiveSchedule()), runGameOfLife(GOLCell, ActiveSchedule("cyclic", 3)))
+
+    def test_births_and_deaths(self):
+        log = []
+        child = BreedingAgent(log)
+        victim = BreedingAgent(log)
+        parent = BreedingAgent(log, child, victim)
+
+        schedule = Schedule()
+        schedule.addAgent(parent)
+        schedule.addAgent(victim)
+
+        model = GridModel()
+        model.addSchedule(schedule)
+
+        schedule.step(model)
+
+        # the victim completes the phase it was removed in, the child starts at the next one
+        self.assertEqual(["prologue", "main", "epilogue"], [e[0] for e in log if e[1] is parent])
+        self.assertIn(("prologue", victim), log)
+        self.assertNotIn(("epilogue", victim), log)
+        self.assertEqual([("epilogue", child)], [e for e in log if e[1] is child])
+
+        self.assertEqual(set([parent, child]), set(schedule.agents))
+        self.assertTrue(schedule.hasAgent(child))
+        self.assertFalse(schedule.hasAgent(victim))
+
+        self.assertRaises(ValueError, schedule.removeAgent, victim)
+
+        # helpers are not agents and removed agents are gone before the removal is applied
+        helper = PeriodicHelper(log)
+        schedule.addHelper(helper)
+        self.assertFalse(schedule.hasAgent(helper))
+        self.assertTrue(schedule.isScheduled(helper))
+
+        schedule.removeAgent(parent)
+        self.assertIn(id(parent), schedule.deaths)
+        self.assertFalse(schedule.hasAgent(parent))
+        self.assertFalse(schedule.isScheduled(parent))
+
+        schedule.addAgent(parent)
+        schedule.removeHelper(helper)
+
+        # removed then added back before the removal is applied, the agent keeps its place
+        order = list(schedule.agents)
+        schedule.removeAgent(child)
+        schedule.addAgent(child)
+        self.assertEqual(order, schedule.agents)
+
+        # bulk removal
+        agents = [BreedingAgent(log) for i in range(50)]
+
+        for a in agents:
+            schedule.addAgent(a)
+
+        for a in agents[::2]:
+            schedule.removeAgent(a)
+
+        self.assertEqual(order + agents[1::2], schedule.agents)
+        self.assertEqual(len(schedule.agents), len(schedule.boundSteps))
+
+    def test_active_schedule_orders(self):
+        def run(order, seed, count):
+            CountingAgent.calls = []
+            schedule = ActiveSchedule(order, seed)
+            agents = [CountingAgent() for i in range(count)]
+
+            for a in agents:
+                schedule.addAgent(a)
+
+            model = GridModel()
+
+            for i in range(2):
+                schedule.step(model)
+
+            indices = dict((id(a), i) for i, a in enumerate(agents))
+
+            return [indices[id(c[1])] for c in CountingAgent.calls]
+
+        self.assertEqual(list(range(8)) * 2, run("sequential", None, 8))
+
+        # agent ids differ between runs, the order must not depend on them
+        self.assertEqual(run("shuffle", 1, 3000), run("shuffle", 1, 3000))
+
+    def test_event_schedule(self):
+        log = []
+
+        schedule = EventSchedule()
+        model = GridModel()
+        model.addSchedule(schedule)
+
+        every = PeriodicAgent(1, log)
+        third = PeriodicAgent(3, log)
+        once = PeriodicAgent(None, log)
+        late = PeriodicAgent(None, log)
+        helper = PeriodicHelper(log)
+
+        schedule.addAgent(every)
+        schedule.addAgent(third)
+        schedule.addAgent(once)
+        schedule.addAgent(late, 4)
+        schedule.addHelper(helper)
+
+        self.assertEqual(4, schedule.getNextActivation(late))
+
+        for i in range(7):
+            schedule.step(model)
+
+        def ticks(steppable, phase="main"):
+            return [t for p, t, s in log if s is steppable and p == phase]
+
+        self.assertEqual(list(range(7)), ticks(every))
+        self.assertEqual([0, 3, 6], ticks(third))
+        self.assertEqual([0], ticks(once))
+        self.assertEqual([4], ticks(late))
+        self.assertEqual([0, 2, 4, 6], ticks(helper, "helper"))
+
+        self.assertEqual(None, schedule.getNextActivation(once))
+        self.assertEqual(7, schedule.getTime())
+
+        # the three acts of a tick run one after the other over all agents active in it
+        tick = [p for p, t, s in log if t == 3 and s is not helper]
+        self.assertEqual(["prologue"] * 2 + ["main"] * 2 + ["epilogue"] * 2, tick)
+
+        # a new activation replaces the pending one, removed agents are not stepped
+        schedule.activateAt(third, 8)
+        schedule.activateAt(once, 7)
+        schedule.removeAgent(every)
+
+        del log[:]
+        schedule.step(model)
+        schedule.step(model)
+
+        self.assertEqual([7], ticks(once))
+        self.assertEqual([8], ticks(third))
+        self.assertEqual([], ticks(every))
+
+        self.assertRaises(ValueError, schedule.activateAt, once, 3)
+
+        # an agent removed during stepMain still completes it, its new activation is ignored
+        schedule = EventSchedule(order="sequential")
+        model = GridModel()
+        model.addSchedule(schedule)
+
+        victim = PeriodicAgent(1, log)
+        schedule.addAgent(BreedingAgent([], victim=victim))
+        schedule.addAgent(victim)
+
+        del log[:]
+
+        for i in range(3):
+            schedule.step(model)
+
+        self.assertEqual([0], ticks(victim))
+        self.assertEqual(None, schedule.getNextActivation(victim))
+        self.assertNotIn(victim, schedule.agents)
+
+    def test_parallel_schedule_matches_serial(self):
+        serialModel, serialCells = buildLife(Schedule())
+        parallelModel, parallelCells = buildLife(ParallelSchedule(workers=3, chunks=5, seed=1))
+
+        for i in range(4):
+            serialModel.schedule.step(serialModel)
+            parallelModel.schedule.step(parallelModel)
+
+        self.assertEqual([c.state for c in serialCells], [c.state for c in parallelCells])
+
+    def test_parallel_schedule_deterministic(self):
+        def run(workers):
+            schedule = ParallelSchedule(workers=workers, chunks=4, seed=11)
+            agents = [NoisyAgent() for i in range(10)]
+
+            for a in agents:
+                schedule.addAgent(a)
+
+            model = GridModel()
+
+            for i in range(3):
+                schedule.step(model)
+
+            return [a.draws for a in agents]
+
+        self.assertEqual(run(1), run(1))
+        self.assertEqual(run(1), run(3))
+        self.assertEqual(3, len(run(2)[0]))
+
+        self.assertRaises(ValueError, ParallelSchedule, 2, ("stepMiddle",))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,10 @@
+import os
+import shutil
+import tempfile
 import unittest
 
+import numpy as np
+
 from panacea.core.Coordinates import Coordinates2D
 from panacea.core.Grid import ObjectGrid2D, NumericalGrid2D
 from panacea.examples.gameOfLife.GameOfLife import GOLModelAutoSetup
@@ -149,5 +154,63 @@ class TestSetuploader(unittest.TestCase):
         self.assertEqual(15, grid.getGridValue(Coordinates2D(9,10)))
         self.assertEqual(12, grid.getGridValue(Coordinates2D(1,1)))
 
+    def test_load_grid_options(self):
+        m = EmptyModel("../examples/misc/xmlSetup/setupB.xml", "xml")
+        m.setup()
+
+        gridC = m.getGridFromName("gridC")
+        gridD = m.getGridFromName("gridD")
+
+        self.assertEqual(None, gridC.nextGrid)
+
+        self.assertEqual((10,20), gridD.getSize())
+        self.assertEqual((10,20), gridD.getNextGrid().shape)
+
+        self.assertEqual(np.float64, gridC.getDtype())
+        self.assertEqual(np.float32, gridD.getDtype())
+        self.assertEqual(np.float32, gridD.getNextGrid().dtype)
+
+    def test_load_grid_memmap_options(self):
+        directory = tempfile.mkdtemp()
+
+        try:
+            with open("../examples/misc/xmlSetup/setupB.xml") as f:
+                setup = f.read()
+
+            path = os.path.join(directory, "gridD.dat")
+
+            def load(mode):
+                options = ('<option name="memmapPath" value="%s"/>\n'
+                           '<option name="memmapMode" value="%s"/>' % (path, mode))
+                setupPath = os.path.join(directory, "setup.xml")
+
+                with open(setupPath, "w") as f:
+                    f.write(setup.replace('<option name="doubleBuffered" value="true"/>', options))
+
+                m = EmptyModel(setupPath, "xml")
+                m.setup()
+
+                return m.getGridFromName("gridD")
+
+            gridD = load("w+")
+
+            self.assertTrue(isinstance(gridD.getGrid(), np.memmap))
+            self.assertEqual(path, gridD.getGrid().filename)
+            self.assertEqual(np.float32, gridD.getDtype())
+
+            gridD.setGridValue(Coordinates2D(3, 4), 2.5)
+            gridD.getGrid().flush()
+            del gridD
+
+            # reopening the file keeps its values
+            gridD = load("r+")
+
+            self.assertTrue(isinstance(gridD.getGrid(), np.memmap))
+            self.assertEqual("r+", gridD.getGrid().mode)
+            self.assertEqual(2.5, gridD.getGridValue(Coordinates2D(3, 4)))
+            del gridD
+        finally:
+            shutil.rmtree(directory)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,117 @@
+import unittest
+
+import numpy as np
+from panacea.core.Coordinates import Coordinates2D
+from panacea.core.Grid import NumericalGrid2D, NumericalGrid3D, SparseNumericalGrid2D
+from panacea.core.helpers.StencilHelper import StencilHelper
+from panacea.examples.misc.ModelA import EmptyModel
+
+
+class TestStencilHelper(unittest.TestCase):
+
+    def test_diffusion_kernel(self):
+        kernel = StencilHelper.diffusionKernel(2, 0.1)
+
+        self.assertAlmostEqual(1., kernel.sum())
+        self.assertAlmostEqual(0.6, kernel[1, 1])
+        self.assertAlmostEqual(0.1, kernel[0, 1])
+        self.assertAlmostEqual(0., kernel[0, 0])
+
+    def test_sum_kernel_matches_reduce_neighbourhood(self):
+        grid = NumericalGrid2D(6, 7, "field")
+        grid.grid[:] = np.random.random((6, 7))
+
+        expected = grid.reduceNeighbourhood("sum", includeCentre=True)
+
+        kernel = np.ones((3, 3))
+        helper = StencilHelper("field", kernel)
+        helper.applyToGrid(grid)
+
+        self.assertTrue(np.allclose(expected, grid.grid))
+
+    def test_boundaries_mass(self):
+        for boundary, conserved in (("wrap", True), ("reflect", True), ("clip", False)):
+            grid = NumericalGrid2D(5, 5, "field")
+            grid.grid[0, 0] = 10.
+
+            helper = StencilHelper("field", StencilHelper.diffusionKernel(2, 0.2), boundary=boundary, substeps=3)
+            helper.applyToGrid(grid)
+
+            self.assertEqual(conserved, abs(grid.grid.sum() - 10.) < 1e-9)
+
+        grid = NumericalGrid2D(5, 5, "field")
+        grid.grid[0, 2] = 1.
+
+        StencilHelper("field", StencilHelper.diffusionKernel(2, 0.2), boundary="wrap").applyToGrid(grid)
+
+        self.assertAlmostEqual(0.2, grid.grid[4, 2])
+
+    def test_grid_boundary_default(self):
+        grid = NumericalGrid2D(5, 5, "field", boundary="wrap")
+        grid.grid[0, 0] = 10.
+
+        helper = StencilHelper("field", StencilHelper.diffusionKernel(2, 0.2))
+        helper.applyToGrid(grid)
+
+        self.assertAlmostEqual(10., grid.grid.sum())
+        self.assertAlmostEqual(2., grid.grid[4, 0])
+
+        # the same helper on a clipped grid must not see the wrapped halo
+        grid = NumericalGrid2D(5, 5, "field")
+        grid.grid[0, 0] = 10.
+
+        helper.applyToGrid(grid)
+
+        # two of the four neighbours of the corner are off the grid
+        self.assertAlmostEqual(6., grid.grid.sum())
+
+    def test_decay_source_substeps_3d(self):
+        grid = NumericalGrid3D(3, 3, 3, "field")
+        grid.grid[:] = 1.
+
+        helper = StencilHelper("field", StencilHelper.diffusionKernel(3, 0.1), decay=0.5, source=2.,
+                               boundary="reflect", substeps=2)
+        helper.applyToGrid(grid)
+
+        # 1 * 0.5 + 2 = 2.5, then 2.5 * 0.5 + 2 = 3.25
+        self.assertTrue(np.allclose(3.25, grid.grid))
+
+        padded = helper.padded
+        helper.applyToGrid(grid)
+        self.assertTrue(padded is helper.padded)
+
+    def test_schedule_phase(self):
+        m = EmptyModel()
+        grid = NumericalGrid2D(3, 3, "field")
+        m.addGrid(grid)
+
+        helper = StencilHelper(["field", "0.1", "0", "wrap", "1"])
+        grid.grid[1, 1] = 1.
+
+        helper.stepPrologue(m)
+        helper.stepMain(m)
+        self.assertEqual(1., grid.grid[1, 1])
+
+        helper.stepEpilogue(m)
+        self.assertAlmostEqual(0.6, grid.grid[1, 1])
+        self.assertAlmostEqual(0.1, grid.grid[0, 1])
+
+    def test_sparse_grids(self):
+        m = EmptyModel()
+        grid = NumericalGrid2D(3, 3, "field")
+        sources = SparseNumericalGrid2D(3, 3, "sources")
+        m.addGrid(grid)
+        m.addGrid(sources)
+
+        sources.setGridValue(Coordinates2D(1, 1), 2.)
+
+        # sparse grids can be sources but not updated
+        StencilHelper("field", StencilHelper.diffusionKernel(2, 0.1), source="sources").applyToGrid(grid, m)
+        self.assertEqual(2., grid.grid[1, 1])
+        self.assertEqual(2., grid.grid.sum())
+
+        helper = StencilHelper("sources", StencilHelper.diffusionKernel(2, 0.1))
+        self.assertRaises(ValueError, helper.applyToGrid, sources)
+
+if __name__ == '__main__':
+    unittest.main()